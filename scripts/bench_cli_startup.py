@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+
+LIGHT_COMMANDS = ["inspect", "validate", "sim"]
+HEAVY_COMMANDS = ["features", "rl", "train", "report", "plot"]
+
+
+def light_runs(workdir: Path) -> Dict[str, List[str]]:
+    """Smallest real invocation of each lightweight subcommand (config load, engine import, I/O)."""
+    policy = workdir / "policy.json"
+    policy.write_text(json.dumps({"0|0|0": 1, "8|1|0": 0}), encoding="utf-8")
+    config = str(ROOT / "configs" / "game_rules.yaml")
+    return {
+        "inspect": ["--input", str(policy)],
+        "validate": ["--config", config, "--pulls", "1"],
+        "sim": ["--config", config, "--pulls", "1", "--output", str(workdir / "raw")],
+    }
+
+
+def time_command(cmd: List[str], repeats: int, warmup: int = 0) -> List[float]:
+    """Wall-clock ms of `repeats` runs of `cmd`, after `warmup` untimed runs."""
+    for _ in range(warmup):
+        subprocess.run(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(
+            cmd,
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return timings
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark `gacha <subcommand>` startup: --help, plus a minimal real run of lightweight subcommands."
+    )
+    parser.add_argument("--repeats", type=int, default=11, help="Timed runs per command; the median is reported")
+    parser.add_argument(
+        "--warmup", type=int, default=2, help="Untimed runs per command first (page cache, .pyc files)"
+    )
+    parser.add_argument("--target_ms", type=float, default=100.0, help="Budget for lightweight subcommands")
+    parser.add_argument("--all", action="store_true", help="Also time heavy subcommands")
+    args = parser.parse_args(argv)
+
+    commands = LIGHT_COMMANDS + (HEAVY_COMMANDS if args.all else [])
+    failed = False
+    print("subcommand\tmode\tmedian_ms\tmin_ms\tstatus")
+    # Bare interpreter startup, for context: it is included in every row below.
+    baseline = time_command([sys.executable, "-c", "pass"], args.repeats, args.warmup)
+    print(f"(python)\t-\t{statistics.median(baseline):.1f}\t{min(baseline):.1f}\t-")
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = light_runs(Path(tmp))
+        for command in commands:
+            # --help covers module import and argparse; the run row adds config parsing and lazy imports.
+            modes = [("help", ["--help"])] + ([("run", runs[command])] if command in runs else [])
+            for mode, extra in modes:
+                timings = time_command([sys.executable, "-m", "src.cli", command] + extra, args.repeats, args.warmup)
+                median = statistics.median(timings)
+                status = "-"
+                if command in LIGHT_COMMANDS:
+                    status = "PASS" if median <= args.target_ms else "FAIL"
+                    failed = failed or status == "FAIL"
+                print(f"{command}\t{mode}\t{median:.1f}\t{min(timings):.1f}\t{status}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
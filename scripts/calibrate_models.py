@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import joblib
+import numpy as np
+
+from src.analysis.report_state import ingest_appended, load_aggregates, model_fingerprints
+from src.models.calibration import CALIBRATION_METHODS, StateTriples, calibrate
+
+
+def load_model(path: str):
+    obj = joblib.load(path)
+    # Backward compatibility: if a TrainResult was saved, extract the model.
+    if hasattr(obj, "model"):
+        return obj.model
+    return obj
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Calibrate stage models (isotonic / Platt) on per-state aggregated predictions."
+    )
+    parser.add_argument("--data", required=True, help="Processed dataset CSV (ideally not the training data)")
+    parser.add_argument("--stageA", default="", help="Stage A model(s) joblib, comma-separated")
+    parser.add_argument("--stageB", default="", help="Stage B model(s) joblib, comma-separated")
+    parser.add_argument("--method", choices=CALIBRATION_METHODS, default="isotonic")
+    parser.add_argument("--bins", type=int, default=10, help="Bins for the reliability curves")
+    parser.add_argument(
+        "--holdout",
+        type=float,
+        default=0.3,
+        help="Share of rows (split within each state) kept out of the fit and used for the before/after report; "
+        "0 fits on all rows and reports in-sample",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the holdout split")
+    parser.add_argument(
+        "--state",
+        default=None,
+        help="Aggregate state file (same format as decision_report --state); only appended rows are read",
+    )
+    parser.add_argument("--out_dir", default="artifacts/calibrated", help="Where calibrated models are saved")
+    parser.add_argument("--report", default=None, help="Reliability report JSON (default: <out_dir>/calibration.json)")
+    args = parser.parse_args(argv)
+
+    stage_a_paths = [p.strip() for p in args.stageA.split(",") if p.strip()]
+    stage_b_paths = [p.strip() for p in args.stageB.split(",") if p.strip()]
+    if not stage_a_paths and not stage_b_paths:
+        parser.error("give at least one model via --stageA or --stageB")
+    models_a = [load_model(p) for p in stage_a_paths]
+    models_b = [load_model(p) for p in stage_b_paths]
+
+    data_path = Path(args.data)
+    state_path = Path(args.state) if args.state else None
+    aggs, reason = load_aggregates(state_path, data_path, model_fingerprints(stage_a_paths), model_fingerprints(stage_b_paths))
+    if reason:
+        print(f"Rebuilding aggregate state: {reason}")
+    new_rows = ingest_appended(aggs, data_path, models_a, models_b, state_path)
+    print(f"Ingested {new_rows} new rows ({aggs.rows} total)")
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    report = {"method": args.method, "rows": aggs.rows, "holdout": args.holdout, "models": []}
+    rng = np.random.default_rng(args.seed)
+    print(f"Reliability on {'held-out rows' if args.holdout > 0 else 'the fitting rows (in-sample)'}:")
+    print("model\tstates\tECE before\tECE after\tBrier before\tBrier after")
+    for stage, paths, models in (("A", stage_a_paths, models_a), ("B", stage_b_paths, models_b)):
+        for i, (path, model) in enumerate(zip(paths, models)):
+            triples = StateTriples.from_sums(*aggs.triples(stage, i))
+            calibrated, curves = calibrate(model, triples, args.method, args.bins, args.holdout, rng)
+            out_path = out_dir / f"{Path(path).stem}_{args.method}.joblib"
+            joblib.dump(calibrated, out_path)
+            before, after = curves["before"], curves["after"]
+            print(
+                f"{Path(path).name}\t{len(triples.n)}\t{before['ece']:.5f}\t{after['ece']:.5f}"
+                f"\t{before['brier']:.6f}\t{after['brier']:.6f}"
+            )
+            report["models"].append(
+                {"stage": stage, "model": path, "calibrated": str(out_path), "states": len(triples.n), **curves}
+            )
+
+    report_path = Path(args.report) if args.report else out_dir / "calibration.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Saved calibrated models to: {out_dir}")
+    print(f"Saved calibration report to: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
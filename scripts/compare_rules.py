@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import argparse
+import copy
+from dataclasses import asdict
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+import sys
+
+import yaml
+
+from src.analysis.paired_compare import METRICS, paired_compare
+from src.simulation.engine import config_from_dict
+
+
+def apply_override(raw: Dict, token: str) -> None:
+    key, value = token.split("=", 1)
+    node = raw
+    parts = key.split(".")
+    for part in parts[:-1]:
+        node = node.setdefault(part, {})
+    node[parts[-1]] = yaml.safe_load(value)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Paired (common random numbers) comparison of two rule configs.")
+    parser.add_argument("--base", required=True, help="Baseline game_rules.yaml (A)")
+    parser.add_argument("--candidate", default=None, help="Candidate rules YAML (B); default: copy of --base")
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        help="Override on the candidate, e.g. pity.soft_pity_step=0.06 (repeatable)",
+    )
+    parser.add_argument("--paths", type=int, default=20000, help="Paired paths")
+    parser.add_argument("--pulls", type=int, default=1000, help="Pulls per path")
+    parser.add_argument("--seed", type=int, default=None, help="Override random seed")
+    parser.add_argument(
+        "--tolerance",
+        action="append",
+        default=[],
+        help="metric=value; FAIL if the paired 95%% CI lies entirely outside [-value, value] (repeatable)",
+    )
+    parser.add_argument("--out", default="artifacts/rule_comparison.json", help="Output report path")
+    args = parser.parse_args(argv)
+
+    with open(args.base, "r", encoding="utf-8") as f:
+        raw_a = yaml.safe_load(f)
+    if args.candidate:
+        with open(args.candidate, "r", encoding="utf-8") as f:
+            raw_b = yaml.safe_load(f)
+    else:
+        raw_b = copy.deepcopy(raw_a)
+    for token in args.set:
+        apply_override(raw_b, token)
+    config_a, config_b = config_from_dict(raw_a), config_from_dict(raw_b)
+    seed = args.seed if args.seed is not None else config_a.seed
+
+    tolerances = {}
+    for token in args.tolerance:
+        metric, value = token.split("=", 1)
+        if metric not in METRICS:
+            parser.error(f"unknown metric in --tolerance: {metric}")
+        tolerances[metric] = float(value)
+
+    diffs = paired_compare(config_a, config_b, args.paths, args.pulls, seed=seed)
+
+    report = {"paths": args.paths, "pulls": args.pulls, "overrides": args.set, "metrics": {}}
+    failed = False
+    print("metric\tA\tB\tdiff\t95% CI\tvar_reduction\tstatus")
+    for name, d in diffs.items():
+        status = "-"
+        if name in tolerances:
+            tol = tolerances[name]
+            status = "FAIL" if d.ci_low > tol or d.ci_high < -tol else "PASS"
+            failed = failed or status == "FAIL"
+        report["metrics"][name] = {**asdict(d), "status": status}
+        print(
+            f"{name}\t{d.mean_a:.6f}\t{d.mean_b:.6f}\t{d.diff:+.6f}\t"
+            f"[{d.ci_low:+.6f}, {d.ci_high:+.6f}]\t{d.variance_reduction:.1f}x\t{status}"
+        )
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Saved comparison to: {out_path}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
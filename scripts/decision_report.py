@@ -3,16 +3,17 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
-import sys
+from typing import List, Optional, Tuple
 
 import joblib
-import pandas as pd
+import numpy as np
+import yaml
 
-ROOT = Path(__file__).resolve().parents[1]
-if str(ROOT) not in sys.path:
-    sys.path.insert(0, str(ROOT))
-
-from src.utils.utility_func import UtilityConfig, summarize_decision
+from src.analysis.report_state import ingest_appended, load_aggregates, model_fingerprints
+from src.models.calibration import StateTriples, reliability
+from src.simulation.engine import config_from_dict
+from src.simulation.exact import plan_outcome_distribution
+from src.utils.utility_func import certainty_equivalent, expected_utility_grid, plan_utility
 
 
 def load_model(path: str):
@@ -23,11 +24,62 @@ def load_model(path: str):
     return obj
 
 
-def predict_prob(model_obj, X: pd.DataFrame) -> pd.Series:
-    return pd.Series(model_obj.predict_proba(X)[:, 1])
+def plan_report(args, risks: List[float]) -> dict:
+    with open(args.config, "r", encoding="utf-8") as f:
+        raw = yaml.safe_load(f)
+    outcome = plan_outcome_distribution(config_from_dict(raw), args.plan_pulls, stop_after_targets=args.plan_stop)
+    utilities = plan_utility(outcome.pmf, args.plan_reward, args.plan_cost, risks)
+    ce = certainty_equivalent(utilities, risks)
+    return {
+        "pulls": args.plan_pulls,
+        "stop_after_targets": args.plan_stop,
+        "reward_per_target": args.plan_reward,
+        "cost_per_pull": args.plan_cost,
+        "expected_targets": outcome.expected_targets(),
+        "expected_pulls": outcome.expected_pulls(),
+        "targets_pmf": outcome.targets_pmf.tolist(),
+        "risk_curve": [
+            {"risk_aversion": r, "utility_score": float(u), "certainty_equivalent": float(c)}
+            for r, u, c in zip(risks, utilities, ce)
+        ],
+    }
 
 
-def main() -> None:
+def add_bootstrap_cis(summary: dict, bucket_ranges: List[Tuple[int, int]], aggs, risks: List[float], args) -> None:
+    """
+    Add a `<figure>_ci` interval next to every figure in risk_curve and
+    bucket_report, from a Poisson bootstrap on the per-state counts: all
+    replicates and ranges in one set of matrix products.
+    """
+    ranges = [(0, None)] + list(bucket_ranges)
+    boot = aggs.bootstrap_rates(ranges, args.bootstrap, np.random.default_rng(args.bootstrap_seed))
+    q = ((1 - args.ci_level) / 2, (1 + args.ci_level) / 2)
+    ci = {name: np.nanquantile(values, q, axis=0) for name, values in boot.items()}
+    # (risks, replicates, ranges)
+    utilities = expected_utility_grid(boot["prob_target_pred"].ravel(), 1.0, 1.0, risks)[:, :, 0, 0]
+    utility_ci = np.nanquantile(utilities.reshape(len(risks), args.bootstrap, len(ranges)), q, axis=1)
+
+    def interval(values: np.ndarray, j: int) -> List[float]:
+        return [float(values[0, j]), float(values[1, j])]
+
+    overall = {
+        "prob_five_star_ci": interval(ci["prob_five_star_pred"], 0),
+        "prob_target_given_five_ci": interval(ci["prob_target_given_five_pred"], 0),
+        "prob_target_ci": interval(ci["prob_target_pred"], 0),
+    }
+    summary.update(overall)
+    for i, row in enumerate(summary["risk_curve"]):
+        row.update(overall)
+        row["utility_score_ci"] = [float(utility_ci[0, i, 0]), float(utility_ci[1, i, 0])]
+    for j, row in enumerate(summary["bucket_report"], start=1):
+        for name in boot:
+            row[f"{name}_ci"] = interval(ci[name], j)
+        for i, entry in enumerate(row["utility_scores"]):
+            entry["utility_score_ci"] = [float(utility_ci[0, i, j]), float(utility_ci[1, i, j])]
+    summary["bootstrap"] = {"method": "poisson", "replicates": args.bootstrap, "level": args.ci_level}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     parser = argparse.ArgumentParser(description="Generate decision report from two-stage models.")
     parser.add_argument("--data", required=True, help="Processed dataset CSV")
     parser.add_argument(
@@ -46,15 +98,37 @@ def main() -> None:
         help="Comma-separated risk aversion coefficients",
     )
     parser.add_argument("--out", default="artifacts/decision_report.json", help="Output report path")
+    parser.add_argument(
+        "--state",
+        default=None,
+        help="Aggregate state file; later runs ingest only rows appended to --data since the last run",
+    )
+    parser.add_argument("--rebuild", action="store_true", help="Ignore --state and re-ingest all of --data")
     parser.add_argument(
         "--bucket",
         default="0-10,11-20,21-30,31-40,41-50,51-60,61-70,71-80,81-90",
         help="Pity bucket ranges like 0-10,11-20,...",
     )
-    args = parser.parse_args()
-
-    df = pd.read_csv(args.data)
-    X = df.drop(columns=["label_is_five_star", "label_is_target", "pull_index"], errors="ignore")
+    parser.add_argument(
+        "--bootstrap",
+        type=int,
+        default=1000,
+        help="Poisson bootstrap replicates for confidence intervals (0 disables)",
+    )
+    parser.add_argument("--ci_level", type=float, default=0.95, help="Confidence level of the intervals")
+    parser.add_argument("--bootstrap_seed", type=int, default=0)
+    parser.add_argument("--calibration_bins", type=int, default=10, help="Bins for the reliability curves")
+    parser.add_argument("--config", default=None, help="game_rules.yaml, required for --plan_pulls")
+    parser.add_argument(
+        "--plan_pulls",
+        type=int,
+        default=0,
+        help="Also score a plan of up to N pulls from zero pity over its exact outcome distribution",
+    )
+    parser.add_argument("--plan_stop", type=int, default=None, help="Stop the plan after this many targets")
+    parser.add_argument("--plan_reward", type=float, default=100.0, help="Value of one target, in pull units")
+    parser.add_argument("--plan_cost", type=float, default=1.0, help="Cost of one pull")
+    args = parser.parse_args(argv)
 
     stage_a_paths = [p.strip() for p in args.stageA.split(",") if p.strip()]
     stage_b_paths = [p.strip() for p in args.stageB.split(",") if p.strip()]
@@ -64,16 +138,22 @@ def main() -> None:
     models_a = [load_model(p) for p in stage_a_paths]
     models_b = [load_model(p) for p in stage_b_paths]
 
-    probs_a = [predict_prob(m, X) for m in models_a]
-    p_five = sum(probs_a) / len(probs_a)
-
-    df_five = df[df["label_is_five_star"] == 1].copy()
-    X_five = df_five.drop(columns=["label_is_five_star", "label_is_target", "pull_index"], errors="ignore")
-    probs_b = [predict_prob(m, X_five) for m in models_b]
-    p_target_given = sum(probs_b) / len(probs_b)
+    # Aggregates are keyed by model files, so replacing a model re-ingests everything.
+    data_path = Path(args.data)
+    state_path = Path(args.state) if args.state else None
+    aggs, reason = load_aggregates(
+        state_path, data_path, model_fingerprints(stage_a_paths), model_fingerprints(stage_b_paths), args.rebuild
+    )
+    if reason:
+        print(f"Rebuilding report state: {reason}")
+    new_rows = ingest_appended(aggs, data_path, models_a, models_b, state_path)
+    print(f"Ingested {new_rows} new rows ({aggs.rows} total)")
 
-    prob_five_star = float(p_five.mean())
-    prob_target_given_five = float(p_target_given.mean())
+    overall = aggs.rates()
+    if overall is None:
+        raise RuntimeError(f"no rows in {data_path}")
+    prob_five_star = overall["prob_five_star_pred"]
+    prob_target_given_five = overall["prob_target_given_five_pred"]
 
     risks = [float(r) for r in args.risk.split(",") if r.strip() != ""]
     summary = {
@@ -82,10 +162,18 @@ def main() -> None:
         "prob_target": prob_five_star * prob_target_given_five,
         "risk_curve": [],
     }
-    for r in risks:
-        line = summarize_decision(prob_five_star, prob_target_given_five, UtilityConfig(r))
-        line["risk_aversion"] = r
-        summary["risk_curve"].append(line)
+    # Unit reward/cost utility (decision_score) for every risk coefficient at once.
+    scores = expected_utility_grid(summary["prob_target"], 1.0, 1.0, risks)[:, 0, 0, 0]
+    for r, score in zip(risks, scores):
+        summary["risk_curve"].append(
+            {
+                "prob_five_star": prob_five_star,
+                "prob_target_given_five": prob_target_given_five,
+                "prob_target": summary["prob_target"],
+                "utility_score": float(score),
+                "risk_aversion": r,
+            }
+        )
 
     # Bucket report by pity_before
     buckets = []
@@ -96,44 +184,36 @@ def main() -> None:
         lo, hi = token.split("-")
         buckets.append((int(lo), int(hi)))
 
-    bucket_rows = []
+    bucket_rows, bucket_ranges = [], []
     for lo, hi in buckets:
-        sub = df[(df["pity_before"] >= lo) & (df["pity_before"] <= hi)]
-        if len(sub) == 0:
-            continue
-        X_sub = sub.drop(columns=["label_is_five_star", "label_is_target", "pull_index"], errors="ignore")
-        p_five_sub = sum(predict_prob(m, X_sub) for m in models_a) / len(models_a)
-
-        sub_five = sub[sub["label_is_five_star"] == 1]
-        if len(sub_five) == 0:
-            p_target_given = 0.0
-            empirical_target_given = 0.0
-        else:
-            X_sub_five = sub_five.drop(
-                columns=["label_is_five_star", "label_is_target", "pull_index"], errors="ignore"
-            )
-            p_target_given = float(
-                (sum(predict_prob(m, X_sub_five) for m in models_b) / len(models_b)).mean()
-            )
-            empirical_target_given = float(sub_five["label_is_target"].mean())
-
-        empirical_five = float(sub["label_is_five_star"].mean())
-
-        bucket_rows.append(
-            {
-                "bucket": f"{lo}-{hi}",
-                "samples": int(len(sub)),
-                "prob_five_star_pred": float(p_five_sub.mean()),
-                "prob_five_star_empirical": empirical_five,
-                "prob_target_given_five_pred": p_target_given,
-                "prob_target_given_five_empirical": empirical_target_given,
-                "prob_target_pred": float(p_five_sub.mean()) * p_target_given,
-                "prob_target_empirical": empirical_five * empirical_target_given,
-            }
-        )
+        rates = aggs.rates(lo, hi)
+        if rates is not None:
+            bucket_rows.append({"bucket": f"{lo}-{hi}", **rates})
+            bucket_ranges.append((lo, hi))
+
+    if bucket_rows:
+        bucket_scores = expected_utility_grid([row["prob_target_pred"] for row in bucket_rows], 1.0, 1.0, risks)
+        for i, row in enumerate(bucket_rows):
+            row["utility_scores"] = [
+                {"risk_aversion": r, "utility_score": float(u)} for r, u in zip(risks, bucket_scores[:, i, 0, 0])
+            ]
 
     summary["bucket_report"] = bucket_rows
 
+    if args.bootstrap > 0:
+        add_bootstrap_cis(summary, bucket_ranges, aggs, risks, args)
+
+    # Reliability of the fused predictions per stage, from the same per-state sums.
+    summary["calibration"] = {
+        "stageA": reliability(StateTriples.from_sums(*aggs.triples("A")), args.calibration_bins),
+        "stageB": reliability(StateTriples.from_sums(*aggs.triples("B")), args.calibration_bins),
+    }
+
+    if args.plan_pulls > 0:
+        if not args.config:
+            raise RuntimeError("--plan_pulls requires --config")
+        summary["plan_utility"] = plan_report(args, risks)
+
     out_path = Path(args.out)
     out_path.parent.mkdir(parents=True, exist_ok=True)
     out_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
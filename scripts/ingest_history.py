@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import List, Optional
+import sys
+
+import yaml
+
+from src.analysis.history_ingest import HistoryPosterior, export_rules, fit_check, ingest_file
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Stream real pull-history exports into Beta posteriors and export fitted rules."
+    )
+    parser.add_argument("--input", nargs="*", default=[], help="CSV / JSONL exports to ingest")
+    parser.add_argument(
+        "--state", default="artifacts/history_posterior.json", help="Posterior state file (created or updated)"
+    )
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="Rows per chunk")
+    parser.add_argument("--player_col", default="player_id", help="Player id column for raw exports")
+    parser.add_argument("--order_col", default=None, help="Column ordering a player's pulls within a chunk")
+    parser.add_argument(
+        "--prior", type=float, nargs=2, default=[1.0, 1.0], metavar=("ALPHA", "BETA"), help="Beta prior for new state"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Discard the saved state and rebuild it from the --input files (needed after an export is rewritten)",
+    )
+    parser.add_argument("--export", default=None, help="Write a fitted rules YAML here")
+    parser.add_argument("--base", default="configs/game_rules.yaml", help="Rules file the export starts from")
+    parser.add_argument("--summary", default=None, help="Optional JSON path for the posterior summary")
+    parser.add_argument(
+        "--fit_check",
+        action="store_true",
+        help="Only check the fit: simulate raw exports from --base, fit them and compare with --base (exit 1 on mismatch)",
+    )
+    parser.add_argument("--fit_check_pulls", type=int, default=800_000, help="Pulls simulated for --fit_check")
+    parser.add_argument("--fit_check_players", type=int, default=40, help="Players simulated for --fit_check")
+    args = parser.parse_args(argv)
+
+    if args.fit_check:
+        with open(args.base, "r", encoding="utf-8") as f:
+            base = yaml.safe_load(f)
+        result = fit_check(base, args.fit_check_pulls, args.fit_check_players)
+        for name, ok in result["checks"].items():
+            print(f"{name}: expected {result['expected'][name]}, fitted {result['fitted'][name]} -> {'PASS' if ok else 'FAIL'}")
+        if not result["passed"]:
+            sys.exit(1)
+        return
+
+    state_path = Path(args.state)
+    if args.force:
+        posterior = HistoryPosterior(prior=tuple(args.prior))
+    else:
+        posterior = HistoryPosterior.load(state_path, prior=tuple(args.prior))
+    for name in args.input:
+        rows = ingest_file(posterior, Path(name), args.chunksize, player_col=args.player_col, order_col=args.order_col)
+        print(f"{name}: {rows} new rows" if rows else f"{name}: no new rows")
+    posterior.save(state_path)
+    print(f"Saved posterior state to: {state_path} ({posterior.pulls} pulls, {len(posterior.files)} files)")
+
+    summary = posterior.summary()
+    for row in summary["target"]:
+        lo, hi = row["ci"]
+        print(
+            f"P(target | guarantee={row['guarantee']}, capture_counter={row['capture_counter']}) = "
+            f"{row['mean']:.4f} [{lo:.4f}, {hi:.4f}] over {row['five_stars']} five-stars"
+        )
+    if args.summary:
+        out = Path(args.summary)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+    if args.export:
+        with open(args.base, "r", encoding="utf-8") as f:
+            base = yaml.safe_load(f)
+        rules = export_rules(posterior, base)
+        out = Path(args.export)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(yaml.safe_dump(rules, sort_keys=False), encoding="utf-8")
+        fit = rules["fitted"]["hazard_fit"]
+        print(
+            f"Fitted hazard: base={fit['base']:.6f} soft_pity_start={fit['soft_pity_start']} "
+            f"mode={fit['soft_pity_mode']} step={fit['soft_pity_step']:.6f} hard_pity={fit['hard_pity']}"
+        )
+        for note in rules["fitted"]["notes"]:
+            print(f"Note: {note}")
+        print(f"Saved fitted rules to: {out}")
+
+
+if __name__ == "__main__":
+    main()
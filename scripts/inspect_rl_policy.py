@@ -3,12 +3,13 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
+from typing import List, Optional
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     parser = argparse.ArgumentParser(description="Inspect RL policy JSON.")
     parser.add_argument("--input", required=True, help="Path to rl_policy.json")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     policy = json.loads(Path(args.input).read_text(encoding="utf-8"))
 
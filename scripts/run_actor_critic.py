@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import asdict
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import yaml
+
+from src.models.actor_critic import ACConfig, evaluate_policy, train_actor_critic
+from src.models.rl_env import EnvConfig
+from src.simulation.engine import config_from_dict
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    defaults, env_defaults = ACConfig(), EnvConfig()
+    parser = argparse.ArgumentParser(description="Train a NumPy actor-critic policy on batched lockstep rollouts.")
+    parser.add_argument("--config", required=True, help="Path to game_rules.yaml")
+    parser.add_argument("--max_steps", type=int, default=env_defaults.max_steps, help="Steps per episode")
+    parser.add_argument("--budget", type=int, default=None, help="Pulls available per episode (default: unlimited)")
+    parser.add_argument("--pull_cost", type=float, default=env_defaults.pull_cost)
+    parser.add_argument("--reward_target", type=float, default=env_defaults.reward_target)
+    parser.add_argument("--reward_five_star", type=float, default=env_defaults.reward_five_star)
+    parser.add_argument("--envs", type=int, default=defaults.n_envs, help="Environments stepped in lockstep")
+    parser.add_argument("--rollout", type=int, default=defaults.rollout_steps, help="Steps per rollout")
+    parser.add_argument("--updates", type=int, default=defaults.updates, help="Rollout/update iterations")
+    parser.add_argument("--hidden", type=int, default=defaults.hidden)
+    parser.add_argument("--lr", type=float, default=defaults.lr)
+    parser.add_argument("--gamma", type=float, default=defaults.gamma)
+    parser.add_argument("--entropy", type=float, default=defaults.entropy_coef, help="Entropy bonus coefficient")
+    parser.add_argument("--epochs", type=int, default=defaults.epochs)
+    parser.add_argument("--minibatch", type=int, default=defaults.minibatch)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--eval_envs", type=int, default=20000, help="Episodes for the final greedy evaluation")
+    parser.add_argument("--log_every", type=int, default=20, help="Updates between progress lines")
+    parser.add_argument("--out", default="artifacts/actor_critic.npz", help="Weights path; a .json report is written beside it")
+    args = parser.parse_args(argv)
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        sim_config = config_from_dict(yaml.safe_load(f))
+    env_config = EnvConfig(
+        max_steps=args.max_steps,
+        pull_cost=args.pull_cost,
+        reward_target=args.reward_target,
+        reward_five_star=args.reward_five_star,
+        budget=args.budget,
+    )
+    cfg = ACConfig(
+        n_envs=args.envs,
+        rollout_steps=args.rollout,
+        updates=args.updates,
+        hidden=args.hidden,
+        lr=args.lr,
+        gamma=args.gamma,
+        entropy_coef=args.entropy,
+        epochs=args.epochs,
+        minibatch=args.minibatch,
+        seed=args.seed,
+    )
+
+    def log(row) -> None:
+        if row["update"] % args.log_every == 0 or row["update"] == cfg.updates:
+            ret = row["mean_episode_return"]
+            ret = f"{ret:.3f}" if ret is not None else "-"
+            print(
+                f"update {row['update']}: return {ret}, pull rate {row['pull_rate']:.3f}, "
+                f"{row['env_steps_per_sec'] / 1e6:.2f}M env-steps/s"
+            )
+
+    model, history = train_actor_critic(sim_config, env_config, cfg, log=log)
+
+    seed = args.seed + 1
+    evaluation = {
+        "actor_critic": evaluate_policy(sim_config, env_config, model.greedy, args.eval_envs, seed),
+        "always_pull": evaluate_policy(sim_config, env_config, lambda x: np.ones(len(x), np.int8), args.eval_envs, seed),
+        "never_pull": evaluate_policy(sim_config, env_config, lambda x: np.zeros(len(x), np.int8), args.eval_envs, seed),
+    }
+    for name, e in evaluation.items():
+        print(f"{name}\treturn {e['mean_return']:.4f} ± {e['std_error']:.4f}\tpulls {e['mean_pull_actions']:.1f}")
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    model.save(out_path)
+    report = {
+        "env": asdict(env_config),
+        "actor_critic": asdict(cfg),
+        "env_steps": history[-1]["env_steps"] if history else 0,
+        "env_steps_per_sec": history[-1]["env_steps_per_sec"] if history else None,
+        "evaluation": evaluation,
+        "history": history,
+    }
+    report_path = out_path.with_suffix(".json")
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Saved weights to: {out_path}")
+    print(f"Saved report to: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import List, Optional
+import time
+
+import yaml
+
+from src.simulation.engine import config_from_dict
+from src.simulation.population import default_profile, profiles_from_dict, simulate_population
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Simulate a population of players with heterogeneous budgets.")
+    parser.add_argument("--config", required=True, help="Path to game_rules.yaml")
+    parser.add_argument(
+        "--population",
+        default=None,
+        help="Path to population.yaml (default: one profile from the resources block)",
+    )
+    parser.add_argument("--players", type=int, default=1_000_000, help="Number of players to simulate")
+    parser.add_argument("--chunk", type=int, default=1_000_000, help="Players simulated per vectorized chunk")
+    parser.add_argument("--seed", type=int, default=None, help="Override random seed")
+    parser.add_argument("--out", default="artifacts/population_report.json", help="Output report path")
+    args = parser.parse_args(argv)
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        raw = yaml.safe_load(f)
+    if args.seed is not None:
+        raw.setdefault("random", {})["seed"] = args.seed
+    sim_config = config_from_dict(raw)
+    resources = raw.get("resources", {})
+
+    if args.population:
+        with open(args.population, "r", encoding="utf-8") as f:
+            pop_raw = yaml.safe_load(f)
+        profiles = profiles_from_dict(pop_raw, resources)
+    else:
+        profiles = [default_profile(resources)]
+
+    start = time.perf_counter()
+    report = simulate_population(sim_config, profiles, args.players, chunk_size=args.chunk, seed=sim_config.seed)
+    elapsed = time.perf_counter() - start
+    report["elapsed_sec"] = elapsed
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(f"Simulated {args.players} players in {elapsed:.2f}s")
+    for name, stats in report["profiles"].items():
+        print(
+            f"{name}: players={stats['players']} "
+            f"P(>=1 target)={stats['prob_at_least_one_target']:.4f} "
+            f"pulls_p50={stats['pulls_spent']['quantiles']['p50']} "
+            f"leftover_p50={stats['leftover_pulls']['quantiles']['p50']}"
+        )
+    print(f"Saved population report to: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
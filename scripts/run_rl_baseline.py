@@ -2,33 +2,69 @@ from __future__ import annotations
 
 import argparse
 import json
+import random
 from pathlib import Path
-import sys
+from typing import List, Optional
 
 import yaml
 
-ROOT = Path(__file__).resolve().parents[1]
-if str(ROOT) not in sys.path:
-    sys.path.insert(0, str(ROOT))
-
 from src.simulation.engine import config_from_dict
 from src.models.rl_env import GachaEnv, EnvConfig
-from src.models.rl_baseline import QConfig, q_learn, derive_policy
+from src.models.rl_baseline import QConfig, QProgress, q_learn, derive_policy
+from src.utils.checkpoint import load_checkpoint, rng_state_from_json, rng_state_to_json, save_checkpoint
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     parser = argparse.ArgumentParser(description="Run Q-learning baseline and save policy.")
     parser.add_argument("--config", required=True, help="Path to game_rules.yaml")
     parser.add_argument("--episodes", type=int, default=200)
     parser.add_argument("--pity_bucket", type=int, default=5)
     parser.add_argument("--out", default="artifacts/rl_policy.json")
-    args = parser.parse_args()
+    parser.add_argument("--seed", type=int, default=None, help="Seed for exploration (default: unseeded)")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file for Q-table, epsilon and RNG states")
+    parser.add_argument("--checkpoint_every", type=int, default=50, help="Episodes between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="Continue from --checkpoint if it exists")
+    args = parser.parse_args(argv)
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
 
-    cfg = yaml.safe_load(open(args.config, "r", encoding="utf-8"))
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
     env = GachaEnv(config_from_dict(cfg), EnvConfig())
-
     qcfg = QConfig(episodes=args.episodes, pity_bucket=args.pity_bucket)
-    q = q_learn(env, qcfg)
+    rng = random.Random(args.seed)
+
+    checkpoint = Path(args.checkpoint) if args.checkpoint else None
+    progress = QProgress()
+    settings = {"config": json.loads(json.dumps(cfg, default=str)), "qconfig": qcfg.__dict__, "seed": args.seed}
+    ck = load_checkpoint(checkpoint) if (checkpoint is not None and args.resume) else None
+    if ck is not None:
+        if ck["settings"] != settings:
+            parser.error(f"checkpoint {checkpoint} was written with different settings")
+        # Episodes start with env.reset(), so the engine RNG is its only carried state.
+        env.engine.rng.setstate(rng_state_from_json(ck["env_rng"]))
+        rng.setstate(rng_state_from_json(ck["rng"]))
+        progress = QProgress(
+            episode=ck["episode"], epsilon=ck["epsilon"], q={tuple(k): v for *k, v in ck["q"]}
+        )
+        print(f"Resuming at episode {progress.episode}/{qcfg.episodes}")
+
+    def on_episode(p: QProgress) -> None:
+        if checkpoint is None or (p.episode % args.checkpoint_every and p.episode < qcfg.episodes):
+            return
+        save_checkpoint(
+            checkpoint,
+            {
+                "settings": settings,
+                "episode": p.episode,
+                "epsilon": p.epsilon,
+                "q": [[*k, v] for k, v in p.q.items()],
+                "rng": rng_state_to_json(rng.getstate()),
+                "env_rng": rng_state_to_json(env.engine.rng.getstate()),
+            },
+        )
+
+    q = q_learn(env, qcfg, rng=rng, progress=progress, on_episode=on_episode)
     policy = derive_policy(q)
     policy_serializable = {f"{k[0]}|{k[1]}|{k[2]}": v for k, v in policy.items()}
 
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import yaml
+
+from src.simulation.engine import State, config_from_dict
+from src.simulation.rollout import rollout_states
+
+
+def parse_state(token: str) -> State:
+    pity, guarantee, capture = [int(x) for x in token.split(",")]
+    return State(pulls_since_five_star=pity, guarantee=bool(guarantee), capture_counter=capture)
+
+
+def load_states_csv(path: str) -> List[State]:
+    with open(path, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        return [
+            State(
+                pulls_since_five_star=int(row["pity"]),
+                guarantee=bool(int(row["guarantee"])),
+                capture_counter=int(row["capture_counter"]),
+            )
+            for row in reader
+        ]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Batched conditional rollouts from given starting states.")
+    parser.add_argument("--config", required=True, help="Path to game_rules.yaml")
+    parser.add_argument(
+        "--state",
+        action="append",
+        default=[],
+        help="Starting state as pity,guarantee,capture_counter (repeatable), e.g. 63,1,1",
+    )
+    parser.add_argument("--states_csv", default=None, help="CSV with pity,guarantee,capture_counter columns")
+    parser.add_argument("--paths", type=int, default=10000, help="Continuations per starting state")
+    parser.add_argument("--horizon", type=int, default=180, help="Maximum pulls per continuation")
+    parser.add_argument("--seed", type=int, default=None, help="Override random seed")
+    parser.add_argument("--out", default="artifacts/rollouts.json", help="Output report path")
+    args = parser.parse_args(argv)
+
+    states = [parse_state(t) for t in args.state]
+    if args.states_csv:
+        states.extend(load_states_csv(args.states_csv))
+    if not states:
+        parser.error("provide at least one --state or --states_csv")
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        raw = yaml.safe_load(f)
+    sim_config = config_from_dict(raw)
+    seed = args.seed if args.seed is not None else sim_config.seed
+    results = rollout_states(sim_config, states, args.paths, args.horizon, seed=seed)
+    report = [r.summary() for r in results]
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print("pity\tguarantee\tcapture\tP(5*)\tmean_5*\tP(target)\tmean_target")
+    for r in report:
+        s, five, target = r["start"], r["time_to_five_star"], r["time_to_target"]
+        print(
+            f"{s['pity']}\t{s['guarantee']}\t{s['capture_counter']}\t"
+            f"{five['prob_within_horizon']:.4f}\t{five['mean_if_reached'] or float('nan'):.2f}\t"
+            f"{target['prob_within_horizon']:.4f}\t{target['mean_if_reached'] or float('nan'):.2f}"
+        )
+    print(f"Saved rollouts to: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import List, Optional
+import time
+
+import yaml
+
+from src.simulation.population import default_profile, profiles_from_dict
+from src.simulation.scenario import season_from_dict, simulate_season
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Simulate a player population through a schedule of banners with shared pity state."
+    )
+    parser.add_argument("--season", required=True, help="Path to season.yaml")
+    parser.add_argument("--rules", default=None, help="Default rules file (overrides the season's `rules`)")
+    parser.add_argument(
+        "--population",
+        default=None,
+        help="population.yaml (overrides the season's `population`; default: one profile from the resources block)",
+    )
+    parser.add_argument("--players", type=int, default=1_000_000, help="Number of players to simulate")
+    parser.add_argument("--chunk", type=int, default=1_000_000, help="Players simulated per vectorized chunk")
+    parser.add_argument("--seed", type=int, default=None, help="Override random seed")
+    parser.add_argument("--out", default="artifacts/season_report.json", help="Output report path")
+    args = parser.parse_args(argv)
+
+    with open(args.season, "r", encoding="utf-8") as f:
+        season_raw = yaml.safe_load(f)
+    rules_path = args.rules or season_raw.get("rules")
+    if not rules_path:
+        parser.error("no rules file: set `rules` in the season file or pass --rules")
+    with open(rules_path, "r", encoding="utf-8") as f:
+        base_rules = yaml.safe_load(f)
+    resources = base_rules.get("resources", {})
+    population_path = args.population or season_raw.get("population")
+    if population_path:
+        with open(population_path, "r", encoding="utf-8") as f:
+            population_raw = yaml.safe_load(f)
+        profiles = profiles_from_dict(population_raw, resources)
+    else:
+        profiles = [default_profile(resources)]
+    season = season_from_dict(season_raw, base_rules, profiles)
+    seed = args.seed if args.seed is not None else base_rules.get("random", {}).get("seed")
+
+    start = time.perf_counter()
+    report = simulate_season(season, args.players, chunk_size=args.chunk, seed=seed)
+    elapsed = time.perf_counter() - start
+    report["elapsed_sec"] = elapsed
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(f"Simulated {args.players} players through {len(season.banners)} banners in {elapsed:.2f}s")
+    for name, stats in report["banners"].items():
+        print(
+            f"{name} [{stats['pity_group']}]: participants={stats['participants']} "
+            f"P(>=1 target)={stats['prob_at_least_one_target']:.4f} "
+            f"pulls_p50={stats['pulls_spent']['quantiles']['p50']}"
+        )
+    for name, stats in report["profiles"].items():
+        print(
+            f"season {name}: players={stats['players']} "
+            f"targets_mean={stats['targets']['mean']:.3f} "
+            f"leftover_p50={stats['leftover_pulls']['quantiles']['p50']}"
+        )
+    print(f"Saved season report to: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
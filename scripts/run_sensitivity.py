@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import asdict
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import yaml
+
+from src.analysis.sensitivity import sensitivity_run
+from src.simulation.engine import config_from_dict
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Rates plus likelihood-ratio gradients w.r.t. each continuous rule parameter, from one run."
+    )
+    parser.add_argument("--config", required=True, help="Path to game_rules.yaml")
+    parser.add_argument("--paths", type=int, default=100000, help="Independent paths")
+    parser.add_argument("--pulls", type=int, default=90, help="Pulls per path")
+    parser.add_argument("--seed", type=int, default=None, help="Override random seed")
+    parser.add_argument("--out", default="artifacts/sensitivity.json", help="Output report path")
+    args = parser.parse_args(argv)
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = config_from_dict(yaml.safe_load(f))
+    seed = args.seed if args.seed is not None else config.seed
+    result = sensitivity_run(config, args.paths, args.pulls, seed=seed)
+
+    print("metric\tvalue\tparameter\tgradient\tstd_error\telasticity")
+    for metric, value in result["metrics"].items():
+        for s in result["sensitivities"]:
+            if s.metric != metric:
+                continue
+            if not s.estimable:
+                grad = "n/a (parameter at 0 or 1)"
+            else:
+                elasticity = f"{s.elasticity:+.4f}" if s.elasticity is not None else "-"
+                grad = f"{s.gradient:+.6g}\t{s.std_error:.3g}\t{elasticity}"
+            print(f"{metric}\t{value:.6f}\t{s.parameter}\t{grad}")
+
+    report = {
+        "paths": result["paths"],
+        "pulls": result["horizon"],
+        "metrics": result["metrics"],
+        # NaN (not estimable) is written as null.
+        "sensitivities": [
+            {k: (None if isinstance(v, float) and v != v else v) for k, v in asdict(s).items()}
+            for s in result["sensitivities"]
+        ],
+    }
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Saved sensitivities to: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,77 +3,222 @@ from __future__ import annotations
 import argparse
 import csv
 from datetime import datetime
+import json
+import os
 from pathlib import Path
-import sys
+from typing import List, Optional, Tuple
+
+from src.utils.checkpoint import load_checkpoint, rng_state_from_json, rng_state_to_json, save_checkpoint
+
+
+RAW_COLUMNS = [
+    "pull_index",
+    "pity_before",
+    "guarantee_before",
+    "capture_counter_before",
+    "is_five_star",
+    "is_target",
+    "pity",
+    "guarantee_after",
+    "capture_counter_after",
+]
+
+
+def run_sim(
+    config_path: str,
+    n_pulls: int,
+    output_dir: str,
+    seed_override: int | None,
+    checkpoint: Path | None = None,
+    checkpoint_every: int = 1_000_000,
+    resume: bool = False,
+) -> Path:
+    """
+    Simulate `n_pulls` pulls and stream them to a raw CSV log in blocks of
+    `checkpoint_every`. With `checkpoint`, each block ends by fsyncing the
+    log and saving engine state, RNG state and the log's byte offset;
+    `resume` truncates the log to that offset and continues, producing the
+    same file as an uninterrupted run.
+    """
+    # Imported on use, like NumPy below, so `--help` starts fast.
+    from dataclasses import asdict
+
+    import yaml
+
+    from src.simulation.engine import GachaEngine, State, config_from_dict
+
+    # libyaml's loader when PyYAML was built with it: the pure-Python one
+    # is a noticeable share of a short run's wall time.
+    with open(config_path, "r", encoding="utf-8") as f:
+        raw_config = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
 
-import yaml
+    if seed_override is not None:
+        raw_config.setdefault("random", {})["seed"] = seed_override
+
+    engine = GachaEngine(config_from_dict(raw_config))
+    engine.reset()
+    # Checkpoints store the config as JSON; compare in that form.
+    raw_config = json.loads(json.dumps(raw_config, default=str))
+
+    ck = load_checkpoint(checkpoint) if (checkpoint is not None and resume) else None
+    if ck is not None:
+        if ck["config"] != raw_config or ck["n_pulls"] != n_pulls:
+            raise ValueError(f"checkpoint {checkpoint} was written for a different config or --pulls")
+        out_path = Path(ck["output"])
+        if ck.get("complete"):
+            return out_path
+        engine.restore(State(**ck["state"]))
+        engine.rng.setstate(rng_state_from_json(ck["rng"]))
+        done = ck["pulls_done"]
+        f = out_path.open("r+", newline="", encoding="utf-8")
+        # Rows written after the last checkpoint are redone.
+        f.truncate(ck["offset"])
+        f.seek(ck["offset"])
+    else:
+        out_dir = Path(output_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        out_path = out_dir / f"sim_raw_{stamp}.csv"
+        f = out_path.open("w", newline="", encoding="utf-8")
+        csv.writer(f).writerow(RAW_COLUMNS)
+        done = 0
+
+    with f:
+        writer = csv.writer(f)
+        while done < n_pulls:
+            block = min(checkpoint_every, n_pulls - done)
+            for i in range(done + 1, done + block + 1):
+                r = engine.pull_once()
+                writer.writerow(
+                    [
+                        i,
+                        r.pity_before,
+                        int(r.guarantee_before),
+                        r.capture_counter_before,
+                        int(r.is_five_star),
+                        int(r.is_target),
+                        r.pity,
+                        int(r.guarantee_after),
+                        r.capture_counter_after,
+                    ]
+                )
+            done += block
+            if checkpoint is not None:
+                f.flush()
+                os.fsync(f.fileno())
+                save_checkpoint(
+                    checkpoint,
+                    {
+                        "config": raw_config,
+                        "n_pulls": n_pulls,
+                        "output": str(out_path),
+                        "offset": f.tell(),
+                        "pulls_done": done,
+                        "state": asdict(engine.state),
+                        "rng": rng_state_to_json(engine.rng.getstate()),
+                        "complete": done >= n_pulls,
+                    },
+                )
 
-ROOT = Path(__file__).resolve().parents[1]
-if str(ROOT) not in sys.path:
-    sys.path.insert(0, str(ROOT))
+    return out_path
 
-from src.simulation.engine import GachaEngine, config_from_dict
 
+def run_stratified(
+    config_path: str,
+    output_dir: str,
+    seed_override: int | None,
+    strata_path: str | None = None,
+    per_stratum: int = 20000,
+    pity_edges: List[int] | None = None,
+) -> Tuple[Path, Path]:
+    """
+    Stratified mode: one pull from each of many starting states chosen per
+    stratum (from a strata YAML, else a pity band x guarantee x
+    capture_counter grid with `per_stratum` rows each), so rare states get
+    as many rows as common ones. The raw log gets `stratum` and importance
+    `weight` columns; returns it and a JSON summary of the design.
+    """
+    # NumPy is imported here so plain runs keep the fast startup.
+    import numpy as np
+    import yaml
+
+    from src.simulation.columns import write_raw_csv
+    from src.simulation.engine import config_from_dict
+    from src.simulation.stratified import (
+        default_pity_edges,
+        design_strata,
+        grid_strata,
+        sample_stratified,
+        strata_from_dict,
+    )
 
-def run_sim(config_path: str, n_pulls: int, output_dir: str, seed_override: int | None) -> Path:
     with open(config_path, "r", encoding="utf-8") as f:
         raw_config = yaml.safe_load(f)
-
     if seed_override is not None:
         raw_config.setdefault("random", {})["seed"] = seed_override
+    config = config_from_dict(raw_config)
 
-    engine = GachaEngine(config_from_dict(raw_config))
-    engine.reset()
-    results = engine.run(n_pulls)
+    if strata_path:
+        with open(strata_path, "r", encoding="utf-8") as f:
+            strata = strata_from_dict(yaml.safe_load(f))
+    else:
+        strata = grid_strata(config, pity_edges or default_pity_edges(config), per_stratum)
+    design = design_strata(config, strata)
+    columns = sample_stratified(config, design, np.random.default_rng(config.seed))
 
     out_dir = Path(output_dir)
-    out_dir.mkdir(parents=True, exist_ok=True)
-
     stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_path = out_dir / f"sim_raw_{stamp}.csv"
+    out_path = write_raw_csv(columns, out_dir / f"sim_stratified_{stamp}.csv")
+    summary_path = out_dir / f"sim_stratified_{stamp}_strata.json"
+    summary_path.write_text(
+        json.dumps({"rows": design.rows, "strata": design.summary()}, indent=2), encoding="utf-8"
+    )
+    return out_path, summary_path
 
-    with out_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(
-            [
-                "pull_index",
-                "pity_before",
-                "guarantee_before",
-                "capture_counter_before",
-                "is_five_star",
-                "is_target",
-                "pity",
-                "guarantee_after",
-                "capture_counter_after",
-            ]
-        )
-        for i, r in enumerate(results, start=1):
-            writer.writerow(
-                [
-                    i,
-                    r.pity_before,
-                    int(r.guarantee_before),
-                    r.capture_counter_before,
-                    int(r.is_five_star),
-                    int(r.is_target),
-                    r.pity,
-                    int(r.guarantee_after),
-                    r.capture_counter_after,
-                ]
-            )
 
-    return out_path
-
-
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     parser = argparse.ArgumentParser(description="Run Monte Carlo simulations and persist raw logs.")
     parser.add_argument("--config", required=True, help="Path to game_rules.yaml")
     parser.add_argument("--pulls", type=int, default=100000, help="Number of pulls to simulate")
     parser.add_argument("--output", default="data/raw", help="Output directory")
     parser.add_argument("--seed", type=int, default=None, help="Override random seed")
-    args = parser.parse_args()
-
-    out_path = run_sim(args.config, args.pulls, args.output, args.seed)
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file, updated after every block of pulls")
+    parser.add_argument("--checkpoint_every", type=int, default=1_000_000, help="Pulls per checkpoint block")
+    parser.add_argument("--resume", action="store_true", help="Continue from --checkpoint if it exists")
+    parser.add_argument(
+        "--stratified",
+        action="store_true",
+        help="Sample single pulls from chosen starting states with per-stratum quotas and importance weights",
+    )
+    parser.add_argument(
+        "--strata", default=None, help="Strata YAML for --stratified (e.g. configs/strata.yaml; default: a grid)"
+    )
+    parser.add_argument("--per_stratum", type=int, default=20000, help="Rows per grid stratum for --stratified")
+    parser.add_argument(
+        "--pity_edges",
+        default=None,
+        help="Comma-separated pity band starts for the --stratified grid (default: 10-wide, 4-wide in soft pity)",
+    )
+    args = parser.parse_args(argv)
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
+    if args.strata:
+        args.stratified = True
+    if args.stratified:
+        if args.checkpoint:
+            parser.error("--checkpoint is not supported with --stratified")
+        edges = [int(e) for e in args.pity_edges.split(",")] if args.pity_edges else None
+        out_path, summary_path = run_stratified(
+            args.config, args.output, args.seed, args.strata, args.per_stratum, edges
+        )
+        print(f"Wrote stratified simulation log to: {out_path}")
+        print(f"Wrote strata summary to: {summary_path}")
+        return
+
+    checkpoint = Path(args.checkpoint) if args.checkpoint else None
+    out_path = run_sim(
+        args.config, args.pulls, args.output, args.seed, checkpoint, args.checkpoint_every, args.resume
+    )
     print(f"Wrote raw simulation log to: {out_path}")
 
 
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import asdict
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import yaml
+
+from src.analysis.rare_event import (
+    Proposal,
+    at_most_targets,
+    estimate_tail,
+    lost_5050_streak,
+    no_target_within,
+    tune_proposal,
+)
+from src.simulation.engine import State, config_from_dict
+
+
+def build_predicate(args):
+    if args.event == "no_target_within":
+        return no_target_within(args.pulls)
+    if args.event == "lost_5050_streak":
+        return lost_5050_streak(args.k)
+    return at_most_targets(args.targets, args.pulls)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Importance-sampling estimate of rare tail-event probabilities.")
+    parser.add_argument("--config", required=True, help="Path to game_rules.yaml")
+    parser.add_argument(
+        "--event",
+        choices=["no_target_within", "lost_5050_streak", "at_most_targets"],
+        default="no_target_within",
+    )
+    parser.add_argument("--pulls", type=int, default=180, help="Horizon in pulls")
+    parser.add_argument("--k", type=int, default=3, help="Streak length for lost_5050_streak")
+    parser.add_argument("--targets", type=int, default=0, help="Target count for at_most_targets")
+    parser.add_argument("--start", default="0,0,0", help="Starting state pity,guarantee,capture_counter")
+    parser.add_argument("--paths", type=int, default=200000)
+    parser.add_argument("--hazard_scale", type=float, default=1.0, help="Proposal multiplier on five-star hazard")
+    parser.add_argument("--rate_up_win", type=float, default=None, help="Proposal 50/50 win probability")
+    parser.add_argument("--capture_prob", type=float, default=None, help="Proposal capture probability")
+    parser.add_argument("--auto", action="store_true", help="Pick the proposal from a pilot grid search")
+    parser.add_argument("--seed", type=int, default=None, help="Override random seed")
+    parser.add_argument("--out", default="artifacts/tail_risk.json", help="Output report path")
+    args = parser.parse_args(argv)
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        raw = yaml.safe_load(f)
+    sim_config = config_from_dict(raw)
+    seed = args.seed if args.seed is not None else sim_config.seed
+    pity, guarantee, capture = [int(x) for x in args.start.split(",")]
+    start = State(pulls_since_five_star=pity, guarantee=bool(guarantee), capture_counter=capture)
+    predicate = build_predicate(args)
+    horizon = max(args.pulls, 1)
+
+    proposal = Proposal(args.hazard_scale, args.rate_up_win, args.capture_prob)
+    if args.auto:
+        grid = [
+            Proposal(scale, win, cap)
+            for scale in (0.05, 0.2, 0.5, 1.0)
+            for win in (0.05, 0.2, sim_config.target_prob_no_guarantee)
+            for cap in (0.05, 0.2, sim_config.capture_prob)
+        ]
+        proposal = tune_proposal(sim_config, predicate, horizon, grid, start=start, seed=seed)[0]["proposal"]
+
+    est = estimate_tail(sim_config, predicate, horizon, args.paths, proposal, start=start, seed=seed)
+    lo, hi = est.ci()
+    report = {"event": args.event, "horizon": horizon, "proposal": asdict(proposal), "estimate": asdict(est)}
+    report["estimate"]["ci95"] = [lo, hi]
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(f"P({args.event}) = {est.probability:.6e}  95% CI [{lo:.6e}, {hi:.6e}]")
+    print(f"Relative error: {est.relative_error:.4f}  ESS: {est.effective_sample_size:.1f}  tail hits: {est.tail_hits}")
+    print(f"Proposal: {asdict(proposal)}")
+    print(f"Saved tail-risk report to: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+from typing import List, Optional
+import time
+
+import numpy as np
+import yaml
+
+from src.simulation.engine import GachaEngine, State, config_from_dict
+from src.simulation.job_service import SimRequest, SimulationService, handle_connection
+
+
+async def serve(args) -> None:
+    service = SimulationService(
+        window=args.window_ms / 1000.0, max_batch_paths=args.max_batch_paths, workers=args.workers, seed=args.seed
+    )
+    server = await asyncio.start_server(lambda r, w: handle_connection(service, r, w), args.host, args.port)
+    print(f"Simulation service listening on {args.host}:{args.port} (JSON lines; ops: simulate, metrics)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def bench_requests(rules: dict, n: int, paths: int, seed: int) -> List[SimRequest]:
+    """Peak-hour mix: random start states and budgets on one rules version, with some exact repeats."""
+    rng = np.random.default_rng(seed)
+    requests = []
+    for _ in range(n):
+        if requests and rng.random() < 0.1:
+            requests.append(requests[int(rng.integers(len(requests)))])
+            continue
+        requests.append(
+            SimRequest(
+                rules=rules,
+                pity=int(rng.integers(0, 80)),
+                guarantee=bool(rng.random() < 0.4),
+                capture_counter=int(rng.integers(0, 2)),
+                budget=int(rng.integers(20, 181)),
+                paths=paths,
+                stop_after_targets=1,
+            )
+        )
+    return requests
+
+
+def engine_request(rules: dict, request: SimRequest) -> None:
+    """The per-request baseline: one GachaEngine stepping every path in Python."""
+    engine = GachaEngine(config_from_dict(rules))
+    start = State(request.pity, request.guarantee, request.capture_counter)
+    for _ in range(request.paths):
+        engine.restore(start)
+        targets = 0
+        for _ in range(request.budget):
+            targets += engine.pull_once().is_target
+            if targets >= request.stop_after_targets:
+                break
+
+
+async def bench(args) -> None:
+    with open(args.config, "r", encoding="utf-8") as f:
+        rules = yaml.safe_load(f)
+    requests = bench_requests(rules, args.bench, args.paths, args.seed or 0)
+    report = {"requests": len(requests), "paths_per_request": args.paths}
+    for name, coalesce in (("per_request_batches", False), ("coalesced", True)):
+        service = SimulationService(
+            window=args.window_ms / 1000.0,
+            max_batch_paths=args.max_batch_paths,
+            workers=args.workers,
+            seed=args.seed,
+            coalesce=coalesce,
+        )
+        start = time.perf_counter()
+        await asyncio.gather(*(service.submit(r) for r in requests))
+        elapsed = time.perf_counter() - start
+        metrics = service.metrics()
+        service.close()
+        report[name] = {"elapsed_sec": elapsed, "requests_per_sec": len(requests) / elapsed, "metrics": metrics}
+        print(
+            f"{name}: {len(requests) / elapsed:.1f} req/s, {metrics['batches']} batches, "
+            f"{metrics['deduplicated']} deduplicated, latency p50 {metrics['latency_ms']['p50']:.1f} ms "
+            f"p95 {metrics['latency_ms']['p95']:.1f} ms"
+        )
+
+    sample = requests[: args.engine_sample]
+    if sample:
+        start = time.perf_counter()
+        for r in sample:
+            engine_request(rules, r)
+        per_request = (time.perf_counter() - start) / len(sample)
+        report["engine_per_request"] = {"sampled": len(sample), "sec_per_request": per_request, "requests_per_sec": 1 / per_request}
+        print(f"engine_per_request (GachaEngine, {len(sample)} sampled): {1 / per_request:.1f} req/s")
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Saved benchmark to: {out_path}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Local asyncio simulation job service with request coalescing and deduplication."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--window_ms", type=float, default=5.0, help="How long compatible requests are collected into one batch")
+    parser.add_argument("--max_batch_paths", type=int, default=2_000_000, help="Paths per batch before it is dispatched early")
+    parser.add_argument("--workers", type=int, default=1, help="Batches run concurrently on this many threads")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for unseeded requests")
+    parser.add_argument("--bench", type=int, default=0, help="Instead of serving: run an in-process load test of N requests")
+    parser.add_argument("--config", default="configs/game_rules.yaml", help="Rules for --bench")
+    parser.add_argument("--paths", type=int, default=2000, help="Paths per request for --bench")
+    parser.add_argument("--engine_sample", type=int, default=3, help="Requests timed on GachaEngine for --bench (0 skips)")
+    parser.add_argument("--out", default=None, help="Benchmark report path for --bench")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(bench(args) if args.bench else serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
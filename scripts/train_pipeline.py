@@ -1,72 +1,203 @@
 from __future__ import annotations
 
 import argparse
+from dataclasses import asdict
 import json
+import os
 from pathlib import Path
-import sys
+from typing import List, Optional
 
 import joblib
+import yaml
 
-ROOT = Path(__file__).resolve().parents[1]
-if str(ROOT) not in sys.path:
-    sys.path.insert(0, str(ROOT))
+from src.models.ml_agent import GBDT_BACKENDS, load_dataset, select_features, train_parallel
+from src.models.feature_factory import WEIGHT_COLUMN, write_features_csv
+from src.models.pipeline import build_tasks, configure_tasks, simulate_features
+from src.simulation.columns import write_raw_csv
+from src.models.hparam_search import learner_space_from_dict, search_config_from_dict, successive_halving
+from src.models.stream_agent import StreamSpec, read_columns, train_streaming
 
-from src.models.ml_agent import (
-    load_dataset,
-    select_features,
-    train_random_forest,
-    train_gbdt,
-)
 
-
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     parser = argparse.ArgumentParser(description="Train ML model for Gacha decision.")
-    parser.add_argument("--data", required=True, help="Path to processed dataset CSV")
+    parser.add_argument("--data", default=None, help="Path to processed dataset CSV")
+    parser.add_argument(
+        "--sim_config",
+        default=None,
+        help="Instead of --data: simulate from this game_rules.yaml and train in memory (no CSV round trip)",
+    )
+    parser.add_argument("--pulls", type=int, default=100000, help="Pulls to simulate with --sim_config")
+    parser.add_argument("--seed", type=int, default=None, help="Override random seed with --sim_config")
+    parser.add_argument("--save_raw", default=None, help="With --sim_config: also write the raw log CSV here")
+    parser.add_argument("--save_features", default=None, help="With --sim_config: also write the feature CSV here")
     parser.add_argument("--label", default="label_is_target", help="Label column name")
-    parser.add_argument("--model", choices=["random_forest", "gbdt", "both", "two_stage"], default="random_forest")
+    parser.add_argument(
+        "--model",
+        choices=["random_forest", "gbdt", "both", "two_stage", "sgd", "naive_bayes"],
+        default="random_forest",
+        help="sgd and naive_bayes are incremental learners and require --streaming",
+    )
     parser.add_argument("--out_dir", default="artifacts", help="Output directory")
-    args = parser.parse_args()
-
-    df = load_dataset(args.data)
-    df, label_col = select_features(df, args.label)
-    if args.model != "two_stage":
-        if label_col == "label_is_target" and "label_is_five_star" in df.columns:
-            df = df[df["label_is_five_star"] == 1].copy()
-            df.drop(columns=["label_is_five_star"], inplace=True)
-    drop_cols = [c for c in ["pull_index"] if c in df.columns]
-    if drop_cols:
-        df.drop(columns=drop_cols, inplace=True)
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Read the dataset in chunks (out-of-core); tree models fit on a reservoir sample",
+    )
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="Rows per chunk in streaming mode")
+    parser.add_argument(
+        "--reservoir", type=int, default=1_000_000, help="Reservoir sample size for tree models in streaming mode"
+    )
+    parser.add_argument(
+        "--gbdt_backend",
+        choices=list(GBDT_BACKENDS),
+        default="sklearn",
+        help="sklearn: GradientBoostingClassifier; hist: HistGradientBoostingClassifier (multithreaded)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Models trained concurrently (default: one process per model, capped at --cores)"
+    )
+    parser.add_argument("--cores", type=int, default=None, help="Total cores to share (default: all)")
+    parser.add_argument(
+        "--search",
+        default=None,
+        help="Hyperparameter search config (e.g. configs/model_params.yaml); runs successive halving per model",
+    )
+    parser.add_argument(
+        "--params",
+        default=None,
+        help="best_params.json from a previous --search run; keyed by model name or learner",
+    )
+    args = parser.parse_args(argv)
+
+    if (args.data is None) == (args.sim_config is None):
+        parser.error("exactly one of --data or --sim_config is required")
+    if args.streaming and args.data is None:
+        parser.error("--streaming requires --data")
+    if args.search and args.streaming:
+        parser.error("--search is not supported with --streaming")
+    if args.model in ("sgd", "naive_bayes") and not args.streaming:
+        parser.error(f"--model {args.model} requires --streaming")
+
+    if args.streaming:
+        results = run_streaming(args)
+    else:
+        results = run_in_memory(args)
+
+    save_results(results, Path(args.out_dir))
+
+
+def build_stream_specs(columns: List[str], model: str, label_col: str) -> List[StreamSpec]:
+    if label_col not in columns:
+        raise ValueError(f"label column not found: {label_col}")
+    labels = {"label_is_five_star", "label_is_target"}
+    skip = {"pull_index", WEIGHT_COLUMN}
+    features = [c for c in columns if c not in labels and c not in skip]
+
+    if model == "two_stage":
+        if "label_is_five_star" not in columns:
+            raise RuntimeError("label_is_five_star not found in dataset for two_stage")
+        return [
+            StreamSpec("stageA_random_forest", "random_forest", "label_is_five_star", features),
+            StreamSpec("stageA_gbdt", "gbdt", "label_is_five_star", features),
+            StreamSpec("stageB_random_forest", "random_forest", "label_is_target", features, "label_is_five_star"),
+            StreamSpec("stageB_gbdt", "gbdt", "label_is_target", features, "label_is_five_star"),
+        ]
+
+    row_filter = None
+    if label_col == "label_is_target" and "label_is_five_star" in columns:
+        row_filter = "label_is_five_star"
+    else:
+        # Mirror the in-memory path: other label columns stay as features.
+        features = [c for c in columns if c != label_col and c not in skip]
+    learners = ["random_forest", "gbdt"] if model == "both" else [model]
+    return [StreamSpec(name, name, label_col, features, row_filter) for name in learners]
+
+
+def run_streaming(args) -> list:
+    specs = build_stream_specs(read_columns(args.data), args.model, args.label)
+    if args.params:
+        params = json.loads(Path(args.params).read_text(encoding="utf-8"))
+        for spec in specs:
+            spec.params = params.get(spec.model_name, params.get(spec.learner))
+    return train_streaming(
+        args.data,
+        specs,
+        chunksize=args.chunksize,
+        reservoir_size=args.reservoir,
+        gbdt_backend=args.gbdt_backend,
+    )
+
+
+def load_frame(args):
+    if args.data is not None:
+        df, _ = select_features(load_dataset(args.data), args.label)
+        return df
+
+    with open(args.sim_config, "r", encoding="utf-8") as f:
+        raw_config = yaml.safe_load(f)
+    columns, df = simulate_features(raw_config, args.pulls, args.seed)
+    if args.save_raw:
+        print(f"Wrote raw simulation log to: {write_raw_csv(columns, Path(args.save_raw))}")
+    if args.save_features:
+        print(f"Wrote processed dataset to: {write_features_csv(df, args.save_features)}")
+    return df
+
+
+def run_in_memory(args) -> list:
+    df = load_frame(args)
+    tasks = build_tasks(df, args.model, args.label)
+    del df
+
+    total_cores = args.cores or os.cpu_count() or 1
+    workers = args.workers or min(len(tasks), total_cores)
+    params = json.loads(Path(args.params).read_text(encoding="utf-8")) if args.params else None
+    configure_tasks(tasks, total_cores, workers, args.gbdt_backend, params)
+
+    if args.search:
+        results = run_search(tasks, args.search, total_cores, args.gbdt_backend, Path(args.out_dir))
+    else:
+        results = train_parallel(tasks, gbdt_backend=args.gbdt_backend, max_workers=workers)
+    return results
+
+
+def run_search(tasks: list, config_path: str, total_cores: int, gbdt_backend: str, out_dir: Path) -> list:
+    with open(config_path, "r", encoding="utf-8") as f:
+        raw = yaml.safe_load(f)
+    cfg = search_config_from_dict(raw)
+    out_dir.mkdir(parents=True, exist_ok=True)
 
     results = []
-    if args.model in ("random_forest", "both"):
-        results.append(train_random_forest(df, label_col))
-    if args.model in ("gbdt", "both"):
-        results.append(train_gbdt(df, label_col))
-
-    if args.model == "two_stage":
-        # Stage A: predict five-star on all samples
-        if "label_is_five_star" not in df.columns:
-            raise RuntimeError("label_is_five_star not found in dataset for two_stage")
-        df_stage_a = df.drop(columns=["label_is_target"]).copy()
-        df_stage_a_label = "label_is_five_star"
-        rfa = train_random_forest(df_stage_a, df_stage_a_label)
-        rfa.model_name = "stageA_random_forest"
-        results.append(rfa)
-        gbda = train_gbdt(df_stage_a, df_stage_a_label)
-        gbda.model_name = "stageA_gbdt"
-        results.append(gbda)
-
-        # Stage B: predict target conditional on five-star
-        df_stage_b = df[df["label_is_five_star"] == 1].copy()
-        df_stage_b.drop(columns=["label_is_five_star"], inplace=True)
-        rfb = train_random_forest(df_stage_b, "label_is_target")
-        rfb.model_name = "stageB_random_forest"
-        results.append(rfb)
-        gbdb = train_gbdt(df_stage_b, "label_is_target")
-        gbdb.model_name = "stageB_gbdt"
-        results.append(gbdb)
-
-    out_dir = Path(args.out_dir)
+    best_params = {}
+    for task in tasks:
+        space = learner_space_from_dict(raw, task.learner, gbdt_backend)
+        result, params, history = successive_halving(
+            task.model_name, task.learner, task.split, cfg, space, total_cores, gbdt_backend
+        )
+        results.append(result)
+        best_params[task.model_name] = params
+
+        search_path = out_dir / f"{task.model_name}_search.json"
+        search_path.write_text(
+            json.dumps(
+                {
+                    "metric": cfg.metric,
+                    "best_params": params,
+                    "validation_metrics": result.metrics,
+                    "trials": [asdict(t) for t in history],
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        print(f"Saved search history to: {search_path}")
+
+    params_path = out_dir / "best_params.json"
+    params_path.write_text(json.dumps(best_params, indent=2), encoding="utf-8")
+    print(f"Saved best params to: {params_path}")
+    return results
+
+
+def save_results(results: list, out_dir: Path) -> None:
     out_dir.mkdir(parents=True, exist_ok=True)
 
     for result in results:
@@ -0,0 +1,470 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+import math
+
+import numpy as np
+
+try:
+    from scipy import stats as _scipy_stats  # type: ignore
+except Exception:  # pragma: no cover
+    _scipy_stats = None
+
+from ..simulation.batch import N_UNIFORMS, BatchState, batch_pull
+from ..simulation.engine import GachaEngine, PullResult, SimulationConfig, State
+from ..simulation.exact import capture_states, five_star_hazard, five_star_interval_pmf
+
+
+def _chi2_sf(stat: float, df: int) -> float:
+    if df <= 0:
+        return 1.0
+    if _scipy_stats is not None:
+        return float(_scipy_stats.chi2.sf(stat, df))
+    # Wilson-Hilferty normal approximation.
+    z = ((stat / df) ** (1.0 / 3.0) - (1.0 - 2.0 / (9.0 * df))) / math.sqrt(2.0 / (9.0 * df))
+    return 0.5 * math.erfc(z / math.sqrt(2.0))
+
+
+def _ks_sf(d: float, n: float) -> float:
+    if n <= 0:
+        return 1.0
+    if _scipy_stats is not None:
+        return float(_scipy_stats.kstwo.sf(d, int(round(n))))
+    lam = math.sqrt(n) * d
+    if lam < 0.2:
+        return 1.0
+    return float(min(1.0, 2.0 * sum((-1) ** (j - 1) * math.exp(-2.0 * j * j * lam * lam) for j in range(1, 101))))
+
+
+def _merge_bins(observed: np.ndarray, expected: np.ndarray, min_expected: float = 5.0):
+    """Merge adjacent bins left to right until each has expected >= min_expected."""
+    obs, exp = [], []
+    o_acc = e_acc = 0.0
+    for o, e in zip(observed, expected):
+        o_acc += o
+        e_acc += e
+        if e_acc >= min_expected:
+            obs.append(o_acc)
+            exp.append(e_acc)
+            o_acc = e_acc = 0.0
+    if e_acc > 0 or o_acc > 0:
+        if exp:
+            obs[-1] += o_acc
+            exp[-1] += e_acc
+        else:
+            obs.append(o_acc)
+            exp.append(e_acc)
+    return np.array(obs), np.array(exp)
+
+
+@dataclass
+class CheckResult:
+    name: str
+    statistic: float
+    df: Optional[int]
+    p_value: float
+    # Outcomes the rules make impossible (or certain outcomes that did not
+    # happen); any violation fails the check regardless of the p-value.
+    violations: int = 0
+    detail: Dict = field(default_factory=dict)
+
+
+def reference_hazard(config: SimulationConfig) -> np.ndarray:
+    """
+    The five-star hazard as configs/game_rules.yaml specifies it: base rate
+    before soft_pity_start, then base + (k - soft_pity_start + 1) * step
+    (or the quadratic ease-in), and 1 from hard_pity on. Written
+    independently of GachaEngine, whose tabulated hazard (five_star_hazard)
+    is what the simulators run, so the checks never compare the engine's
+    code with itself. Same indexing as five_star_hazard.
+    """
+    k = np.arange(config.hard_pity + 1, dtype=np.float64)
+    base = config.base_five_star_prob
+    if config.soft_pity_mode == "quadratic":
+        span = max(1, config.hard_pity - config.soft_pity_start)
+        t = np.clip((k - config.soft_pity_start + 1) / span, 0.0, 1.0)
+        soft = base + (1.0 - base) * t * t
+    else:
+        soft = np.minimum(1.0, base + (k - config.soft_pity_start + 1) * config.soft_pity_step)
+    h = np.where(k < config.soft_pity_start, base, soft)
+    h[config.hard_pity :] = 1.0
+    h[0] = 0.0
+    return h
+
+
+def expected_transitions(config: SimulationConfig) -> np.ndarray:
+    """
+    P(is_target, guarantee_after, counter_after | five-star, guarantee_before,
+    counter_before), shape (2, K, 2, 2, K). The last counter slot K - 1 is an
+    overflow bucket for counters the rules can never reach.
+    """
+    n_cap = capture_states(config)
+    k = n_cap + 1
+    probs = np.zeros((2, k, 2, 2, k))
+    for g in (0, 1):
+        p = config.target_prob_guarantee if g else config.target_prob_no_guarantee
+        for c in range(k):
+            probs[g, c, 1, 0, c] += p  # natural win keeps the counter
+            if config.capture_enabled:
+                q = 1.0 if c + 1 >= config.capture_hard else config.capture_prob
+                probs[g, c, 1, 0, 0] += (1.0 - p) * q
+                probs[g, c, 0, 1, min(c + 1, k - 1)] += (1.0 - p) * (1.0 - q)
+            else:
+                probs[g, c, 0, 1, c] += 1.0 - p
+    return probs
+
+
+class ConformanceCounts:
+    """
+    Sufficient statistics for the conformance checks, accumulated in one
+    streaming pass and mergeable across chunks. Everything is per-pull
+    array work on the (rare) five-star subset, so the bookkeeping stays
+    small next to the simulation itself.
+    """
+
+    def __init__(self, config: SimulationConfig):
+        self.config = config
+        size = config.hard_pity + 1
+        self.n_counter = capture_states(config) + 1
+        self.pulls = 0
+        # Five-stars by pity index, and pity left open at the end of each path.
+        self.five_at_pity = np.zeros(size, dtype=np.int64)
+        self.open_at_pity = np.zeros(size, dtype=np.int64)
+        # Interval lengths for intervals that started early enough to always
+        # finish inside their path; unbiased draws from five_star_interval_pmf.
+        self.intervals = np.zeros(size, dtype=np.int64)
+        k = self.n_counter
+        self.transitions = np.zeros((2, k, 2, 2, k), dtype=np.int64)
+        # Raw draw counts; only observable from the batch simulator.
+        self.rate_up = np.zeros((2, 2), dtype=np.int64)  # [guarantee, won]
+        self.capture = np.zeros(2, dtype=np.int64)  # [draws, captured]
+
+    def merge(self, other: "ConformanceCounts") -> None:
+        self.pulls += other.pulls
+        for name in ("five_at_pity", "open_at_pity", "intervals", "transitions", "rate_up", "capture"):
+            getattr(self, name).__iadd__(getattr(other, name))
+
+    def add_five_stars(
+        self,
+        t: np.ndarray,
+        pity_index: np.ndarray,
+        guarantee_before: np.ndarray,
+        counter_before: np.ndarray,
+        is_target: np.ndarray,
+        guarantee_after: np.ndarray,
+        counter_after: np.ndarray,
+        horizon: int,
+    ) -> None:
+        """Record five-star pulls; `t` is the 1-based pull number within its path."""
+        size = self.config.hard_pity + 1
+        pity_index = pity_index.astype(np.int64)
+        self.five_at_pity += np.bincount(pity_index, minlength=size)[:size]
+        # Interval started after pull t - k; keep it iff that start is early
+        # enough for any interval (<= hard_pity pulls) to end within the path.
+        complete = (t - pity_index) < horizon - self.config.hard_pity
+        self.intervals += np.bincount(pity_index[complete], minlength=size)[:size]
+
+        k = self.n_counter
+        c0 = np.minimum(counter_before.astype(np.int64), k - 1)
+        c1 = np.minimum(counter_after.astype(np.int64), k - 1)
+        flat = (((guarantee_before.astype(np.int64) * k + c0) * 2 + is_target) * 2 + guarantee_after) * k + c1
+        self.transitions += np.bincount(flat, minlength=self.transitions.size).reshape(self.transitions.shape)
+
+    def add_open(self, pity: np.ndarray) -> None:
+        """Pity count of each path when it ends (its unfinished interval)."""
+        size = self.config.hard_pity + 1
+        self.open_at_pity += np.bincount(np.minimum(pity.astype(np.int64), size - 1), minlength=size)
+
+    def add_results(self, results: Sequence[PullResult]) -> None:
+        """One GachaEngine.run path (starting from a reset engine)."""
+        n = len(results)
+        self.pulls += n
+        five = [(i + 1, r) for i, r in enumerate(results) if r.is_five_star]
+        if five:
+            self.add_five_stars(
+                t=np.array([i for i, _ in five]),
+                pity_index=np.array([r.pity_before + 1 for _, r in five]),
+                guarantee_before=np.array([r.guarantee_before for _, r in five]),
+                counter_before=np.array([r.capture_counter_before for _, r in five]),
+                is_target=np.array([r.is_target for _, r in five], dtype=np.int64),
+                guarantee_after=np.array([r.guarantee_after for _, r in five], dtype=np.int64),
+                counter_after=np.array([r.capture_counter_after for _, r in five]),
+                horizon=n,
+            )
+        if n:
+            self.add_open(np.array([results[-1].pity]))
+
+    def exposures(self) -> np.ndarray:
+        """Pulls made at each pity index: every five-star at j and open path at p passed k <= j, p."""
+        passed = self.five_at_pity + self.open_at_pity
+        return np.cumsum(passed[::-1])[::-1].copy()
+
+
+def hazard_check(counts: ConformanceCounts) -> CheckResult:
+    """Five-stars at pity k ~ Binomial(exposures[k], hazard[k]) for every k."""
+    h = reference_hazard(counts.config)
+    n = counts.exposures().astype(np.float64)
+    o = counts.five_at_pity.astype(np.float64)
+    e = n * h
+    random_k = (h > 0) & (h < 1)
+    # Certain outcomes: h == 1 must always fire, h == 0 never.
+    violations = int(((h >= 1) * (n - o)).sum() + ((h <= 0) * o).sum())
+    usable = random_k & (e >= 5) & (n - e >= 5)
+    var = e * (1 - h)
+    stat = float(((o - e) ** 2 / np.where(usable, var, 1.0))[usable].sum())
+    df = int(usable.sum())
+    return CheckResult(
+        "pity_hazard",
+        stat,
+        df,
+        _chi2_sf(stat, df),
+        violations,
+        {"bins_tested": df, "bins_skipped_low_count": int((random_k & ~usable & (n > 0)).sum())},
+    )
+
+
+def interval_checks(counts: ConformanceCounts) -> List[CheckResult]:
+    """Chi-square and KS of the pity-at-five-star histogram against the analytic pmf."""
+    pmf = five_star_interval_pmf(counts.config, reference_hazard(counts.config))
+    obs = counts.intervals.astype(np.float64)
+    total = obs.sum()
+    violations = int(obs[pmf <= 0].sum())
+    o, e = _merge_bins(obs[1:], total * pmf[1:])
+    stat = float(((o - e) ** 2 / e).sum()) if total else 0.0
+    df = max(len(o) - 1, 0)
+    chi = CheckResult("pity_histogram_chi2", stat, df, _chi2_sf(stat, df), violations, {"intervals": int(total)})
+
+    d = float(np.abs(np.cumsum(obs) / total - np.cumsum(pmf)).max()) if total else 0.0
+    # Conservative for a discrete distribution.
+    ks = CheckResult("pity_histogram_ks", d, None, _ks_sf(d, total), violations, {"intervals": int(total)})
+    return [chi, ks]
+
+
+def transition_checks(counts: ConformanceCounts) -> List[CheckResult]:
+    """Per (guarantee, capture_counter) before a five-star: outcome/state-after frequencies."""
+    probs = expected_transitions(counts.config)
+    k = counts.n_counter
+    results = []
+    for g in (0, 1):
+        for c in range(k):
+            obs = counts.transitions[g, c].reshape(-1).astype(np.float64)
+            total = obs.sum()
+            if total == 0:
+                continue
+            p = probs[g, c].reshape(-1)
+            violations = int(obs[p <= 0].sum())
+            possible = p > 0
+            o, e = _merge_bins(obs[possible], total * p[possible])
+            stat = float(((o - e) ** 2 / e).sum()) if len(o) > 1 else 0.0
+            df = max(len(o) - 1, 0)
+            observed_freq = {
+                f"target={t},guarantee_after={ga},counter_after={ca}": int(counts.transitions[g, c, t, ga, ca])
+                for t in (0, 1)
+                for ga in (0, 1)
+                for ca in range(k)
+                if counts.transitions[g, c, t, ga, ca] or probs[g, c, t, ga, ca] > 0
+            }
+            results.append(
+                CheckResult(
+                    f"transition_g{g}_c{c}",
+                    stat,
+                    df,
+                    _chi2_sf(stat, df),
+                    violations,
+                    {"five_stars": int(total), "observed": observed_freq},
+                )
+            )
+    return results
+
+
+def _binomial_check(name: str, successes: int, trials: int, p: float) -> Optional[CheckResult]:
+    if trials == 0:
+        return None
+    if p <= 0 or p >= 1:
+        expected = trials * p
+        return CheckResult(name, 0.0, None, 1.0, int(abs(successes - expected)), {"trials": trials})
+    var = trials * p * (1 - p)
+    z = (successes - trials * p) / math.sqrt(var)
+    return CheckResult(
+        name,
+        z * z,
+        1,
+        _chi2_sf(z * z, 1),
+        0,
+        {"trials": trials, "frequency": successes / trials, "expected": p},
+    )
+
+
+def draw_checks(counts: ConformanceCounts) -> List[CheckResult]:
+    """50/50 win and capture frequencies against their configured probabilities."""
+    cfg = counts.config
+    checks = [
+        _binomial_check(
+            "rate_up_no_guarantee", int(counts.rate_up[0, 1]), int(counts.rate_up[0].sum()), cfg.target_prob_no_guarantee
+        ),
+        _binomial_check(
+            "rate_up_guarantee", int(counts.rate_up[1, 1]), int(counts.rate_up[1].sum()), cfg.target_prob_guarantee
+        ),
+        _binomial_check("capture", int(counts.capture[1]), int(counts.capture[0]), cfg.capture_prob),
+    ]
+    return [c for c in checks if c is not None]
+
+
+def guarantee_matrix(counts: ConformanceCounts) -> Dict[str, int]:
+    t = counts.transitions.sum(axis=(1, 2, 4))  # [guarantee_before, guarantee_after]
+    return {f"{a}->{b}": int(t[a, b]) for a in (0, 1) for b in (0, 1)}
+
+
+def evaluate(counts: ConformanceCounts, alpha: float = 1e-3) -> Dict:
+    """
+    Run every check. A check fails on any violation or when its p-value is
+    below alpha / number_of_checks (Bonferroni, so alpha bounds the
+    chance that a correct implementation fails the suite).
+    """
+    checks = [hazard_check(counts)] + interval_checks(counts) + transition_checks(counts) + draw_checks(counts)
+    threshold = alpha / max(len(checks), 1)
+    rows = []
+    for c in checks:
+        passed = c.violations == 0 and c.p_value >= threshold
+        rows.append(
+            {
+                "name": c.name,
+                "statistic": c.statistic,
+                "df": c.df,
+                "p_value": c.p_value,
+                "violations": c.violations,
+                "status": "PASS" if passed else "FAIL",
+                **c.detail,
+            }
+        )
+    return {
+        "pulls": counts.pulls,
+        "alpha": alpha,
+        "threshold": threshold,
+        "guarantee_transitions": guarantee_matrix(counts),
+        "checks": rows,
+        "passed": all(r["status"] == "PASS" for r in rows),
+    }
+
+
+def run_batch_conformance(
+    config: SimulationConfig,
+    n_pulls: int,
+    horizon: int = 10_000,
+    seed: Optional[int] = None,
+    chunk_paths: int = 100_000,
+    hazard: Optional[np.ndarray] = None,
+) -> ConformanceCounts:
+    """
+    Accumulate ConformanceCounts over ~n_pulls pulls of the vectorized
+    simulator (GachaEngine's tabulated hazard, or `hazard` if given, and
+    rules_5_0's five-star rule, on arrays): ceil(n_pulls / horizon)
+    independent paths from State(), `chunk_paths` at a time, RNG stream
+    default_rng([seed, chunk]); fresh OS entropy stands in for a missing
+    seed.
+    """
+    if horizon <= config.hard_pity:
+        raise ValueError("horizon must exceed hard_pity")
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    if hazard is None:
+        hazard = five_star_hazard(config)
+    counts = ConformanceCounts(config)
+    paths = max(1, -(-n_pulls // horizon))
+    done = 0
+    chunk = 0
+    while done < paths:
+        m = min(chunk_paths, paths - done)
+        rng = np.random.default_rng([seed, chunk])
+        state = BatchState.repeat(State(), m)
+        for t in range(1, horizon + 1):
+            guarantee = state.guarantee.copy()
+            counter = state.capture_counter.copy()
+            out = batch_pull(config, state, rng.random((N_UNIFORMS, m)), hazard=hazard)
+            idx = np.flatnonzero(out.is_five_star)
+            if len(idx) == 0:
+                continue
+            g0, c0 = guarantee[idx], counter[idx]
+            lost, captured = out.lost_rate_up[idx], out.captured[idx]
+            counts.rate_up += np.bincount(g0 * 2 + ~lost, minlength=4).reshape(2, 2)
+            if config.capture_enabled:
+                drawn = lost & (c0.astype(np.int64) + 1 < config.capture_hard)
+                counts.capture += (int(drawn.sum()), int((captured & drawn).sum()))
+            counts.add_five_stars(
+                t=np.full(len(idx), t),
+                pity_index=out.pity_index[idx],
+                guarantee_before=g0,
+                counter_before=c0,
+                is_target=out.is_target[idx].astype(np.int64),
+                guarantee_after=state.guarantee[idx].astype(np.int64),
+                counter_after=state.capture_counter[idx],
+                horizon=horizon,
+            )
+        counts.add_open(state.pity)
+        counts.pulls += m * horizon
+        done += m
+        chunk += 1
+    return counts
+
+
+def _five_star_rate(hazard: np.ndarray) -> float:
+    """Long-run five-stars per pull: 1 / mean interval."""
+    survive = np.concatenate([[1.0], np.cumprod(1.0 - hazard[1:-1])])
+    return 1.0 / float(survive.sum())
+
+
+def pity_shift_mutant(config: SimulationConfig, shift: int = 1) -> np.ndarray:
+    """
+    Hazard table of a pity-shifting bug: the soft-pity ramp moved `shift`
+    pulls later, with every pre-hard-pity probability rescaled so the
+    long-run five-star rate is unchanged. A plain rate check cannot see it;
+    the hazard and pity-histogram checks must.
+    """
+    ref = reference_hazard(config)
+    hard = config.hard_pity
+    k = np.arange(1, hard)
+    shifted = ref[np.clip(k - shift, 1, hard - 1)]
+    target = _five_star_rate(ref)
+
+    def table(scale: float) -> np.ndarray:
+        h = ref.copy()
+        h[1:hard] = np.minimum(1.0, scale * shifted)
+        return h
+
+    lo, hi = 1e-3, 1e3
+    for _ in range(200):
+        mid = math.sqrt(lo * hi)
+        if _five_star_rate(table(mid)) < target:
+            lo = mid
+        else:
+            hi = mid
+    return table(math.sqrt(lo * hi))
+
+
+def mutation_check(
+    config: SimulationConfig,
+    n_pulls: int,
+    shift: int = 1,
+    horizon: int = 10_000,
+    seed: Optional[int] = None,
+    alpha: float = 1e-3,
+) -> Dict:
+    """
+    Regression check for the suite itself: run the batch conformance with
+    pity_shift_mutant as the simulator's hazard (in place of
+    GachaEngine._five_star_probability) and report whether the suite
+    caught it.
+    """
+    table = pity_shift_mutant(config, shift)
+    mutant = five_star_hazard(config, probability=lambda k: float(table[min(k, len(table) - 1)]))
+    counts = run_batch_conformance(config, n_pulls, horizon=horizon, seed=seed, hazard=mutant)
+    report = evaluate(counts, alpha=alpha)
+    report["mutation"] = {
+        "shift": shift,
+        "five_star_rate_reference": _five_star_rate(reference_hazard(config)),
+        "five_star_rate_mutant": _five_star_rate(table),
+        "failed_checks": [r["name"] for r in report["checks"] if r["status"] == "FAIL"],
+    }
+    report["detected"] = not report["passed"]
+    return report
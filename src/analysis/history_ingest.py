@@ -0,0 +1,629 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import copy
+import hashlib
+import io
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy import special as _scipy_special  # type: ignore
+except Exception:  # pragma: no cover
+    _scipy_special = None
+
+from ..models.feature_factory import FEATURE_DTYPES
+
+
+STATE_COLUMNS = ("pity_before", "guarantee_before", "capture_counter_before")
+# Accepted aliases for the outcome columns (raw log names / feature names).
+OUTCOME_ALIASES = {
+    "is_five_star": ("is_five_star", "label_is_five_star"),
+    "is_target": ("is_target", "label_is_target"),
+}
+# capture_counter values above this are pooled into the last slot.
+MAX_COUNTER = 7
+
+
+def _grow(a: np.ndarray, size: int) -> np.ndarray:
+    if len(a) >= size:
+        return a
+    return np.concatenate([a, np.zeros(size - len(a), dtype=a.dtype)])
+
+
+def _beta_interval(a: np.ndarray, b: np.ndarray, level: float = 0.95) -> Tuple[np.ndarray, np.ndarray]:
+    lo_q, hi_q = (1 - level) / 2, (1 + level) / 2
+    if _scipy_special is not None:
+        return _scipy_special.betaincinv(a, b, lo_q), _scipy_special.betaincinv(a, b, hi_q)
+    # Normal approximation to the Beta posterior.
+    mean = a / (a + b)
+    sd = np.sqrt(a * b / ((a + b) ** 2 * (a + b + 1)))
+    z = 1.959963984540054 if level == 0.95 else math.sqrt(2) * _erfinv(2 * hi_q - 1)
+    return np.clip(mean - z * sd, 0, 1), np.clip(mean + z * sd, 0, 1)
+
+
+def _erfinv(y: float) -> float:
+    # Newton iterations on math.erf; only used without scipy.
+    x = 0.0
+    for _ in range(50):
+        x -= (math.erf(x) - y) / (2 / math.sqrt(math.pi) * math.exp(-x * x))
+    return x
+
+
+@dataclass
+class RateCounts:
+    """Successes / trials for a family of Bernoulli rates, stored flat."""
+
+    trials: np.ndarray
+    successes: np.ndarray
+
+    @classmethod
+    def zeros(cls, shape) -> "RateCounts":
+        return cls(np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=np.int64))
+
+    def add(self, key: np.ndarray, success: np.ndarray) -> None:
+        size = self.trials.size
+        self.trials += np.bincount(key, minlength=size)[:size].reshape(self.trials.shape)
+        self.successes += np.bincount(key[success], minlength=size)[:size].reshape(self.trials.shape)
+
+    def posterior(self, prior: Tuple[float, float]) -> Dict[str, np.ndarray]:
+        a = prior[0] + self.successes
+        b = prior[1] + self.trials - self.successes
+        low, high = _beta_interval(a.astype(float), b.astype(float))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mle = np.where(self.trials > 0, self.successes / np.maximum(self.trials, 1), np.nan)
+        return {"alpha": a, "beta": b, "mean": a / (a + b), "ci_low": low, "ci_high": high, "mle": mle}
+
+
+@dataclass
+class HistoryPosterior:
+    """
+    Conjugate Beta posteriors keyed by the feature_factory state features:
+    five-star hazard per pity index (pity_before + 1), and P(target | five-star)
+    per (guarantee_before, capture_counter_before). When exports carry a
+    `captured` flag, the natural 50/50 win and the capture draw get their own
+    posteriors. All state is counts, and each file's record holds the byte
+    offset already ingested, so new files and rows appended to known files
+    add to it without reprocessing old rows.
+    """
+
+    prior: Tuple[float, float] = (1.0, 1.0)
+    hazard: RateCounts = field(default_factory=lambda: RateCounts.zeros(1))
+    target: RateCounts = field(default_factory=lambda: RateCounts.zeros((2, MAX_COUNTER + 1)))
+    # Only filled from exports with a `captured` column.
+    natural_win: RateCounts = field(default_factory=lambda: RateCounts.zeros(2))
+    capture: RateCounts = field(default_factory=lambda: RateCounts.zeros(MAX_COUNTER + 1))
+    pulls: int = 0
+    # path -> {"offset": bytes ingested (a line boundary), "tail_sha256":
+    # tail_hash at that offset, "header": CSV column names or None for JSONL}.
+    files: Dict[str, Dict] = field(default_factory=dict)
+    # player_id -> [pity, guarantee, capture_counter] after their last ingested pull.
+    players: Dict[str, List[int]] = field(default_factory=dict)
+
+    def add_states(
+        self,
+        pity_before: np.ndarray,
+        guarantee_before: np.ndarray,
+        counter_before: np.ndarray,
+        is_five_star: np.ndarray,
+        is_target: np.ndarray,
+        captured: Optional[np.ndarray] = None,
+    ) -> None:
+        k = pity_before.astype(np.int64) + 1
+        size = int(k.max()) + 1 if len(k) else 1
+        self.hazard.trials = _grow(self.hazard.trials, size)
+        self.hazard.successes = _grow(self.hazard.successes, size)
+        self.hazard.add(k, is_five_star)
+        self.pulls += len(k)
+
+        five = is_five_star
+        g = guarantee_before[five].astype(np.int64)
+        c = np.minimum(counter_before[five].astype(np.int64), MAX_COUNTER)
+        target = is_target[five]
+        self.target.add(g * (MAX_COUNTER + 1) + c, target)
+        if captured is not None:
+            cap = captured[five]
+            self.natural_win.add(g, target & ~cap)
+            lost_draw = ~target | cap
+            self.capture.add(c[lost_draw], cap[lost_draw])
+
+    def to_dict(self) -> Dict:
+        def counts(r: RateCounts) -> Dict:
+            return {"trials": r.trials.tolist(), "successes": r.successes.tolist()}
+
+        return {
+            "prior": list(self.prior),
+            "pulls": self.pulls,
+            "hazard": counts(self.hazard),
+            "target": counts(self.target),
+            "natural_win": counts(self.natural_win),
+            "capture": counts(self.capture),
+            "files": self.files,
+            "players": self.players,
+        }
+
+    @classmethod
+    def from_dict(cls, raw: Dict) -> "HistoryPosterior":
+        def counts(d: Dict) -> RateCounts:
+            return RateCounts(np.array(d["trials"], dtype=np.int64), np.array(d["successes"], dtype=np.int64))
+
+        return cls(
+            prior=tuple(raw["prior"]),
+            hazard=counts(raw["hazard"]),
+            target=counts(raw["target"]),
+            natural_win=counts(raw["natural_win"]),
+            capture=counts(raw["capture"]),
+            pulls=int(raw["pulls"]),
+            files=dict(raw.get("files", {})),
+            players={k: list(v) for k, v in raw.get("players", {}).items()},
+        )
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict()), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path, prior: Tuple[float, float] = (1.0, 1.0)) -> "HistoryPosterior":
+        if path.exists():
+            return cls.from_dict(json.loads(path.read_text(encoding="utf-8")))
+        return cls(prior=prior)
+
+    def summary(self) -> Dict:
+        hz = self.hazard.posterior(self.prior)
+        tg = self.target.posterior(self.prior)
+        pity = [
+            {
+                "pity": k,
+                "trials": int(self.hazard.trials[k]),
+                "five_stars": int(self.hazard.successes[k]),
+                "mean": float(hz["mean"][k]),
+                "ci": [float(hz["ci_low"][k]), float(hz["ci_high"][k])],
+            }
+            for k in range(1, len(self.hazard.trials))
+            if self.hazard.trials[k] > 0
+        ]
+        states = [
+            {
+                "guarantee": g,
+                "capture_counter": c,
+                "five_stars": int(self.target.trials[g, c]),
+                "targets": int(self.target.successes[g, c]),
+                "mean": float(tg["mean"][g, c]),
+                "ci": [float(tg["ci_low"][g, c]), float(tg["ci_high"][g, c])],
+            }
+            for g in (0, 1)
+            for c in range(MAX_COUNTER + 1)
+            if self.target.trials[g, c] > 0
+        ]
+        out = {"pulls": self.pulls, "files": len(self.files), "players": len(self.players), "hazard": pity, "target": states}
+        if self.natural_win.trials.sum():
+            nw = self.natural_win.posterior(self.prior)
+            cp = self.capture.posterior(self.prior)
+            out["natural_win"] = [
+                {"guarantee": g, "trials": int(self.natural_win.trials[g]), "mean": float(nw["mean"][g])} for g in (0, 1)
+            ]
+            out["capture"] = [
+                {"capture_counter": c, "trials": int(self.capture.trials[c]), "mean": float(cp["mean"][c])}
+                for c in range(MAX_COUNTER + 1)
+                if self.capture.trials[c] > 0
+            ]
+        return out
+
+
+# Bytes before a saved offset hashed to detect rewritten files.
+TAIL_BYTES = 4096
+
+
+def file_fingerprint(path: Path) -> str:
+    stat = path.stat()
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def tail_hash(path: Path, offset: int, window: int = TAIL_BYTES) -> str:
+    """
+    sha256 of the `window` bytes before `offset`: a cheap check that the part
+    of a file already read is still there, without rereading all of it.
+    """
+    with path.open("rb") as f:
+        start = max(0, offset - window)
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+def iter_appended_blocks(path: Path, offset: int, block_bytes: int) -> Iterator[Tuple[bytes, int]]:
+    """
+    Complete lines of `path` after byte `offset`, in blocks of about
+    `block_bytes`, with the offset after each block. A trailing line without
+    a newline (a writer mid-append) is left for the next run.
+    """
+    with path.open("rb") as f:
+        f.seek(offset)
+        carry = b""
+        while True:
+            data = f.read(block_bytes)
+            if not data:
+                return
+            data = carry + data
+            cut = data.rfind(b"\n") + 1
+            carry = data[cut:]
+            if cut:
+                offset += cut
+                yield data[:cut], offset
+
+
+def _is_jsonl(path: Path) -> bool:
+    return path.suffix.lower() in (".jsonl", ".json", ".ndjson")
+
+
+def iter_history_chunks(
+    path: Path, record: Dict, chunksize: int, block_bytes: int = 64 << 20
+) -> Iterator[pd.DataFrame]:
+    """
+    Rows of a CSV or JSON-lines (.jsonl / .json / .ndjson) export after
+    `record["offset"]`, in chunks of at most `chunksize` rows. The offset
+    in `record` advances as each block is consumed.
+    """
+    dtypes = {c: t for c, t in FEATURE_DTYPES.items() if c != "pull_index"}
+    for block, offset in iter_appended_blocks(path, record["offset"], block_bytes):
+        if _is_jsonl(path):
+            frame = pd.read_json(io.BytesIO(block), lines=True)
+        else:
+            frame = pd.read_csv(io.BytesIO(block), header=None, names=record["header"], dtype=dtypes)
+        for start in range(0, len(frame), chunksize):
+            yield frame.iloc[start : start + chunksize]
+        record["offset"] = offset
+
+
+def _outcome(chunk: pd.DataFrame, name: str) -> np.ndarray:
+    for alias in OUTCOME_ALIASES[name]:
+        if alias in chunk.columns:
+            return chunk[alias].to_numpy().astype(bool)
+    raise ValueError(f"missing column: one of {OUTCOME_ALIASES[name]}")
+
+
+def reconstruct_states(
+    chunk: pd.DataFrame,
+    players: Dict[str, List[int]],
+    player_col: str = "player_id",
+    order_col: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Per-player state features for raw pull exports (one row per pull, with
+    player id and outcomes), continuing from `players` carry-over state and
+    updating it. Rows of a player must be in chronological order within and
+    across chunks unless `order_col` sorts them within the chunk.
+
+    Pity and guarantee follow from outcomes alone. capture_counter needs a
+    `captured` column (natural 50/50 wins and captures look identical
+    otherwise); without one it is carried unchanged (0 for new players).
+    """
+    sort_cols = [player_col] + ([order_col] if order_col else [])
+    df = chunk.sort_values(sort_cols, kind="stable")
+    pid = df[player_col].astype(str).to_numpy()
+    five = _outcome(df, "is_five_star")
+    target = _outcome(df, "is_target")
+    captured = df["captured"].to_numpy().astype(bool) if "captured" in df.columns else None
+    n = len(df)
+    rows = np.arange(n)
+
+    codes, uniques = pd.factorize(pid, sort=False)
+    first = np.r_[True, codes[1:] != codes[:-1]]
+    group_start = np.maximum.accumulate(np.where(first, rows, 0))
+    pos = rows - group_start
+    carry = np.array([players.get(p, [0, 0, 0]) for p in uniques], dtype=np.int64).reshape(-1, 3)
+    carry_pity, carry_g, carry_c = carry[codes, 0], carry[codes, 1].astype(bool), carry[codes, 2]
+
+    # Last five-star strictly before each row, within the same player.
+    last = np.r_[-1, np.maximum.accumulate(np.where(five, rows, -1))[:-1]]
+    has_prev = last >= group_start
+    safe_last = np.where(has_prev, last, 0)
+
+    pity_before = np.where(has_prev, rows - last - 1, carry_pity + pos)
+    guarantee_before = np.where(has_prev, ~target[safe_last], carry_g)
+
+    if captured is not None:
+        # Counter after a five-star: 0 on capture, +1 on a miss, unchanged on a natural win.
+        miss = (five & ~target).astype(np.int64)
+        miss_cum = np.cumsum(miss)
+        last_cap = np.maximum.accumulate(np.where(five & captured, rows, -1))
+        cap_in_group = last_cap >= group_start
+        # Misses before this player's first row in the chunk.
+        base_cum = np.where(group_start > 0, miss_cum[np.maximum(group_start - 1, 0)], 0)
+        counter_after = np.where(
+            cap_in_group,
+            miss_cum - miss_cum[np.maximum(last_cap, 0)],
+            carry_c + miss_cum - base_cum,
+        )
+        counter_before = np.where(has_prev, counter_after[safe_last], carry_c)
+    else:
+        counter_after = counter_before = carry_c
+
+    # Carry-over state after each player's last row in this chunk.
+    last_row = rows[np.r_[first[1:], True]] if n else rows
+    pity_after = np.where(five, 0, pity_before + 1)
+    g_after = np.where(five, ~target, guarantee_before)
+    c_after = np.where(five, counter_after, counter_before)
+    for r in last_row:
+        players[pid[r]] = [int(pity_after[r]), int(g_after[r]), int(c_after[r])]
+
+    out = pd.DataFrame(
+        {
+            "pity_before": pity_before.astype(np.int16),
+            "guarantee_before": guarantee_before.astype(np.int8),
+            "capture_counter_before": counter_before.astype(np.int8),
+            "is_five_star": five,
+            "is_target": target,
+        }
+    )
+    if captured is not None:
+        out["captured"] = captured
+    return out
+
+
+def ingest_frame(
+    posterior: HistoryPosterior,
+    chunk: pd.DataFrame,
+    player_col: str = "player_id",
+    order_col: Optional[str] = None,
+    source: str = "frame",
+) -> int:
+    """
+    Count one chunk of pulls into `posterior`: directly when it has the
+    state features, else through reconstruct_states. Returns rows counted.
+    """
+    if all(c in chunk.columns for c in STATE_COLUMNS):
+        states = chunk
+    elif player_col in chunk.columns:
+        states = reconstruct_states(chunk, posterior.players, player_col, order_col)
+    else:
+        raise ValueError(f"{source}: need state columns {STATE_COLUMNS} or a '{player_col}' column")
+    captured = states["captured"].to_numpy().astype(bool) if "captured" in states.columns else None
+    posterior.add_states(
+        states["pity_before"].to_numpy(),
+        states["guarantee_before"].to_numpy().astype(bool),
+        states["capture_counter_before"].to_numpy(),
+        _outcome(states, "is_five_star"),
+        _outcome(states, "is_target"),
+        captured,
+    )
+    return len(chunk)
+
+
+def ingest_file(
+    posterior: HistoryPosterior,
+    path: Path,
+    chunksize: int = 1_000_000,
+    player_col: str = "player_id",
+    order_col: Optional[str] = None,
+) -> int:
+    """
+    Stream the rows of one export that `posterior` has not seen yet: all of
+    a new file, or only the complete lines appended to a known one since it
+    was last ingested; only the bytes just before the saved offset are
+    rehashed to check the file was not rewritten. Rows with state features (pity_before,
+    guarantee_before, capture_counter_before) are counted directly;
+    otherwise states are rebuilt per player. A known file whose ingested
+    prefix changed cannot be updated in place and raises ValueError (rebuild
+    the state from scratch instead). Returns rows ingested.
+    """
+    key = str(path.resolve())
+    record = posterior.files.get(key)
+    if record is None:
+        record = {"offset": 0, "tail_sha256": "", "header": None}
+        if not _is_jsonl(path):
+            with path.open("rb") as f:
+                first = f.readline()
+            if not first.endswith(b"\n"):
+                return 0
+            record["offset"] = len(first)
+            record["header"] = first.decode("utf-8").strip().split(",")
+    elif not isinstance(record, dict) or "tail_sha256" not in record:
+        raise ValueError(f"{path}: recorded by an older state format; rebuild the state")
+    else:
+        if path.stat().st_size < record["offset"]:
+            raise ValueError(f"{path}: shorter than the {record['offset']} bytes already ingested; rebuild the state")
+        if tail_hash(path, record["offset"]) != record["tail_sha256"]:
+            raise ValueError(f"{path}: already-ingested rows were rewritten; rebuild the state")
+    # Record before reading so a later error cannot leave counts without it.
+    posterior.files[key] = record
+
+    rows = 0
+    for chunk in iter_history_chunks(path, record, chunksize):
+        rows += ingest_frame(posterior, chunk, player_col, order_col, source=str(path))
+    record["tail_sha256"] = tail_hash(path, record["offset"])
+    return rows
+
+
+def _loglik(successes: np.ndarray, trials: np.ndarray, h: np.ndarray) -> float:
+    h = np.clip(h, 1e-12, 1 - 1e-12)
+    return float((successes * np.log(h) + (trials - successes) * np.log1p(-h)).sum())
+
+
+def fit_hazard(posterior: HistoryPosterior, base_hard_pity: int, hard_ci_low: float = 0.99) -> Dict:
+    """
+    Fit the parametric soft-pity curve of SimulationConfig to the per-pity
+    counts: for every soft_pity_start, base = pooled rate before it and (linear
+    mode) step by weighted least squares on the observed rates; keep the
+    start and mode with the best binomial log-likelihood (AIC for the extra
+    linear parameter). Hard pity stays at `base_hard_pity` (or just past the
+    highest pity seen) unless the hazard posterior at the highest pity has
+    its lower bound at or above `hard_ci_low`, which a handful of lucky
+    five-stars cannot reach.
+    """
+    trials = posterior.hazard.trials.astype(float)
+    succ = posterior.hazard.successes.astype(float)
+    observed = np.flatnonzero(trials > 0)
+    if len(observed) == 0:
+        raise ValueError("no pulls ingested")
+    top = int(observed.max())
+    ci_low = float(posterior.hazard.posterior(posterior.prior)["ci_low"][top])
+    if ci_low >= hard_ci_low:
+        hard = top
+    else:
+        # Too few pulls at `top` to call it hard pity; misses there push it past `top`.
+        hard = max(base_hard_pity, top if succ[top] == trials[top] else top + 1)
+    size = hard + 1
+    trials, succ = _grow(trials, size)[:size], _grow(succ, size)[:size]
+    rate = np.divide(succ, trials, out=np.zeros(size), where=trials > 0)
+    k = np.arange(size, dtype=float)
+    fit_k = (k >= 1) & (k < hard)
+
+    best = None
+    for start in range(2, hard):
+        pre = fit_k & (k < start)
+        base = succ[pre].sum() / trials[pre].sum() if trials[pre].sum() else 0.0
+        soft = fit_k & (k >= start)
+        x = k - start + 1
+        for mode in ("linear", "quadratic"):
+            if mode == "linear":
+                w = trials[soft]
+                denom = float((w * x[soft] ** 2).sum())
+                step = max(float((w * x[soft] * (rate[soft] - base)).sum()) / denom, 0.0) if denom else 0.0
+                h = np.where(k < start, base, np.minimum(1.0, base + x * step))
+                n_params = 3
+            else:
+                step = 0.0
+                span = max(1, hard - start)
+                t = np.clip(x / span, 0.0, 1.0)
+                h = np.where(k < start, base, base + (1.0 - base) * t * t)
+                n_params = 2
+            ll = _loglik(succ[fit_k], trials[fit_k], h[fit_k])
+            aic = 2 * n_params - 2 * ll
+            if best is None or aic < best["aic"]:
+                best = {
+                    "hard_pity": hard,
+                    "soft_pity_start": start,
+                    "soft_pity_mode": mode,
+                    "base": float(base),
+                    "soft_pity_step": step,
+                    "log_likelihood": float(ll),
+                    "aic": aic,
+                }
+    return best
+
+
+def export_rules(posterior: HistoryPosterior, base_raw: Dict) -> Dict:
+    """
+    game_rules.yaml-shaped dict (loadable by config_from_dict) with fitted
+    hazard and rate-up values, plus a `fitted` block with the posteriors.
+    Point estimates are posterior modes (the MLE under the default Beta(1, 1)
+    prior), so never-observed outcomes export as exactly 0 or 1.
+    """
+    raw = copy.deepcopy(base_raw)
+    hz = fit_hazard(posterior, int(base_raw["pity"]["hard_pity"]))
+    raw["base_probability"]["five_star"] = round(float(hz["base"]), 6)
+    raw["pity"].update(
+        {
+            "hard_pity": hz["hard_pity"],
+            "soft_pity_start": hz["soft_pity_start"],
+            "soft_pity_mode": hz["soft_pity_mode"],
+            "soft_pity_step": round(hz["soft_pity_step"], 6),
+        }
+    )
+
+    def mode(r: RateCounts, idx, default: float) -> float:
+        a = posterior.prior[0] + r.successes[idx].sum()
+        b = posterior.prior[1] + (r.trials[idx] - r.successes[idx]).sum()
+        if r.trials[idx].sum() == 0:
+            return default
+        if a <= 1 or b <= 1:
+            return 1.0 if a > b else 0.0
+        return float((a - 1) / (a + b - 2))
+
+    notes: List[str] = []
+    rate_up = raw["rate_up"]
+    capture = raw.setdefault("capture_mechanism", {})
+    capture_on = bool(capture.get("enabled", False))
+    hard_capture = int(capture.get("hard_capture", 0))
+    if posterior.natural_win.trials.sum():
+        rate_up["target_probability_when_no_guarantee"] = round(mode(posterior.natural_win, 0, rate_up["target_probability_when_no_guarantee"]), 6)
+        rate_up["target_probability_when_guarantee"] = round(mode(posterior.natural_win, 1, rate_up["target_probability_when_guarantee"]), 6)
+        if capture_on:
+            drawn = np.arange(len(posterior.capture.trials)) + 1 < hard_capture
+            capture["capture_probability"] = round(mode(posterior.capture, drawn, capture.get("capture_probability", 0.0)), 6)
+    else:
+        # Only P(target | five-star, state) is observed: r = p + (1 - p) q at
+        # counter 0, which separates p given the base capture probability.
+        # If counters were not tracked either, 50/50s at every counter are
+        # pooled under 0 and p is not identifiable.
+        counters_known = posterior.target.trials[0, 1:].sum() > 0
+        if not capture_on or hard_capture <= 1 or counters_known:
+            r = mode(posterior.target, (0, 0), rate_up["target_probability_when_no_guarantee"])
+            q = float(capture.get("capture_probability", 0.0)) if capture_on and hard_capture > 1 else 0.0
+            p = (r - q) / (1 - q)
+            rate_up["target_probability_when_no_guarantee"] = round(min(max(p, 0.0), 1.0), 6)
+        else:
+            notes.append("rate_up.target_probability_when_no_guarantee kept from base: no captured flag or capture counters")
+        rate_up["target_probability_when_guarantee"] = round(
+            mode(posterior.target, (1, slice(None)), rate_up["target_probability_when_guarantee"]), 6
+        )
+    if posterior.natural_win.trials.sum() == 0 and capture_on:
+        notes.append("capture_probability kept from base: exports had no captured flag")
+
+    raw["fitted"] = {
+        "source": "history_ingest",
+        "pulls": posterior.pulls,
+        "files": sorted(posterior.files),
+        "hazard_fit": {k: (round(v, 6) if isinstance(v, float) else v) for k, v in hz.items()},
+        "notes": notes,
+        "posterior": posterior.summary(),
+    }
+    return raw
+
+
+def simulate_history(raw_rules: Dict, n_pulls: int, players: int = 40, seed: int = 0) -> pd.DataFrame:
+    """
+    Raw export (player_id, is_five_star, is_target; no state columns) of
+    `n_pulls` GachaEngine pulls split evenly over `players` players.
+    """
+    from ..simulation.engine import GachaEngine, config_from_dict
+
+    config = config_from_dict(raw_rules)
+    per_player = -(-n_pulls // players)
+    frames = []
+    for p in range(players):
+        engine = GachaEngine(replace(config, seed=seed * 1_000_003 + p))
+        engine.reset()
+        results = engine.run(min(per_player, n_pulls - p * per_player))
+        frames.append(
+            pd.DataFrame(
+                {
+                    "player_id": p,
+                    "is_five_star": [r.is_five_star for r in results],
+                    "is_target": [r.is_target for r in results],
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def fit_check(raw_rules: Dict, n_pulls: int = 800_000, players: int = 40, seed: int = 0) -> Dict:
+    """
+    Recover a known config: ingest simulate_history output, fit it with
+    export_rules and compare the fitted hazard parameters to the truth.
+    Passes when hard_pity matches exactly, soft_pity_start is within 2
+    pulls and the base rate within 25%.
+    """
+    posterior = HistoryPosterior()
+    ingest_frame(posterior, simulate_history(raw_rules, n_pulls, players, seed), source="simulated history")
+    fit = export_rules(posterior, raw_rules)["fitted"]["hazard_fit"]
+    true = raw_rules["pity"]
+    true_base = float(raw_rules["base_probability"]["five_star"])
+    checks = {
+        "hard_pity": fit["hard_pity"] == int(true["hard_pity"]),
+        "soft_pity_start": abs(fit["soft_pity_start"] - int(true["soft_pity_start"])) <= 2,
+        "base": abs(fit["base"] - true_base) <= 0.25 * true_base,
+    }
+    return {
+        "pulls": posterior.pulls,
+        "players": players,
+        "expected": {"hard_pity": int(true["hard_pity"]), "soft_pity_start": int(true["soft_pity_start"]), "base": true_base},
+        "fitted": {"hard_pity": fit["hard_pity"], "soft_pity_start": fit["soft_pity_start"], "base": fit["base"]},
+        "checks": checks,
+        "passed": all(checks.values()),
+    }
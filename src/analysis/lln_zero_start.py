@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import math
 
 try:
@@ -41,7 +41,7 @@ def _load_config(path: str) -> Dict:
 def run_zero_start_validation(raw_config: Dict, n_pulls: Optional[int] = None) -> LLNStats:
     sim_config = config_from_dict(raw_config)
     engine = GachaEngine(sim_config)
-    engine.state = State()  # force zero-start state
+    engine.restore(State())  # force zero-start state
 
     if n_pulls is None:
         n_pulls = int(raw_config.get("validation", {}).get("min_samples", 100000))
@@ -60,7 +60,7 @@ def run_zero_start_validation(raw_config: Dict, n_pulls: Optional[int] = None) -
     )
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     import argparse
 
     parser = argparse.ArgumentParser(
@@ -68,7 +68,7 @@ def main() -> None:
     )
     parser.add_argument("--config", required=True, help="Path to game_rules.yaml")
     parser.add_argument("--pulls", type=int, default=None, help="Number of pulls to simulate")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     raw_config = _load_config(args.config)
     stats = run_zero_start_validation(raw_config, n_pulls=args.pulls)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 from pathlib import Path
+from typing import List, Optional
 import csv
 
 import numpy as np
@@ -44,11 +45,11 @@ def plot_pdf(data: np.ndarray, out_path: Path, title: str) -> None:
     plt.close()
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     parser = argparse.ArgumentParser(description="Plot PDF/CDF of pity distribution.")
     parser.add_argument("--input", required=True, help="Path to raw CSV log")
     parser.add_argument("--output_dir", default="data/processed", help="Output directory")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     out_dir = Path(args.output_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
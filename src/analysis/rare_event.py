@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Sequence
+import math
+
+import numpy as np
+
+from ..simulation.batch import N_UNIFORMS, BatchState, batch_pull
+from ..simulation.engine import SimulationConfig, State
+from ..simulation.exact import five_star_hazard
+
+
+@dataclass
+class Proposal:
+    """
+    Biased sampling distribution. hazard_scale multiplies the five-star
+    hazard wherever it is below 1 (< 1 delays five-stars); rate_up_win and
+    capture_prob replace the 50/50 win and capture probabilities when set.
+    Guaranteed and forced outcomes are never tilted, which keeps the
+    proposal's support equal to the original's.
+    """
+
+    hazard_scale: float = 1.0
+    rate_up_win: Optional[float] = None
+    capture_prob: Optional[float] = None
+
+
+@dataclass
+class PathHistory:
+    """Per-pull outcomes, shape (paths, horizon)."""
+
+    five_star: np.ndarray
+    target: np.ndarray
+    guarantee_before: np.ndarray
+
+
+Predicate = Callable[[PathHistory], np.ndarray]
+
+
+@dataclass
+class RareEventEstimate:
+    probability: float
+    std_error: float
+    relative_error: float
+    # (sum w I)^2 / sum (w I)^2: effective number of tail samples.
+    effective_sample_size: float
+    tail_hits: int
+    paths: int
+    # Var(crude Monte Carlo indicator) / Var(weighted indicator).
+    variance_reduction: float
+
+    def ci(self, z: float = 1.96) -> tuple:
+        return max(0.0, self.probability - z * self.std_error), self.probability + z * self.std_error
+
+
+def no_target_within(n_pulls: int) -> Predicate:
+    def predicate(h: PathHistory) -> np.ndarray:
+        return ~h.target[:, :n_pulls].any(axis=1)
+
+    return predicate
+
+
+def lost_5050_streak(k: int) -> Predicate:
+    """k consecutive 50/50s (five-stars without guarantee) that did not yield the target."""
+
+    def predicate(h: PathHistory) -> np.ndarray:
+        is_5050 = h.five_star & ~h.guarantee_before
+        streak = np.zeros(h.five_star.shape[0], dtype=np.int32)
+        hit = np.zeros(h.five_star.shape[0], dtype=bool)
+        for t in range(h.five_star.shape[1]):
+            col = is_5050[:, t]
+            lost = col & ~h.target[:, t]
+            streak = np.where(lost, streak + 1, np.where(col, 0, streak))
+            hit |= streak >= k
+        return hit
+
+    return predicate
+
+
+def at_most_targets(n_targets: int, n_pulls: int) -> Predicate:
+    def predicate(h: PathHistory) -> np.ndarray:
+        return h.target[:, :n_pulls].sum(axis=1) <= n_targets
+
+    return predicate
+
+
+def _proposal_hazard(hazard: np.ndarray, scale: float) -> np.ndarray:
+    tilted = np.where(hazard < 1.0, np.clip(hazard * scale, 1e-12, 1 - 1e-12), hazard)
+    tilted[0] = 0.0
+    return tilted
+
+
+def _bernoulli_log_ratio(event: np.ndarray, p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """log P(event; p) - log P(event; q), zero where p == q."""
+    same = p == q
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hit = np.log(p) - np.log(q)
+        miss = np.log1p(-p) - np.log1p(-q)
+    return np.where(same, 0.0, np.where(event, hit, miss))
+
+
+def simulate_weighted(
+    config: SimulationConfig,
+    proposal: Proposal,
+    horizon: int,
+    paths: int,
+    rng: np.random.Generator,
+    start: Optional[State] = None,
+):
+    """Sample `paths` histories under the proposal; returns (history, log LR)."""
+    hazard = five_star_hazard(config)
+    hazard_q = _proposal_hazard(hazard, proposal.hazard_scale)
+    p_win = config.target_prob_no_guarantee
+    q_win = p_win if proposal.rate_up_win is None else proposal.rate_up_win
+    p_cap = config.capture_prob
+    q_cap = p_cap if proposal.capture_prob is None else proposal.capture_prob
+    sampler = replace(config, target_prob_no_guarantee=q_win, capture_prob=q_cap)
+
+    state = BatchState.repeat(start or State(), paths)
+    log_w = np.zeros(paths)
+    history = PathHistory(
+        five_star=np.zeros((paths, horizon), dtype=bool),
+        target=np.zeros((paths, horizon), dtype=bool),
+        guarantee_before=np.zeros((paths, horizon), dtype=bool),
+    )
+
+    for t in range(horizon):
+        guarantee = state.guarantee.copy()
+        counter = state.capture_counter.copy()
+        out = batch_pull(sampler, state, rng.random((N_UNIFORMS, paths)), hazard=hazard_q)
+
+        log_w += _bernoulli_log_ratio(out.is_five_star, hazard[out.pity_index], hazard_q[out.pity_index])
+        # Only 50/50 draws (no guarantee) are tilted.
+        rate_up = out.is_five_star & ~guarantee
+        won = ~out.lost_rate_up
+        log_w += np.where(rate_up, _bernoulli_log_ratio(won, np.float64(p_win), np.float64(q_win)), 0.0)
+        if config.capture_enabled:
+            # Forced captures involve no draw.
+            drawn = out.lost_rate_up & (counter + 1 < config.capture_hard)
+            log_w += np.where(drawn, _bernoulli_log_ratio(out.captured, np.float64(p_cap), np.float64(q_cap)), 0.0)
+
+        history.five_star[:, t] = out.is_five_star
+        history.target[:, t] = out.is_target
+        history.guarantee_before[:, t] = guarantee
+
+    return history, log_w
+
+
+def estimate_tail(
+    config: SimulationConfig,
+    predicate: Predicate,
+    horizon: int,
+    paths: int,
+    proposal: Optional[Proposal] = None,
+    start: Optional[State] = None,
+    chunk_paths: int = 100_000,
+    seed: Optional[int] = None,
+) -> RareEventEstimate:
+    """
+    Importance-sampling estimate of P(predicate(history)) over `horizon`
+    pulls. Histories are sampled under `proposal` in chunks and reweighted
+    by their likelihood ratio; Proposal() gives crude Monte Carlo.
+    """
+    proposal = proposal or Proposal()
+    rng = np.random.default_rng(seed)
+    sum_wi = sum_wi2 = 0.0
+    hits = 0
+    done = 0
+    while done < paths:
+        m = min(chunk_paths, paths - done)
+        history, log_w = simulate_weighted(config, proposal, horizon, m, rng, start)
+        indicator = np.asarray(predicate(history), dtype=bool)
+        wi = np.where(indicator, np.exp(log_w), 0.0)
+        sum_wi += float(wi.sum())
+        sum_wi2 += float(np.dot(wi, wi))
+        hits += int(indicator.sum())
+        done += m
+
+    p_hat = sum_wi / paths
+    var = max(sum_wi2 / paths - p_hat * p_hat, 0.0)
+    se = math.sqrt(var / paths)
+    return RareEventEstimate(
+        probability=p_hat,
+        std_error=se,
+        relative_error=se / p_hat if p_hat > 0 else float("inf"),
+        effective_sample_size=(sum_wi * sum_wi / sum_wi2) if sum_wi2 > 0 else 0.0,
+        tail_hits=hits,
+        paths=paths,
+        variance_reduction=(p_hat * (1 - p_hat) / var) if var > 0 else float("nan"),
+    )
+
+
+def tune_proposal(
+    config: SimulationConfig,
+    predicate: Predicate,
+    horizon: int,
+    candidates: Sequence[Proposal],
+    pilot_paths: int = 20_000,
+    start: Optional[State] = None,
+    seed: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Pilot-run each candidate proposal and rank by relative error (lowest
+    first). Candidates with no tail hits rank last.
+    """
+    ranked = []
+    for i, proposal in enumerate(candidates):
+        pilot_seed = None if seed is None else seed + i
+        est = estimate_tail(config, predicate, horizon, pilot_paths, proposal, start, seed=pilot_seed)
+        ranked.append({"proposal": proposal, "estimate": est})
+    ranked.sort(key=lambda r: (r["estimate"].tail_hits == 0, r["estimate"].relative_error))
+    return ranked
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import io
+
+import numpy as np
+import pandas as pd
+
+from ..models.feature_factory import FEATURE_DTYPES, WEIGHT_COLUMN
+from ..utils.checkpoint import load_checkpoint, save_checkpoint
+from .history_ingest import STATE_COLUMNS, file_fingerprint, iter_appended_blocks, tail_hash
+
+
+LABEL_COLUMNS = ("label_is_five_star", "label_is_target", "pull_index")
+
+
+def _grow_to(a: np.ndarray, shape: Sequence[int]) -> np.ndarray:
+    """Zero-pad `a` so that each trailing dimension is at least `shape`."""
+    lead = a.ndim - len(shape)
+    target = a.shape[:lead] + tuple(max(s, n) for s, n in zip(a.shape[lead:], shape))
+    if target == a.shape:
+        return a
+    out = np.zeros(target, dtype=a.dtype)
+    out[tuple(slice(0, s) for s in a.shape)] = a
+    return out
+
+
+def model_fingerprints(paths: Sequence[str]) -> List[str]:
+    return [f"{p}@{file_fingerprint(Path(p))}" for p in paths]
+
+
+@dataclass
+class ReportAggregates:
+    """
+    Everything decision_report needs, summed per (pity_before,
+    guarantee_before, capture_counter_before) state: sample, five-star and
+    target counts, each stage A model's predicted P(five-star) summed over
+    all rows, and each stage B model's P(target | five-star) summed over
+    five-star rows. Buckets and global rates are ratios of these sums, so
+    appended rows only add to them. Importance-weighted (stratified) rows
+    also add their weights per state; a weight that depends only on the
+    state rescales that state's counts back to natural frequencies.
+    """
+
+    models_a: List[str]
+    models_b: List[str]
+    source: Optional[str] = None
+    header: List[str] = field(default_factory=list)
+    # Bytes of `source` already ingested; always at a line boundary.
+    offset: int = 0
+    tail_hash: str = ""
+    rows: int = 0
+    samples: np.ndarray = field(default_factory=lambda: np.zeros((1, 2, 1), dtype=np.int64))
+    five: np.ndarray = field(default_factory=lambda: np.zeros((1, 2, 1), dtype=np.int64))
+    target: np.ndarray = field(default_factory=lambda: np.zeros((1, 2, 1), dtype=np.int64))
+    pred_five: Optional[np.ndarray] = None
+    pred_target: Optional[np.ndarray] = None
+    # Summed row weights per state (equal to samples for unweighted data).
+    weight: Optional[np.ndarray] = None
+
+    def __post_init__(self) -> None:
+        if self.weight is None:
+            self.weight = self.samples.astype(np.float64)
+        if self.pred_five is None:
+            self.pred_five = np.zeros((len(self.models_a),) + self.samples.shape)
+        if self.pred_target is None:
+            self.pred_target = np.zeros((len(self.models_b),) + self.samples.shape)
+
+    def _reshape(self, shape: Tuple[int, int, int]) -> None:
+        self.samples = _grow_to(self.samples, shape)
+        self.five = _grow_to(self.five, shape)
+        self.target = _grow_to(self.target, shape)
+        self.weight = _grow_to(self.weight, shape)
+        self.pred_five = _grow_to(self.pred_five, shape)
+        self.pred_target = _grow_to(self.pred_target, shape)
+
+    def add_frame(self, df: pd.DataFrame, models_a: Sequence, models_b: Sequence) -> None:
+        """Add a chunk of processed feature rows, predicting with the given models."""
+        if len(df) == 0:
+            return
+        pity = df["pity_before"].to_numpy(np.int64)
+        g = df["guarantee_before"].to_numpy(np.int64)
+        c = df["capture_counter_before"].to_numpy(np.int64)
+        self._reshape((int(pity.max()) + 1, 2, int(c.max()) + 1))
+        shape = self.samples.shape
+        key = np.ravel_multi_index((pity, g, c), shape)
+        size = self.samples.size
+        five = df["label_is_five_star"].to_numpy().astype(bool)
+        target = df["label_is_target"].to_numpy().astype(bool) & five
+
+        self.samples += np.bincount(key, minlength=size).reshape(shape)
+        self.five += np.bincount(key[five], minlength=size).reshape(shape)
+        self.target += np.bincount(key[target], minlength=size).reshape(shape)
+        w = df[WEIGHT_COLUMN].to_numpy(np.float64) if WEIGHT_COLUMN in df.columns else None
+        self.weight += np.bincount(key, weights=w, minlength=size).reshape(shape)
+
+        X = df.drop(columns=list(LABEL_COLUMNS) + [WEIGHT_COLUMN], errors="ignore")
+        for i, m in enumerate(models_a):
+            self.pred_five[i] += self._summed_predictions(m, X, key, size).reshape(shape)
+        X_five, key_five = X[five], key[five]
+        for i, m in enumerate(models_b):
+            self.pred_target[i] += self._summed_predictions(m, X_five, key_five, size).reshape(shape)
+        self.rows += len(df)
+
+    @staticmethod
+    def _summed_predictions(model, X: pd.DataFrame, key: np.ndarray, size: int) -> np.ndarray:
+        """Per-state sums of predict_proba[:, 1] over the rows of X."""
+        if len(X) == 0:
+            return np.zeros(size)
+        if set(X.columns) == set(STATE_COLUMNS):
+            # Features are exactly the state, so one prediction per state
+            # present, weighted by its count, equals the per-row sum.
+            cells, first, counts = np.unique(key, return_index=True, return_counts=True)
+            p = model.predict_proba(X.iloc[first])[:, 1]
+            out = np.zeros(size)
+            out[cells] = p * counts
+            return out
+        return np.bincount(key, weights=model.predict_proba(X)[:, 1], minlength=size)
+
+    def _scale(self) -> np.ndarray:
+        """Mean row weight per state (1 for unweighted data, 0 where unseen)."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.samples > 0, self.weight / self.samples, 0.0)
+
+    def rates(self, lo: int = 0, hi: Optional[int] = None) -> Optional[Dict[str, float]]:
+        """
+        Predicted and empirical rates over pity_before in [lo, hi]; None
+        without samples. States count with their summed row weights.
+        """
+        sl = slice(lo, None if hi is None else hi + 1)
+        samples = int(self.samples[sl].sum())
+        if samples == 0:
+            return None
+        f = self._scale()[sl]
+        weighted = float(self.weight[sl].sum())
+        five = float((f * self.five[sl]).sum())
+        p_five = float((f * self.pred_five[:, sl]).sum()) / (len(self.models_a) * weighted)
+        empirical_five = five / weighted
+        if five == 0:
+            p_target_given = empirical_target_given = 0.0
+        else:
+            p_target_given = float((f * self.pred_target[:, sl]).sum()) / (len(self.models_b) * five)
+            empirical_target_given = float((f * self.target[sl]).sum()) / five
+        return {
+            "samples": samples,
+            "prob_five_star_pred": p_five,
+            "prob_five_star_empirical": empirical_five,
+            "prob_target_given_five_pred": p_target_given,
+            "prob_target_given_five_empirical": empirical_target_given,
+            "prob_target_pred": p_five * p_target_given,
+            "prob_target_empirical": empirical_five * empirical_target_given,
+        }
+
+    def bootstrap_rates(
+        self, ranges: Sequence[Tuple[int, Optional[int]]], replicates: int, rng: np.random.Generator
+    ) -> Dict[str, np.ndarray]:
+        """
+        Poisson bootstrap of rates() for each pity_before range, from the
+        per-state counts alone. Giving every row a Poisson(1) weight makes each
+        state's (target, five-star non-target, non-five-star) counts
+        independent Poisson draws with the observed counts as means. Predicted
+        sums scale with the state's mean prediction, which is exact when the
+        model features are the state, and counts scale with the state's mean
+        row weight as in rates(). Returns arrays of shape
+        (replicates, len(ranges)) keyed like rates().
+        """
+        n = self.samples.ravel()
+        keep = n > 0
+        n = n[keep]
+        five = self.five.ravel()[keep]
+        target = self.target.ravel()[keep]
+        pity = np.indices(self.samples.shape)[0].ravel()[keep]
+        scale = self._scale().ravel()[keep]
+        p_a = self.pred_five.mean(axis=0).ravel()[keep] / n
+        p_b = self.pred_target.mean(axis=0).ravel()[keep] / np.maximum(five, 1)
+
+        size = (replicates, len(n))
+        hit = rng.poisson(target, size).astype(np.float64)
+        fives = hit + rng.poisson(five - target, size)
+        rows = fives + rng.poisson(n - five, size)
+
+        sel = np.zeros((len(n), len(ranges)))
+        for j, (lo, hi) in enumerate(ranges):
+            sel[:, j] = ((pity >= lo) & (pity <= (np.inf if hi is None else hi))) * scale
+        samples, five_c, target_c = rows @ sel, fives @ sel, hit @ sel
+        pred_a, pred_b = (rows * p_a) @ sel, (fives * p_b) @ sel
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            p_five = pred_a / samples
+            empirical_five = five_c / samples
+            p_target_given = np.where(five_c > 0, pred_b / five_c, 0.0)
+            empirical_target_given = np.where(five_c > 0, target_c / five_c, 0.0)
+        return {
+            "prob_five_star_pred": p_five,
+            "prob_five_star_empirical": empirical_five,
+            "prob_target_given_five_pred": p_target_given,
+            "prob_target_given_five_empirical": empirical_target_given,
+            "prob_target_pred": p_five * p_target_given,
+            "prob_target_empirical": empirical_five * empirical_target_given,
+        }
+
+    def triples(self, stage: str, model: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Per-state (summed prediction, successes, trials) for stage "A"
+        (five-star over all rows) or "B" (target over five-star rows), for
+        one model or, by default, the fused average the report uses.
+        """
+        if stage == "A":
+            pred, successes, trials = self.pred_five, self.five, self.samples
+        elif stage == "B":
+            pred, successes, trials = self.pred_target, self.target, self.five
+        else:
+            raise ValueError(f"stage must be 'A' or 'B', got {stage!r}")
+        pred_sum = pred.mean(axis=0) if model is None else pred[model]
+        return pred_sum, successes, trials
+
+    def to_dict(self) -> Dict:
+        return {
+            "models_a": self.models_a,
+            "models_b": self.models_b,
+            "source": self.source,
+            "header": self.header,
+            "offset": self.offset,
+            "tail_hash": self.tail_hash,
+            "rows": self.rows,
+            "samples": self.samples.tolist(),
+            "five": self.five.tolist(),
+            "target": self.target.tolist(),
+            "pred_five": self.pred_five.tolist(),
+            "pred_target": self.pred_target.tolist(),
+            "weight": self.weight.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, raw: Dict) -> "ReportAggregates":
+        return cls(
+            models_a=list(raw["models_a"]),
+            models_b=list(raw["models_b"]),
+            source=raw["source"],
+            header=list(raw["header"]),
+            offset=int(raw["offset"]),
+            tail_hash=raw["tail_hash"],
+            rows=int(raw["rows"]),
+            samples=np.array(raw["samples"], dtype=np.int64),
+            five=np.array(raw["five"], dtype=np.int64),
+            target=np.array(raw["target"], dtype=np.int64),
+            pred_five=np.array(raw["pred_five"], dtype=np.float64),
+            pred_target=np.array(raw["pred_target"], dtype=np.float64),
+            weight=np.array(raw["weight"], dtype=np.float64) if "weight" in raw else None,
+        )
+
+    def save(self, path: Path) -> None:
+        save_checkpoint(path, self.to_dict())
+
+
+def stale_reason(aggs: ReportAggregates, path: Path, models_a: List[str], models_b: List[str]) -> Optional[str]:
+    """Why saved aggregates cannot be extended with `path`, or None if they can."""
+    if aggs.models_a != models_a or aggs.models_b != models_b:
+        return "models changed"
+    if aggs.source != str(path):
+        return f"data source changed (was {aggs.source})"
+    if path.stat().st_size < aggs.offset or tail_hash(path, aggs.offset) != aggs.tail_hash:
+        return "data file was rewritten"
+    return None
+
+
+def load_aggregates(
+    state_path: Optional[Path], data_path: Path, models_a: List[str], models_b: List[str], rebuild: bool = False
+) -> Tuple[ReportAggregates, Optional[str]]:
+    """Saved aggregates if still valid for this data file and these models, else empty ones plus the reason."""
+    raw = load_checkpoint(state_path) if (state_path is not None and not rebuild) else None
+    if raw is not None:
+        aggs = ReportAggregates.from_dict(raw)
+        reason = stale_reason(aggs, data_path, models_a, models_b)
+        if reason is None:
+            return aggs, None
+        return ReportAggregates(models_a, models_b), reason
+    return ReportAggregates(models_a, models_b), None
+
+
+def ingest_appended(
+    aggs: ReportAggregates,
+    path: Path,
+    models_a: Sequence,
+    models_b: Sequence,
+    state_path: Optional[Path] = None,
+    block_bytes: int = 64 << 20,
+) -> int:
+    """
+    Add rows of the processed CSV at `path` past `aggs.offset` and return
+    how many were added. With `state_path`, aggregates are saved after every
+    block, so an interrupted run resumes where it stopped.
+    """
+    if aggs.offset == 0:
+        with path.open("rb") as f:
+            first = f.readline()
+        if not first.endswith(b"\n"):
+            return 0
+        aggs.source = str(path)
+        aggs.header = first.decode("utf-8").strip().split(",")
+        aggs.offset = len(first)
+    dtypes = {c: t for c, t in FEATURE_DTYPES.items() if c in aggs.header}
+
+    before = aggs.rows
+    for block, offset in iter_appended_blocks(path, aggs.offset, block_bytes):
+        chunk = pd.read_csv(io.BytesIO(block), header=None, names=aggs.header, dtype=dtypes)
+        aggs.add_frame(chunk, models_a, models_b)
+        aggs.offset = offset
+        aggs.tail_hash = tail_hash(path, offset)
+        if state_path is not None:
+            aggs.save(state_path)
+    if state_path is not None and aggs.rows == before:
+        aggs.tail_hash = tail_hash(path, aggs.offset)
+        aggs.save(state_path)
+    return aggs.rows - before
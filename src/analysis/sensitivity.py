@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import math
+
+import numpy as np
+
+from ..simulation.batch import N_UNIFORMS, BatchOutcome, BatchState, batch_pull
+from ..simulation.engine import SimulationConfig, State
+from ..simulation.exact import five_star_hazard, hazard_gradients
+
+
+# Continuous SimulationConfig fields with a score function. Integer fields
+# (hard_pity, soft_pity_start, capture_hard) shift the support and have none.
+PARAMETERS = (
+    "base_five_star_prob",
+    "soft_pity_step",
+    "target_prob_no_guarantee",
+    "target_prob_guarantee",
+    "capture_prob",
+)
+METRICS = ("five_star_rate", "target_rate", "pulls_to_target")
+
+
+@dataclass
+class Sensitivity:
+    metric: str
+    parameter: str
+    value: float  # current parameter value
+    gradient: float
+    std_error: float
+    # d log(metric) / d log(parameter): comparable across parameter scales.
+    elasticity: Optional[float]
+
+    @property
+    def estimable(self) -> bool:
+        return not math.isnan(self.gradient)
+
+
+def _at_boundary(config: SimulationConfig, parameter: str) -> bool:
+    """
+    A probability fixed at 0 or 1 never produces the other outcome, so the
+    score function cannot see what moving it would change (e.g. the default
+    target_prob_guarantee = 1). The base rate is checked the same way.
+    """
+    if parameter == "soft_pity_step":
+        return False
+    if parameter == "capture_prob" and not config.capture_enabled:
+        return False  # unused: the gradient is exactly zero
+    value = getattr(config, parameter)
+    return value <= 0.0 or value >= 1.0
+
+
+def _bernoulli_score(event: np.ndarray, p: np.ndarray, dp: np.ndarray) -> np.ndarray:
+    """d/dθ log P(event; p(θ)); zero where p is 0 or 1 (no randomness)."""
+    interior = (p > 0.0) & (p < 1.0)
+    safe = np.where(interior, p, 0.5)
+    score = (event - safe) / (safe * (1.0 - safe)) * dp
+    return np.where(interior, score, 0.0)
+
+
+class ScoreTracker:
+    """
+    Accumulates, per path, the score d/dθ log P(path) for every parameter
+    in PARAMETERS, one batch_pull at a time.
+    """
+
+    def __init__(self, config: SimulationConfig, n: int):
+        self.config = config
+        self.hazard = five_star_hazard(config)
+        self.d_hazard = hazard_gradients(config)
+        self.scores = {name: np.zeros(n) for name in PARAMETERS}
+
+    def update(self, guarantee_before: np.ndarray, counter_before: np.ndarray, out: BatchOutcome) -> None:
+        cfg = self.config
+        p_five = self.hazard[out.pity_index]
+        five = out.is_five_star.astype(np.float64)
+        for name, grad in self.d_hazard.items():
+            self.scores[name] += _bernoulli_score(five, p_five, grad[out.pity_index])
+
+        won = (~out.lost_rate_up).astype(np.float64)
+        for name, flag in (("target_prob_no_guarantee", False), ("target_prob_guarantee", True)):
+            drawn = out.is_five_star & (guarantee_before == flag)
+            p = np.float64(getattr(cfg, name))
+            self.scores[name] += np.where(drawn, _bernoulli_score(won, p, np.float64(1.0)), 0.0)
+
+        if cfg.capture_enabled:
+            drawn = out.lost_rate_up & (counter_before + 1 < cfg.capture_hard)
+            captured = out.captured.astype(np.float64)
+            q = np.float64(cfg.capture_prob)
+            self.scores["capture_prob"] += np.where(drawn, _bernoulli_score(captured, q, np.float64(1.0)), 0.0)
+
+
+class _CovarianceSum:
+    """
+    Streaming sums for the LR gradient Cov(Y, S) = E[(Y - E[Y]) S] and the
+    standard error of (Y - y_bar) S, expanded so one pass suffices.
+    """
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.sy = self.ss = self.sys = self.sss = self.syss = self.syyss = 0.0
+
+    def add(self, y: np.ndarray, s: np.ndarray) -> None:
+        ss = s * s
+        self.n += len(y)
+        self.sy += float(y.sum())
+        self.ss += float(s.sum())
+        self.sys += float(np.dot(y, s))
+        self.sss += float(ss.sum())
+        self.syss += float(np.dot(y, ss))
+        self.syyss += float(np.dot(y * y, ss))
+
+    def result(self):
+        n = self.n
+        y_bar, s_bar = self.sy / n, self.ss / n
+        grad = self.sys / n - y_bar * s_bar
+        second = (self.syyss - 2.0 * y_bar * self.syss + y_bar * y_bar * self.sss) / n
+        var = max(second - grad * grad, 0.0) * n / max(n - 1, 1)
+        return y_bar, grad, math.sqrt(var / n)
+
+
+def sensitivity_run(
+    config: SimulationConfig,
+    paths: int,
+    horizon: int,
+    seed: Optional[int] = None,
+    start: Optional[State] = None,
+    chunk_paths: int = 100_000,
+) -> Dict:
+    """
+    One simulation of `paths` independent histories of `horizon` pulls,
+    accumulating per-path scores alongside the outcomes. The gradient of
+    E[metric] w.r.t. each parameter is estimated as Cov(metric, score)
+    (likelihood-ratio method with a mean baseline), so a single run gives
+    every dθ at once without re-simulating perturbed configs.
+    """
+    rng = np.random.default_rng(seed)
+    hazard = five_star_hazard(config)
+    censored = horizon + 1
+    sums = {(m, p): _CovarianceSum() for m in METRICS for p in PARAMETERS}
+
+    done = 0
+    while done < paths:
+        n = min(chunk_paths, paths - done)
+        state = BatchState.repeat(start or State(), n)
+        tracker = ScoreTracker(config, n)
+        five = np.zeros(n)
+        target = np.zeros(n)
+        first = np.full(n, censored, dtype=np.float64)
+
+        for t in range(1, horizon + 1):
+            guarantee, counter = state.guarantee.copy(), state.capture_counter.copy()
+            out = batch_pull(config, state, rng.random((N_UNIFORMS, n)), hazard=hazard)
+            tracker.update(guarantee, counter, out)
+            five += out.is_five_star
+            target += out.is_target
+            first = np.where((first == censored) & out.is_target, t, first)
+
+        values = {"five_star_rate": five / horizon, "target_rate": target / horizon, "pulls_to_target": first}
+        for (metric, param), acc in sums.items():
+            acc.add(values[metric], tracker.scores[param])
+        done += n
+
+    rates: Dict[str, float] = {}
+    gradients: List[Sensitivity] = []
+    for (metric, param), acc in sums.items():
+        y_bar, grad, se = acc.result()
+        rates[metric] = y_bar
+        value = float(getattr(config, param))
+        if _at_boundary(config, param):
+            grad = se = float("nan")
+        elasticity = grad * value / y_bar if y_bar and not math.isnan(grad) else None
+        gradients.append(Sensitivity(metric, param, value, grad, se, elasticity))
+    return {"paths": paths, "horizon": horizon, "metrics": rates, "sensitivities": gradients}
@@ -5,11 +5,6 @@ from typing import Dict, List, Optional
 import math
 import json
 
-try:
-    import yaml  # type: ignore
-except Exception:  # pragma: no cover
-    yaml = None
-
 from ..simulation.engine import GachaEngine, config_from_dict
 
 
@@ -58,25 +53,93 @@ def run_basic_validation(raw_config: Dict, n_pulls: Optional[int] = None) -> Sum
     )
 
 
+def run_conformance(raw_config: Dict, n_pulls: int, engine: str = "batch", horizon: int = 10_000, alpha: float = 1e-3) -> Dict:
+    """
+    Distribution-level checks (pity hazard and histogram, rate-up/capture
+    outcomes, guarantee transitions) against counts derived from the config.
+    engine="scalar" runs GachaEngine.pull_once as one path; "batch" runs the
+    same hazard and five-star rule code on arrays, fast enough for ~1e9
+    pulls.
+    """
+    from .conformance import ConformanceCounts, evaluate, run_batch_conformance
+
+    sim_config = config_from_dict(raw_config)
+    if engine == "scalar":
+        eng = GachaEngine(sim_config)
+        eng.reset()
+        counts = ConformanceCounts(sim_config)
+        counts.add_results(eng.run(n_pulls))
+    else:
+        counts = run_batch_conformance(sim_config, n_pulls, horizon=horizon, seed=sim_config.seed)
+    return evaluate(counts, alpha=alpha)
+
+
 def _load_config(path: str) -> Dict:
-    with open(path, "r", encoding="utf-8") as f:
-        content = f.read()
-    if yaml is None:
+    # Imported on use so `--help` starts fast.
+    try:
+        import yaml  # type: ignore
+    except Exception:  # pragma: no cover
         raise RuntimeError(
             "PyYAML is required to load YAML configs. Install with: pip install pyyaml"
         )
-    return yaml.safe_load(content)
+    # libyaml's loader when available; same result, a fraction of the time.
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     import argparse
 
     parser = argparse.ArgumentParser(description="Basic Monte Carlo validation for Gacha rules.")
     parser.add_argument("--config", required=True, help="Path to game_rules.yaml")
     parser.add_argument("--pulls", type=int, default=None, help="Number of pulls to simulate")
-    args = parser.parse_args()
+    parser.add_argument("--conformance", action="store_true", help="Run the distribution-level conformance suite")
+    parser.add_argument("--engine", choices=["batch", "scalar"], default="batch", help="Conformance: simulator to test")
+    parser.add_argument("--horizon", type=int, default=10000, help="Conformance (batch): pulls per path")
+    parser.add_argument("--alpha", type=float, default=1e-3, help="Conformance: family-wise significance level")
+    parser.add_argument("--out", default=None, help="Conformance: optional JSON report path")
+    parser.add_argument(
+        "--mutation_check",
+        action="store_true",
+        help="Conformance: also inject a rate-preserving pity shift into the engine and require the suite to fail",
+    )
+    parser.add_argument("--mutation_pulls", type=int, default=10_000_000, help="Pulls for --mutation_check")
+    args = parser.parse_args(argv)
 
     raw_config = _load_config(args.config)
+    if args.conformance:
+        n_pulls = args.pulls or int(raw_config.get("validation", {}).get("min_samples", 100000))
+        report = run_conformance(raw_config, n_pulls, args.engine, args.horizon, args.alpha)
+        print(f"=== Conformance ({args.engine}, {report['pulls']} pulls) ===")
+        print(f"Guarantee transitions: {report['guarantee_transitions']}")
+        for row in report["checks"]:
+            df = "-" if row["df"] is None else row["df"]
+            print(
+                f"{row['name']:<24}stat={row['statistic']:.4g}\tdf={df}\tp={row['p_value']:.4g}"
+                f"\tviolations={row['violations']}\t{row['status']}"
+            )
+        print(f"Threshold per check: p >= {report['threshold']:.2g} -> {'PASS' if report['passed'] else 'FAIL'}")
+        ok = report["passed"]
+        if args.mutation_check:
+            from .conformance import mutation_check
+
+            sim_config = config_from_dict(raw_config)
+            mutated = mutation_check(sim_config, args.mutation_pulls, horizon=args.horizon, seed=sim_config.seed, alpha=args.alpha)
+            info = mutated["mutation"]
+            print(
+                f"Mutation (pity shift {info['shift']}, five-star rate {info['five_star_rate_reference']:.6f} -> "
+                f"{info['five_star_rate_mutant']:.6f}): failed {info['failed_checks']} -> "
+                f"{'DETECTED' if mutated['detected'] else 'MISSED'}"
+            )
+            report["mutation_check"] = mutated
+            ok = ok and mutated["detected"]
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        if not ok:
+            raise SystemExit(1)
+        return
+
     stats = run_basic_validation(raw_config, n_pulls=args.pulls)
 
     expected = raw_config.get("validation", {}).get("expected_overall_five_star_rate")
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+import argparse
+import importlib
+import sys
+
+
+# Subcommand -> (module, help). Modules are imported only when their
+# subcommand runs, so heavy dependencies (pandas, sklearn, matplotlib, joblib)
+# never load for lightweight queries.
+COMMANDS: Dict[str, Tuple[str, str]] = {
+    "sim": ("scripts.run_sim", "Run Monte Carlo simulations and persist raw logs"),
+    "features": ("src.models.feature_factory", "Transform raw simulation logs to feature dataset"),
+    "train": ("scripts.train_pipeline", "Train ML models (random_forest / gbdt / two_stage)"),
+    "report": ("scripts.decision_report", "Generate decision report from two-stage models"),
+    "calibrate": ("scripts.calibrate_models", "Isotonic / Platt calibration of stage models on per-state aggregates"),
+    "ingest": ("scripts.ingest_history", "Ingest real pull histories into Beta posteriors; export fitted rules"),
+    "rl": ("scripts.run_rl_baseline", "Run Q-learning baseline and save policy"),
+    "ac": ("scripts.run_actor_critic", "Train NumPy actor-critic policy on batched rollouts"),
+    "inspect": ("scripts.inspect_rl_policy", "Inspect RL policy JSON"),
+    "population": ("scripts.run_population", "Simulate a player population with heterogeneous budgets"),
+    "season": ("scripts.run_season", "Simulate a population through a banner schedule with shared pity"),
+    "rollout": ("scripts.run_rollouts", "Batched conditional rollouts from starting states"),
+    "compare": ("scripts.compare_rules", "Paired comparison of two rule configs (common random numbers)"),
+    "tail": ("scripts.run_tail_risk", "Importance-sampling estimates of rare tail events"),
+    "sensitivity": ("scripts.run_sensitivity", "Likelihood-ratio gradients of rates w.r.t. rule parameters"),
+    "serve": ("scripts.sim_service", "Async simulation job service (coalescing, dedup, metrics)"),
+    "validate": ("src.analysis.stats_tester", "Basic Monte Carlo validation for Gacha rules"),
+    "plot": ("src.analysis.plotter", "Plot PDF/CDF of pity distribution"),
+}
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    lines = [f"  {name:<12}{help_text}" for name, (_, help_text) in COMMANDS.items()]
+    parser = argparse.ArgumentParser(
+        prog="gacha",
+        description="Gacha-DSS unified command line.",
+        epilog="subcommands:\n" + "\n".join(lines) + "\n\nRun 'gacha <subcommand> --help' for options.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", choices=list(COMMANDS.keys()), metavar="subcommand")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = _build_parser()
+    ns = parser.parse_args(argv)
+
+    module_name, _ = COMMANDS[ns.command]
+    module = importlib.import_module(module_name)
+    sys.argv = [f"gacha {ns.command}"] + list(ns.args)
+    module.main(ns.args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+import time
+
+import numpy as np
+
+from src.models.rl_env import EnvConfig
+from src.simulation.batch import N_UNIFORMS, BatchState, batch_pull
+from src.simulation.engine import SimulationConfig
+from src.simulation.exact import five_star_hazard
+
+
+N_FEATURES = 8
+
+
+@dataclass
+class ACConfig:
+    n_envs: int = 4096
+    rollout_steps: int = 32
+    updates: int = 300
+    hidden: int = 32
+    lr: float = 3e-3
+    # Episodes are finite and steps are a feature, so no discounting by default.
+    gamma: float = 1.0
+    gae_lambda: float = 0.95
+    entropy_coef: float = 0.01
+    value_coef: float = 0.5
+    # One pass over each rollout: updates, not collection, bound throughput.
+    epochs: int = 1
+    minibatch: int = 32768
+    seed: int = 0
+
+
+class BatchGachaEnv:
+    """
+    GachaEnv for `n` environments stepped in lockstep on the batch
+    simulator. All environments share the episode length, so they finish
+    together and are reset together.
+    """
+
+    def __init__(self, sim_config: SimulationConfig, env_config: EnvConfig, n: int, rng: np.random.Generator):
+        self.sim_config = sim_config
+        self.env_config = env_config
+        self.n = n
+        self.rng = rng
+        self.hazard = five_star_hazard(sim_config)
+        self.reset()
+
+    def reset(self) -> None:
+        self.state = BatchState.zeros(self.n)
+        self.steps = 0
+        budget = self.env_config.budget
+        self.budget_left = None if budget is None else np.full(self.n, budget, dtype=np.int32)
+
+    def features(self) -> np.ndarray:
+        """(n, N_FEATURES) float32 encoding of pity, guarantee, capture, steps and budget."""
+        cfg = self.sim_config
+        x = np.empty((self.n, N_FEATURES), dtype=np.float32)
+        pity = self.state.pity.astype(np.float32) / cfg.hard_pity
+        x[:, 0] = pity
+        x[:, 1] = pity * pity
+        # Five-star probability of the next pull.
+        x[:, 2] = self.hazard[np.minimum(self.state.pity + 1, cfg.hard_pity)]
+        x[:, 3] = self.state.guarantee
+        x[:, 4] = self.state.capture_counter / max(1, cfg.capture_hard)
+        x[:, 5] = self.steps / self.env_config.max_steps
+        if self.budget_left is None:
+            x[:, 6] = 1.0
+            x[:, 7] = 1.0
+        else:
+            x[:, 6] = self.budget_left / max(1, self.env_config.budget)
+            x[:, 7] = self.budget_left > 0
+        return x
+
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, bool]:
+        """Apply actions (0 = save, 1 = pull); returns (rewards, done)."""
+        ec = self.env_config
+        pull = actions.astype(bool)
+        if self.budget_left is not None:
+            pull &= self.budget_left > 0
+            self.budget_left -= pull
+        out = batch_pull(self.sim_config, self.state, self.rng.random((N_UNIFORMS, self.n)), active=pull, hazard=self.hazard)
+        rewards = (
+            ec.reward_five_star * out.is_five_star + ec.reward_target * out.is_target - ec.pull_cost * pull
+        ).astype(np.float32)
+        self.steps += 1
+        return rewards, self.steps >= ec.max_steps
+
+
+class _TwoHeadMLP:
+    """
+    Shared ReLU hidden layer with two scalar heads (actor logit, critic
+    value); forward/backward by hand. ReLU rather than tanh: np.tanh is
+    several times slower than the matmuls at these sizes.
+    """
+
+    def __init__(self, n_in: int, hidden: int, rng: np.random.Generator):
+        w2 = rng.standard_normal((hidden, 2)) * np.sqrt(1.0 / hidden)
+        w2[:, 0] *= 0.01  # near-uniform initial policy
+        self.params = {
+            "w1": (rng.standard_normal((n_in, hidden)) * np.sqrt(2.0 / n_in)).astype(np.float32),
+            "b1": np.zeros(hidden, dtype=np.float32),
+            "w2": w2.astype(np.float32),
+            "b2": np.zeros(2, dtype=np.float32),
+        }
+
+    def forward(self, x: np.ndarray):
+        h = np.maximum(x @ self.params["w1"] + self.params["b1"], 0.0)
+        out = h @ self.params["w2"] + self.params["b2"]
+        return out[:, 0], out[:, 1], h
+
+    def backward(self, x: np.ndarray, h: np.ndarray, d_logit: np.ndarray, d_value: np.ndarray) -> Dict[str, np.ndarray]:
+        d_out = np.stack([d_logit, d_value], axis=1).astype(np.float32)
+        dh = (d_out @ self.params["w2"].T) * (h > 0)
+        return {
+            "w1": x.T @ dh,
+            "b1": dh.sum(axis=0),
+            "w2": h.T @ d_out,
+            "b2": d_out.sum(axis=0),
+        }
+
+
+class _Adam:
+    def __init__(self, params: Dict[str, np.ndarray], lr: float, beta1: float = 0.9, beta2: float = 0.999):
+        self.params, self.lr, self.beta1, self.beta2 = params, lr, beta1, beta2
+        self.m = {k: np.zeros_like(v) for k, v in params.items()}
+        self.v = {k: np.zeros_like(v) for k, v in params.items()}
+        self.t = 0
+
+    def step(self, grads: Dict[str, np.ndarray]) -> None:
+        self.t += 1
+        c1, c2 = 1 - self.beta1 ** self.t, 1 - self.beta2 ** self.t
+        for k, g in grads.items():
+            self.m[k] = self.beta1 * self.m[k] + (1 - self.beta1) * g
+            self.v[k] = self.beta2 * self.v[k] + (1 - self.beta2) * g * g
+            self.params[k] -= self.lr * (self.m[k] / c1) / (np.sqrt(self.v[k] / c2) + 1e-8)
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class ActorCritic:
+    """Bernoulli pull policy (actor logit) and state-value critic over the feature encoding."""
+
+    def __init__(self, hidden: int, rng: np.random.Generator):
+        self.net = _TwoHeadMLP(N_FEATURES, hidden, rng)
+
+    def pull_prob(self, x: np.ndarray) -> np.ndarray:
+        return _sigmoid(self.net.forward(x)[0])
+
+    def value(self, x: np.ndarray) -> np.ndarray:
+        return self.net.forward(x)[1]
+
+    def greedy(self, x: np.ndarray) -> np.ndarray:
+        return (self.net.forward(x)[0] > 0).astype(np.int8)
+
+    def save(self, path) -> None:
+        np.savez(path, **self.net.params)
+
+
+def _gae(rewards, values, last_value, dones, gamma, lam):
+    """Generalized advantage estimates; dones[t] marks the episode's last step."""
+    steps = rewards.shape[0]
+    adv = np.zeros_like(rewards)
+    running = np.zeros_like(last_value)
+    for t in range(steps - 1, -1, -1):
+        next_value = last_value if t == steps - 1 else values[t + 1]
+        alive = 0.0 if dones[t] else 1.0
+        delta = rewards[t] + gamma * next_value * alive - values[t]
+        running = delta + gamma * lam * alive * running
+        adv[t] = running
+    return adv, adv + values
+
+
+def train_actor_critic(
+    sim_config: SimulationConfig,
+    env_config: EnvConfig,
+    cfg: ACConfig,
+    log: Optional[Callable[[Dict], None]] = None,
+) -> Tuple[ActorCritic, List[Dict]]:
+    """
+    Advantage actor-critic with GAE: collect `rollout_steps` lockstep steps
+    from `n_envs` environments, then `epochs` passes of Adam minibatch
+    updates over the flattened batch. Returns the model and one history
+    row per update (mean episode return so far, env-steps/sec).
+    """
+    rng = np.random.default_rng(cfg.seed)
+    env = BatchGachaEnv(sim_config, env_config, cfg.n_envs, np.random.default_rng([cfg.seed, 1]))
+    model = ActorCritic(cfg.hidden, rng)
+    opt = _Adam(model.net.params, cfg.lr)
+
+    T, N = cfg.rollout_steps, cfg.n_envs
+    xs = np.empty((T, N, N_FEATURES), dtype=np.float32)
+    acts = np.empty((T, N), dtype=np.float32)
+    rews = np.empty((T, N), dtype=np.float32)
+    vals = np.empty((T, N), dtype=np.float32)
+    dones = np.zeros(T, dtype=bool)
+
+    episode_return = np.zeros(N, dtype=np.float64)
+    recent_returns: List[float] = []
+    history: List[Dict] = []
+    total_steps = 0
+    started = time.perf_counter()
+    collect_time = 0.0
+
+    for update in range(1, cfg.updates + 1):
+        t0 = time.perf_counter()
+        for t in range(T):
+            x = env.features()
+            logit, value, _ = model.net.forward(x)
+            a = (rng.random(N) < _sigmoid(logit)).astype(np.float32)
+            xs[t], acts[t], vals[t] = x, a, value
+            rews[t], dones[t] = env.step(a)
+            episode_return += rews[t]
+            if dones[t]:
+                recent_returns.append(float(episode_return.mean()))
+                episode_return[:] = 0.0
+                env.reset()
+        last_value = model.value(env.features())
+        collect_time += time.perf_counter() - t0
+        total_steps += T * N
+
+        adv, ret = _gae(rews, vals, last_value, dones, cfg.gamma, cfg.gae_lambda)
+        adv = (adv - adv.mean()) / (adv.std() + 1e-8)
+        X, A = xs.reshape(-1, N_FEATURES), acts.reshape(-1)
+        ADV, RET = adv.reshape(-1), ret.reshape(-1)
+
+        for _ in range(cfg.epochs):
+            order = rng.permutation(len(X))
+            for start in range(0, len(X), cfg.minibatch):
+                idx = order[start : start + cfg.minibatch]
+                x, a, advantage, target = X[idx], A[idx], ADV[idx], RET[idx]
+                n = len(idx)
+
+                # Actor: minimize -A log pi(a|x) - entropy_coef * H, d/dlogit in
+                # closed form; critic: value_coef * 0.5 * (V - return)^2.
+                logit, value, h = model.net.forward(x)
+                p = _sigmoid(logit)
+                d_logit = (-advantage * (a - p) + cfg.entropy_coef * logit * p * (1 - p)) / n
+                d_value = cfg.value_coef * (value - target) / n
+                opt.step(model.net.backward(x, h, d_logit, d_value))
+
+        elapsed = time.perf_counter() - started
+        row = {
+            "update": update,
+            "env_steps": total_steps,
+            "mean_episode_return": recent_returns[-1] if recent_returns else None,
+            "pull_rate": float(acts.mean()),
+            "env_steps_per_sec": total_steps / elapsed,
+            "collect_steps_per_sec": total_steps / collect_time,
+        }
+        history.append(row)
+        if log is not None:
+            log(row)
+    return model, history
+
+
+def evaluate_policy(
+    sim_config: SimulationConfig,
+    env_config: EnvConfig,
+    policy: Callable[[np.ndarray], np.ndarray],
+    n_envs: int = 20000,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """Mean and standard error of the episode return of `policy` (features -> actions)."""
+    env = BatchGachaEnv(sim_config, env_config, n_envs, np.random.default_rng(seed))
+    total = np.zeros(n_envs)
+    pulls = np.zeros(n_envs)
+    done = False
+    while not done:
+        a = policy(env.features())
+        r, done = env.step(a)
+        total += r
+        pulls += a
+    return {
+        "mean_return": float(total.mean()),
+        "std_error": float(total.std(ddof=1) / np.sqrt(n_envs)),
+        "mean_pull_actions": float(pulls.mean()),
+    }
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+CALIBRATION_METHODS = ("isotonic", "platt")
+_EPS = 1e-6
+
+
+@dataclass
+class StateTriples:
+    """
+    Calibration data grouped by state: mean predicted probability, observed
+    successes and trials per state. Every fit and score below works on
+    these, so its cost depends on the number of states, not rows.
+    """
+
+    p: np.ndarray
+    k: np.ndarray
+    n: np.ndarray
+
+    @classmethod
+    def from_sums(cls, pred_sum: np.ndarray, successes: np.ndarray, trials: np.ndarray) -> "StateTriples":
+        """From per-state summed predictions and counts (any shape); empty states are dropped."""
+        n = np.asarray(trials, dtype=np.int64).ravel()
+        keep = n > 0
+        n = n[keep]
+        p = np.asarray(pred_sum, dtype=np.float64).ravel()[keep] / n
+        return cls(np.clip(p, 0.0, 1.0), np.asarray(successes, dtype=np.int64).ravel()[keep], n)
+
+    def mapped(self, calibrator) -> "StateTriples":
+        return StateTriples(calibrator(self.p), self.k, self.n)
+
+    def split(self, fraction: float, rng: np.random.Generator) -> Tuple["StateTriples", "StateTriples"]:
+        """
+        (rest, held out): each state's rows split at random, `fraction` of
+        them held out, with successes drawn hypergeometrically. Rows of one
+        state share a prediction, so this is a row-level random split.
+        """
+        held_n = rng.binomial(self.n, fraction)
+        held_k = rng.hypergeometric(self.k, self.n - self.k, held_n) if len(self.n) else self.k.copy()
+        held_k = np.where(held_n > 0, held_k, 0)
+
+        def part(k, n):
+            keep = n > 0
+            return StateTriples(self.p[keep], k[keep], n[keep])
+
+        return part(self.k - held_k, self.n - held_n), part(held_k, held_n)
+
+
+@dataclass
+class IsotonicCalibrator:
+    """Piecewise-linear interpolation through weighted pool-adjacent-violators block means."""
+
+    x: np.ndarray
+    y: np.ndarray
+
+    @classmethod
+    def fit(cls, t: StateTriples) -> "IsotonicCalibrator":
+        order = np.argsort(t.p, kind="stable")
+        # Blocks of (sum n * p, sum k, sum n); merge while observed rates decrease.
+        blocks: List[List[float]] = []
+        for i in order:
+            blocks.append([float(t.p[i] * t.n[i]), float(t.k[i]), float(t.n[i])])
+            while len(blocks) > 1 and blocks[-2][1] * blocks[-1][2] >= blocks[-1][1] * blocks[-2][2]:
+                px, k, n = blocks.pop()
+                blocks[-1][0] += px
+                blocks[-1][1] += k
+                blocks[-1][2] += n
+        b = np.array(blocks) if blocks else np.zeros((0, 3))
+        return cls(x=b[:, 0] / b[:, 2], y=b[:, 1] / b[:, 2])
+
+    def __call__(self, p: np.ndarray) -> np.ndarray:
+        if len(self.x) == 0:
+            return np.asarray(p, dtype=np.float64)
+        return np.interp(p, self.x, self.y)
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+def _logit(p: np.ndarray) -> np.ndarray:
+    p = np.clip(p, _EPS, 1 - _EPS)
+    return np.log(p) - np.log1p(-p)
+
+
+@dataclass
+class PlattCalibrator:
+    """sigmoid(a * logit(p) + b), fitted by binomial maximum likelihood."""
+
+    a: float = 1.0
+    b: float = 0.0
+
+    @classmethod
+    def fit(cls, t: StateTriples, iterations: int = 100, ridge: float = 1e-9) -> "PlattCalibrator":
+        z = _logit(t.p)
+        X = np.column_stack([z, np.ones_like(z)])
+
+        def nll(w: np.ndarray) -> float:
+            eta = X @ w
+            return float((t.n * np.logaddexp(0.0, eta) - t.k * eta).sum())
+
+        # Newton with step halving: predictions at 0 or 1 give extreme logits,
+        # where full steps overshoot.
+        w = np.array([1.0, 0.0])
+        loss = nll(w)
+        for _ in range(iterations):
+            q = _sigmoid(X @ w)
+            grad = X.T @ (t.k - t.n * q)
+            hess = (X * (t.n * q * (1 - q))[:, None]).T @ X + ridge * np.eye(2)
+            step = np.linalg.solve(hess, grad)
+            for _ in range(50):
+                new_loss = nll(w + step)
+                if new_loss <= loss:
+                    break
+                step /= 2
+            else:
+                break
+            w, loss = w + step, new_loss
+            if np.abs(step).max() < 1e-10:
+                break
+        return cls(a=float(w[0]), b=float(w[1]))
+
+    def __call__(self, p: np.ndarray) -> np.ndarray:
+        return _sigmoid(self.a * _logit(np.asarray(p, dtype=np.float64)) + self.b)
+
+
+def fit_calibrator(t: StateTriples, method: str = "isotonic"):
+    if method == "isotonic":
+        return IsotonicCalibrator.fit(t)
+    if method == "platt":
+        return PlattCalibrator.fit(t)
+    raise ValueError(f"unknown calibration method: {method} (expected one of {CALIBRATION_METHODS})")
+
+
+def reliability(t: StateTriples, n_bins: int = 10) -> Dict:
+    """
+    Reliability curve over `n_bins` equal-width probability bins, with ECE
+    and Brier score, from one grouped pass. Brier assumes one prediction per
+    state, which holds exactly when the model's features are the state.
+    """
+    total = int(t.n.sum())
+    if total == 0:
+        return {"samples": 0, "ece": None, "brier": None, "bins": []}
+    bins = np.minimum((t.p * n_bins).astype(np.int64), n_bins - 1)
+    n_b = np.bincount(bins, weights=t.n, minlength=n_bins)
+    k_b = np.bincount(bins, weights=t.k, minlength=n_bins)
+    p_b = np.bincount(bins, weights=t.n * t.p, minlength=n_bins)
+    filled = n_b > 0
+    conf = np.divide(p_b, n_b, out=np.zeros(n_bins), where=filled)
+    acc = np.divide(k_b, n_b, out=np.zeros(n_bins), where=filled)
+    ece = float((n_b * np.abs(acc - conf)).sum() / total)
+    brier = float((t.k * (1 - t.p) ** 2 + (t.n - t.k) * t.p ** 2).sum() / total)
+    rows = [
+        {
+            "bin": f"{b / n_bins:.2f}-{(b + 1) / n_bins:.2f}",
+            "samples": int(n_b[b]),
+            "mean_predicted": float(conf[b]),
+            "observed_rate": float(acc[b]),
+        }
+        for b in range(n_bins)
+        if filled[b]
+    ]
+    return {"samples": total, "ece": ece, "brier": brier, "bins": rows}
+
+
+class CalibratedModel:
+    """
+    A fitted classifier whose positive-class probability is passed through a
+    calibrator. Exposes predict_proba, so decision_report and joblib load it
+    like any other stage model.
+    """
+
+    def __init__(self, base, calibrator, method: str):
+        self.base = base
+        self.calibrator = calibrator
+        self.method = method
+        self.classes_ = getattr(base, "classes_", np.array([0, 1]))
+
+    def predict_proba(self, X) -> np.ndarray:
+        q = self.calibrator(self.base.predict_proba(X)[:, 1])
+        return np.column_stack([1 - q, q])
+
+    def predict(self, X) -> np.ndarray:
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(np.int64)
+
+
+def calibrate(
+    base,
+    t: StateTriples,
+    method: str = "isotonic",
+    n_bins: int = 10,
+    holdout: float = 0.3,
+    rng: Optional[np.random.Generator] = None,
+) -> Tuple[CalibratedModel, Dict]:
+    """
+    Fit a calibrator on `t` less a random `holdout` fraction of its rows
+    (see StateTriples.split) and report reliability before/after on the
+    held-out rows. With holdout=0 it fits on everything and the report is
+    marked in-sample, since the fit then sees the rows it is scored on.
+    """
+    if not 0.0 <= holdout < 1.0:
+        raise ValueError(f"holdout must be in [0, 1), got {holdout}")
+    if holdout > 0:
+        fit, evaluation = t.split(holdout, rng if rng is not None else np.random.default_rng())
+    else:
+        fit, evaluation = t, t
+    calibrator = fit_calibrator(fit, method)
+    report = {
+        "evaluated_on": "holdout" if holdout > 0 else "in_sample",
+        "fit_samples": int(fit.n.sum()),
+        "before": reliability(evaluation, n_bins),
+        "after": reliability(evaluation.mapped(calibrator), n_bins),
+    }
+    return CalibratedModel(base, calibrator, method), report
+
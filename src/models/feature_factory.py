@@ -2,8 +2,36 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional
 import csv
 
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy as np
+    import pandas as pd
+
+
+# Processed feature schema with compact dtypes; raw column -> feature column.
+FEATURE_DTYPES: Dict[str, str] = {
+    "pull_index": "int64",
+    "pity_before": "int16",
+    "guarantee_before": "int8",
+    "capture_counter_before": "int8",
+    "label_is_five_star": "int8",
+    "label_is_target": "int8",
+    "weight": "float64",
+}
+# Optional importance weight (stratified data): carried through unchanged,
+# never a model feature; training and metrics use it as sample weight.
+WEIGHT_COLUMN = "weight"
+FEATURE_SOURCES: Dict[str, str] = {
+    "pull_index": "pull_index",
+    "pity_before": "pity_before",
+    "guarantee_before": "guarantee_before",
+    "capture_counter_before": "capture_counter_before",
+    "label_is_five_star": "is_five_star",
+    "label_is_target": "is_target",
+}
+
 
 @dataclass
 class FeatureRow:
@@ -13,9 +41,11 @@ class FeatureRow:
     capture_counter_before: int
     is_five_star: int
     is_target: int
+    weight: Optional[float] = None
 
 
 def transform_row(row: dict) -> FeatureRow:
+    weight = row.get(WEIGHT_COLUMN)
     return FeatureRow(
         pull_index=int(row["pull_index"]),
         pity_before=int(row["pity_before"]),
@@ -23,6 +53,7 @@ def transform_row(row: dict) -> FeatureRow:
         capture_counter_before=int(row["capture_counter_before"]),
         is_five_star=int(row["is_five_star"]),
         is_target=int(row["is_target"]),
+        weight=None if weight is None else float(weight),
     )
 
 
@@ -33,6 +64,7 @@ def build_features(input_path: str, output_path: str) -> Path:
 
     with in_path.open("r", encoding="utf-8") as f:
         reader = csv.DictReader(f)
+        weighted = WEIGHT_COLUMN in (reader.fieldnames or [])
         rows = [transform_row(r) for r in reader]
 
     with out_path.open("w", newline="", encoding="utf-8") as f:
@@ -46,6 +78,7 @@ def build_features(input_path: str, output_path: str) -> Path:
                 "label_is_five_star",
                 "label_is_target",
             ]
+            + ([WEIGHT_COLUMN] if weighted else [])
         )
         for r in rows:
             writer.writerow(
@@ -57,18 +90,42 @@ def build_features(input_path: str, output_path: str) -> Path:
                     r.is_five_star,
                     r.is_target,
                 ]
+                + ([r.weight] if weighted else [])
             )
 
     return out_path
 
 
-def main() -> None:
+def feature_frame(columns: Mapping[str, "np.ndarray"]) -> "pd.DataFrame":
+    """
+    In-memory build_features: raw column arrays (e.g. simulation.columns.run_columns)
+    to the processed feature frame. Columns already in FEATURE_DTYPES are
+    wrapped without copying.
+    """
+    import pandas as pd
+
+    data = {name: columns[src].astype(FEATURE_DTYPES[name], copy=False) for name, src in FEATURE_SOURCES.items()}
+    if WEIGHT_COLUMN in columns:
+        data[WEIGHT_COLUMN] = columns[WEIGHT_COLUMN].astype(FEATURE_DTYPES[WEIGHT_COLUMN], copy=False)
+    return pd.DataFrame(data, copy=False)
+
+
+def write_features_csv(df: "pd.DataFrame", output_path: str) -> Path:
+    """Persist a feature_frame in the build_features CSV format."""
+    out_path = Path(output_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    # csv.writer (build_features) terminates rows with \r\n.
+    df.to_csv(out_path, index=False, lineterminator="\r\n")
+    return out_path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     import argparse
 
     parser = argparse.ArgumentParser(description="Transform raw simulation logs to feature dataset.")
     parser.add_argument("--input", required=True, help="Path to raw CSV log")
     parser.add_argument("--output", required=True, help="Path to processed CSV")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     out_path = build_features(args.input, args.output)
     print(f"Wrote processed dataset to: {out_path}")
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import math
+import random
+
+from joblib import Parallel, delayed
+from sklearn.metrics import brier_score_loss, log_loss
+from threadpoolctl import threadpool_limits
+
+from .ml_agent import DataSplit, TrainResult, _importances, _metrics, _values, allocate_cores, make_model
+
+
+MINIMIZED_METRICS = ("log_loss", "brier")
+
+
+@dataclass
+class SearchConfig:
+    n_candidates: int = 27
+    eta: int = 3
+    min_samples: int = 20000
+    eval_samples: Optional[int] = 200000
+    # Share of the holdout split kept out of the search and used only to
+    # score the winner, so reported metrics are not the selection scores.
+    validation_fraction: float = 0.5
+    metric: str = "log_loss"
+    seed: int = 42
+
+
+@dataclass
+class LearnerSpace:
+    budget_param: str
+    min_budget: int
+    max_budget: int
+    space: Dict[str, object] = field(default_factory=dict)
+
+
+@dataclass
+class Trial:
+    rung: int
+    candidate: int
+    params: Dict[str, object]
+    samples: int
+    metrics: Dict[str, float]
+
+
+def search_config_from_dict(raw: Dict) -> SearchConfig:
+    s = raw.get("search", {})
+    return SearchConfig(
+        n_candidates=int(s.get("n_candidates", 27)),
+        eta=int(s.get("eta", 3)),
+        min_samples=int(s.get("min_samples", 20000)),
+        eval_samples=None if s.get("eval_samples") is None else int(s["eval_samples"]),
+        validation_fraction=float(s.get("validation_fraction", 0.5)),
+        metric=str(s.get("metric", "log_loss")),
+        seed=int(s.get("seed", 42)),
+    )
+
+
+def learner_space_from_dict(raw: Dict, learner: str, gbdt_backend: str = "sklearn") -> LearnerSpace:
+    """
+    Search space for `learner`. gbdt on the hist backend reads the
+    `gbdt_hist` block, since HistGradientBoostingClassifier takes different
+    parameters. Every name must be a parameter of the estimator.
+    """
+    key = "gbdt_hist" if learner == "gbdt" and gbdt_backend == "hist" else learner
+    if key not in raw:
+        raise ValueError(f"no search space for learner: {key}")
+    block = raw[key]
+    space = LearnerSpace(
+        budget_param=str(block["budget_param"]),
+        min_budget=int(block["min_budget"]),
+        max_budget=int(block["max_budget"]),
+        space=dict(block.get("space", {})),
+    )
+    valid = make_model(learner, gbdt_backend=gbdt_backend).get_params()
+    unknown = sorted(name for name in [space.budget_param, *space.space] if name not in valid)
+    if unknown:
+        raise ValueError(f"search space {key}: not parameters of the {learner} ({gbdt_backend}) model: {unknown}")
+    return space
+
+
+def sample_params(space: Dict[str, object], rng: random.Random) -> Dict[str, object]:
+    params: Dict[str, object] = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            params[name] = rng.choice(spec)
+        elif isinstance(spec, dict):
+            low, high = spec["low"], spec["high"]
+            if spec.get("int", False):
+                params[name] = rng.randint(int(low), int(high))
+            elif spec.get("log", False):
+                params[name] = math.exp(rng.uniform(math.log(low), math.log(high)))
+            else:
+                params[name] = rng.uniform(low, high)
+        else:
+            params[name] = spec
+    return params
+
+
+def _score(metrics: Dict[str, float], metric: str) -> float:
+    """Higher is better."""
+    value = metrics[metric]
+    return -value if metric in MINIMIZED_METRICS else value
+
+
+def _evaluate(
+    learner: str,
+    params: Dict[str, object],
+    sub: DataSplit,
+    seed: int,
+    n_jobs: int,
+    gbdt_backend: str,
+    keep_model: bool,
+):
+    model = make_model(learner, seed, n_jobs=n_jobs, gbdt_backend=gbdt_backend, params=params)
+    with threadpool_limits(limits=n_jobs):
+        model.fit(sub.X_train, sub.y_train)
+        metrics = _score_model(model, sub.X_test, sub.y_test, sub.w_test)
+    return metrics, (model if keep_model else None)
+
+
+def _score_model(model, X_eval, y_eval, w_eval) -> Dict[str, float]:
+    y_prob = model.predict_proba(X_eval)[:, 1]
+    w_eval = _values(w_eval)
+    metrics = _metrics(y_eval.values, y_prob, w_eval)
+    metrics["log_loss"] = float(log_loss(y_eval.values, y_prob, labels=[0, 1], sample_weight=w_eval))
+    metrics["brier"] = float(brier_score_loss(y_eval.values, y_prob, sample_weight=w_eval))
+    return metrics
+
+
+def successive_halving(
+    model_name: str,
+    learner: str,
+    split: DataSplit,
+    cfg: SearchConfig,
+    space: LearnerSpace,
+    total_cores: int = 1,
+    gbdt_backend: str = "sklearn",
+):
+    """
+    Successive halving over random candidates. Rung r trains the surviving
+    candidates on the first n_full * eta**(r - last rung) rows of the
+    (already shuffled) training split, never fewer than min_samples, with
+    a tree budget growing by eta per rung; the last rung uses the full
+    split and max_budget. Each rung runs as one process-pool batch.
+    Candidates are ranked on the first part of the holdout split; the
+    winner is then scored on the remaining `validation_fraction` of it.
+
+    Returns (TrainResult of the best candidate with its validation metrics,
+    best params, trial history).
+    """
+    if cfg.metric not in ("roc_auc", "accuracy", "f1") + MINIMIZED_METRICS:
+        raise ValueError(f"unknown search metric: {cfg.metric}")
+    if not 0.0 < cfg.validation_fraction < 1.0:
+        raise ValueError(f"validation_fraction must be in (0, 1), got {cfg.validation_fraction}")
+
+    rng = random.Random(cfg.seed)
+    candidates = [sample_params(space.space, rng) for _ in range(cfg.n_candidates)]
+    n_rungs = int(math.floor(math.log(max(1, cfg.n_candidates), cfg.eta) + 1e-9)) + 1
+
+    n_full = len(split.y_train)
+    n_val = int(round(len(split.y_test) * cfg.validation_fraction))
+    n_select = len(split.y_test) - n_val
+    if n_val == 0 or n_select == 0:
+        raise ValueError("holdout split too small to keep a validation part")
+    n_eval = n_select if cfg.eval_samples is None else min(cfg.eval_samples, n_select)
+    alive = list(range(len(candidates)))
+    history: List[Trial] = []
+    best_model = None
+
+    for rung in range(n_rungs):
+        shrink = float(cfg.eta) ** (rung - (n_rungs - 1))
+        n_train = min(n_full, max(cfg.min_samples, int(math.ceil(n_full * shrink))))
+        budget = min(space.max_budget, max(space.min_budget, int(math.ceil(space.max_budget * shrink))))
+        last = rung == n_rungs - 1
+
+        sub = DataSplit(
+            split.X_train.iloc[:n_train],
+            split.X_test.iloc[:n_eval],
+            split.y_train.iloc[:n_train],
+            split.y_test.iloc[:n_eval],
+            None if split.w_train is None else split.w_train.iloc[:n_train],
+            None if split.w_test is None else split.w_test.iloc[:n_eval],
+        )
+        workers = min(len(alive), total_cores)
+        cores = allocate_cores([learner] * workers, total_cores, gbdt_backend)[0] if workers > 1 else total_cores
+        outputs = Parallel(n_jobs=workers, backend="loky")(
+            delayed(_evaluate)(
+                learner,
+                {**candidates[c], space.budget_param: budget},
+                sub,
+                cfg.seed,
+                cores,
+                gbdt_backend,
+                last,
+            )
+            for c in alive
+        )
+
+        scored = []
+        for c, (metrics, model) in zip(alive, outputs):
+            history.append(Trial(rung, c, {**candidates[c], space.budget_param: budget}, n_train, metrics))
+            scored.append((_score(metrics, cfg.metric), c, model))
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        if last:
+            _, best, best_model = scored[0]
+            break
+        keep = max(1, len(alive) // cfg.eta)
+        alive = [c for _, c, _ in scored[:keep]]
+
+    best_params = {**candidates[best], space.budget_param: budget}
+    X_val, y_val = split.X_test.iloc[n_select:], split.y_test.iloc[n_select:]
+    w_val = None if split.w_test is None else split.w_test.iloc[n_select:]
+    with threadpool_limits(limits=total_cores):
+        metrics = _score_model(best_model, X_val, y_val, w_val)
+    importances = _importances(best_model, X_val, y_val, cfg.seed, w_val)
+    result = TrainResult(model_name, metrics, importances, best_model)
+    return result, best_params, history
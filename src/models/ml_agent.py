@@ -1,14 +1,23 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import roc_auc_score, accuracy_score, f1_score
 
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from joblib import Parallel, delayed
+from sklearn.ensemble import (
+    RandomForestClassifier,
+    GradientBoostingClassifier,
+    HistGradientBoostingClassifier,
+)
+from sklearn.inspection import permutation_importance
+from threadpoolctl import threadpool_limits
+
+from .feature_factory import FEATURE_DTYPES, WEIGHT_COLUMN
 
 
 @dataclass
@@ -19,61 +28,196 @@ class TrainResult:
     model: object
 
 
-def _split(df: pd.DataFrame, label_col: str, test_size: float, seed: int):
-    X = df.drop(columns=[label_col])
-    y = df[label_col]
-    return train_test_split(X, y, test_size=test_size, random_state=seed, stratify=y)
+@dataclass
+class DataSplit:
+    X_train: pd.DataFrame
+    X_test: pd.DataFrame
+    y_train: pd.Series
+    y_test: pd.Series
+    # Importance weights (stratified data), else None.
+    w_train: Optional[pd.Series] = None
+    w_test: Optional[pd.Series] = None
 
 
-def _metrics(y_true, y_prob) -> Dict[str, float]:
-    y_pred = (y_prob >= 0.5).astype(int)
-    return {
-        "roc_auc": float(roc_auc_score(y_true, y_prob)),
-        "accuracy": float(accuracy_score(y_true, y_pred)),
-        "f1": float(f1_score(y_true, y_pred)),
-    }
+@dataclass
+class TrainTask:
+    model_name: str
+    learner: str  # "random_forest" or "gbdt"
+    split: DataSplit
+    n_jobs: int = 1
+    params: Optional[Dict] = None
 
 
-def train_random_forest(df: pd.DataFrame, label_col: str, seed: int = 42) -> TrainResult:
-    X_train, X_test, y_train, y_test = _split(df, label_col, test_size=0.2, seed=seed)
+GBDT_BACKENDS = ("sklearn", "hist")
 
-    model = RandomForestClassifier(
-        n_estimators=300,
-        max_depth=None,
-        random_state=seed,
-        n_jobs=4,
-    )
-    model.fit(X_train, y_train)
 
-    y_prob = model.predict_proba(X_test)[:, 1]
-    metrics = _metrics(y_test.values, y_prob)
+def _split(df: pd.DataFrame, label_col: str, test_size: float, seed: int):
+    if WEIGHT_COLUMN in df.columns:
+        X = df.drop(columns=[label_col, WEIGHT_COLUMN])
+        y = df[label_col]
+        return train_test_split(X, y, df[WEIGHT_COLUMN], test_size=test_size, random_state=seed, stratify=y)
+    X = df.drop(columns=[label_col])
+    y = df[label_col]
+    return train_test_split(X, y, test_size=test_size, random_state=seed, stratify=y)
 
-    importances = dict(zip(X_train.columns.tolist(), model.feature_importances_.tolist()))
 
-    return TrainResult("random_forest", metrics, importances, model)
+def split_dataset(df: pd.DataFrame, label_col: str, test_size: float = 0.2, seed: int = 42) -> DataSplit:
+    return DataSplit(*_split(df, label_col, test_size=test_size, seed=seed))
 
 
-def train_gbdt(df: pd.DataFrame, label_col: str, seed: int = 42) -> TrainResult:
-    X_train, X_test, y_train, y_test = _split(df, label_col, test_size=0.2, seed=seed)
+def _metrics(y_true, y_prob, sample_weight=None) -> Dict[str, float]:
+    y_pred = (y_prob >= 0.5).astype(int)
+    return {
+        "roc_auc": float(roc_auc_score(y_true, y_prob, sample_weight=sample_weight)),
+        "accuracy": float(accuracy_score(y_true, y_pred, sample_weight=sample_weight)),
+        "f1": float(f1_score(y_true, y_pred, sample_weight=sample_weight)),
+    }
 
-    model = GradientBoostingClassifier(
-        n_estimators=200,
-        learning_rate=0.08,
-        max_depth=3,
-        random_state=seed,
-    )
-    model.fit(X_train, y_train)
 
-    y_prob = model.predict_proba(X_test)[:, 1]
-    metrics = _metrics(y_test.values, y_prob)
+def _values(w: Optional[pd.Series]):
+    return None if w is None else w.to_numpy()
+
+
+def make_random_forest(seed: int = 42, n_jobs: int = 4, params: Optional[Dict] = None) -> RandomForestClassifier:
+    kwargs = {"n_estimators": 300, "max_depth": None}
+    kwargs.update(params or {})
+    return RandomForestClassifier(random_state=seed, n_jobs=n_jobs, **kwargs)
+
+
+def make_gbdt(seed: int = 42, backend: str = "sklearn", params: Optional[Dict] = None):
+    if backend == "hist":
+        # Histogram-based boosting: binned features, OpenMP multithreaded.
+        kwargs = {"max_iter": 200, "learning_rate": 0.08, "max_depth": 3}
+        kwargs.update(params or {})
+        return HistGradientBoostingClassifier(random_state=seed, **kwargs)
+    if backend != "sklearn":
+        raise ValueError(f"unknown gbdt backend: {backend}")
+    kwargs = {"n_estimators": 200, "learning_rate": 0.08, "max_depth": 3}
+    kwargs.update(params or {})
+    return GradientBoostingClassifier(random_state=seed, **kwargs)
+
+
+def make_model(
+    learner: str,
+    seed: int = 42,
+    n_jobs: int = 4,
+    gbdt_backend: str = "sklearn",
+    params: Optional[Dict] = None,
+):
+    if learner == "random_forest":
+        return make_random_forest(seed, n_jobs=n_jobs, params=params)
+    if learner == "gbdt":
+        return make_gbdt(seed, backend=gbdt_backend, params=params)
+    raise ValueError(f"unknown learner: {learner}")
+
+
+def _importances(
+    model, X_test: pd.DataFrame, y_test: pd.Series, seed: int, w_test: Optional[pd.Series] = None
+) -> Dict[str, float]:
+    if hasattr(model, "feature_importances_"):
+        values = model.feature_importances_
+    else:
+        # HistGradientBoostingClassifier has no impurity importances.
+        n = min(len(X_test), 20000)
+        result = permutation_importance(
+            model,
+            X_test.iloc[:n],
+            y_test.iloc[:n],
+            n_repeats=3,
+            random_state=seed,
+            scoring="roc_auc",
+            sample_weight=None if w_test is None else w_test.iloc[:n].to_numpy(),
+        )
+        values = result.importances_mean
+    return dict(zip(X_test.columns.tolist(), np.asarray(values, dtype=float).tolist()))
+
+
+def train_on_split(
+    model_name: str,
+    learner: str,
+    split: DataSplit,
+    seed: int = 42,
+    n_jobs: int = 4,
+    gbdt_backend: str = "sklearn",
+    params: Optional[Dict] = None,
+) -> TrainResult:
+    model = make_model(learner, seed, n_jobs=n_jobs, gbdt_backend=gbdt_backend, params=params)
+
+    with threadpool_limits(limits=n_jobs):
+        # Importance weights depend only on the starting state, which the
+        # features contain, so P(label | features) is the same with or
+        # without them: fit unweighted and keep the oversampled states'
+        # resolution. Test metrics are weighted back to the natural stream.
+        model.fit(split.X_train, split.y_train)
+        y_prob = model.predict_proba(split.X_test)[:, 1]
+        importances = _importances(model, split.X_test, split.y_test, seed, split.w_test)
+    metrics = _metrics(split.y_test.values, y_prob, _values(split.w_test))
+
+    return TrainResult(model_name, metrics, importances, model)
 
-    importances = dict(zip(X_train.columns.tolist(), model.feature_importances_.tolist()))
 
-    return TrainResult("gbdt", metrics, importances, model)
+def train_random_forest(df: pd.DataFrame, label_col: str, seed: int = 42) -> TrainResult:
+    return train_on_split("random_forest", "random_forest", split_dataset(df, label_col, seed=seed), seed)
+
+
+def train_gbdt(df: pd.DataFrame, label_col: str, seed: int = 42, backend: str = "sklearn") -> TrainResult:
+    split = split_dataset(df, label_col, seed=seed)
+    return train_on_split("gbdt", "gbdt", split, seed, gbdt_backend=backend)
+
+
+def allocate_cores(
+    learners: List[str], total_cores: int, gbdt_backend: str = "sklearn", workers: Optional[int] = None
+) -> List[int]:
+    """
+    Split `total_cores` across models trained by `workers` concurrent
+    processes (default: all at once). Classic GBDT is single-threaded and
+    gets one core. When every model runs at once, the rest is shared evenly
+    (remainder to the first tasks) among random forests and histogram
+    GBDTs; with fewer workers than models, any model may run beside any
+    other, so each gets one worker's share, total_cores // workers.
+    """
+    slots = min(workers or len(learners), len(learners))
+    if slots < len(learners):
+        share = max(1, total_cores // slots)
+        return [1 if learner == "gbdt" and gbdt_backend == "sklearn" else share for learner in learners]
+    fixed = [learner == "gbdt" and gbdt_backend == "sklearn" for learner in learners]
+    n_flex = len(learners) - sum(fixed)
+    spare = max(total_cores - sum(fixed), n_flex)
+    share, extra = divmod(spare, n_flex) if n_flex else (0, 0)
+
+    cores = []
+    for is_fixed in fixed:
+        if is_fixed:
+            cores.append(1)
+        else:
+            cores.append(max(1, share + (1 if extra > 0 else 0)))
+            extra -= 1
+    return cores
+
+
+def train_parallel(
+    tasks: List[TrainTask],
+    seed: int = 42,
+    gbdt_backend: str = "sklearn",
+    max_workers: Optional[int] = None,
+) -> List[TrainResult]:
+    """
+    Train independent models concurrently in a process pool (joblib/loky,
+    which memory-maps large arrays instead of copying them to each worker).
+    Results are returned in task order.
+    """
+    if not tasks:
+        return []
+    workers = max_workers or len(tasks)
+    return Parallel(n_jobs=min(workers, len(tasks)), backend="loky")(
+        delayed(train_on_split)(t.model_name, t.learner, t.split, seed, t.n_jobs, gbdt_backend, t.params)
+        for t in tasks
+    )
 
 
 def load_dataset(path: str) -> pd.DataFrame:
-    return pd.read_csv(path)
+    columns = pd.read_csv(path, nrows=0).columns
+    return pd.read_csv(path, dtype={c: FEATURE_DTYPES[c] for c in columns if c in FEATURE_DTYPES})
 
 
 def select_features(df: pd.DataFrame, label_col: str) -> Tuple[pd.DataFrame, str]:
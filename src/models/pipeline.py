@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from ..simulation.columns import run_columns, write_raw_csv
+from ..simulation.engine import GachaEngine, config_from_dict
+from .feature_factory import feature_frame, write_features_csv
+from .ml_agent import TrainResult, TrainTask, allocate_cores, split_dataset, train_parallel
+
+
+@dataclass
+class PipelineOutput:
+    features: pd.DataFrame
+    results: List[TrainResult]
+    # Files written on request (raw log / feature CSV), else None.
+    raw_path: Optional[Path] = None
+    features_path: Optional[Path] = None
+
+
+def simulate_features(raw_config: Dict, n_pulls: int, seed: Optional[int] = None):
+    """Run GachaEngine and return (raw column arrays, feature frame), all in memory."""
+    config = config_from_dict(raw_config)
+    if seed is not None:
+        config.seed = seed
+    engine = GachaEngine(config)
+    engine.reset()
+    columns = run_columns(engine, n_pulls)
+    return columns, feature_frame(columns)
+
+
+def build_tasks(df: pd.DataFrame, model: str, label_col: str) -> List[TrainTask]:
+    """
+    Train/test splits and tasks for a feature frame. Each stage is split
+    once and its models share the split. `df` is not modified.
+    """
+    if label_col not in df.columns:
+        raise ValueError(f"label column not found: {label_col}")
+    if model != "two_stage":
+        if label_col == "label_is_target" and "label_is_five_star" in df.columns:
+            df = df[df["label_is_five_star"] == 1].drop(columns=["label_is_five_star"])
+    if "pull_index" in df.columns:
+        df = df.drop(columns=["pull_index"])
+
+    tasks = []
+    if model in ("random_forest", "gbdt", "both"):
+        split = split_dataset(df, label_col)
+        learners = ["random_forest", "gbdt"] if model == "both" else [model]
+        tasks.extend(TrainTask(name, name, split) for name in learners)
+
+    if model == "two_stage":
+        # Stage A: predict five-star on all samples
+        if "label_is_five_star" not in df.columns:
+            raise RuntimeError("label_is_five_star not found in dataset for two_stage")
+        split_a = split_dataset(df.drop(columns=["label_is_target"]), "label_is_five_star")
+        tasks.append(TrainTask("stageA_random_forest", "random_forest", split_a))
+        tasks.append(TrainTask("stageA_gbdt", "gbdt", split_a))
+
+        # Stage B: predict target conditional on five-star
+        df_stage_b = df[df["label_is_five_star"] == 1].drop(columns=["label_is_five_star"])
+        split_b = split_dataset(df_stage_b, "label_is_target")
+        tasks.append(TrainTask("stageB_random_forest", "random_forest", split_b))
+        tasks.append(TrainTask("stageB_gbdt", "gbdt", split_b))
+    return tasks
+
+
+def configure_tasks(
+    tasks: List[TrainTask],
+    total_cores: int,
+    workers: int,
+    gbdt_backend: str = "sklearn",
+    params: Optional[Dict] = None,
+) -> None:
+    """Per-task core budgets (see allocate_cores) and params keyed by model name or learner."""
+    if workers > 1:
+        cores = allocate_cores([t.learner for t in tasks], total_cores, gbdt_backend, workers)
+    else:
+        cores = [total_cores] * len(tasks)
+    for task, n in zip(tasks, cores):
+        task.n_jobs = n
+    if params:
+        for task in tasks:
+            task.params = params.get(task.model_name, params.get(task.learner))
+
+
+def run_pipeline(
+    raw_config: Dict,
+    n_pulls: int,
+    model: str = "two_stage",
+    label_col: str = "label_is_target",
+    seed: Optional[int] = None,
+    total_cores: int = 1,
+    workers: Optional[int] = None,
+    gbdt_backend: str = "sklearn",
+    params: Optional[Dict] = None,
+    raw_path: Optional[Path] = None,
+    features_path: Optional[Path] = None,
+) -> PipelineOutput:
+    """
+    Simulate -> features -> train without intermediate files. The raw log
+    and the feature CSV are written only when their paths are given, in
+    the same formats as run_sim and feature_factory.
+    """
+    columns, features = simulate_features(raw_config, n_pulls, seed)
+    if raw_path is not None:
+        raw_path = write_raw_csv(columns, Path(raw_path))
+    del columns
+    if features_path is not None:
+        features_path = write_features_csv(features, features_path)
+
+    tasks = build_tasks(features, model, label_col)
+    workers = workers or min(len(tasks), total_cores)
+    configure_tasks(tasks, total_cores, workers, gbdt_backend, params)
+    results = train_parallel(tasks, gbdt_backend=gbdt_backend, max_workers=workers)
+    return PipelineOutput(features, results, raw_path, features_path)
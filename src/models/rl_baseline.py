@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, Tuple
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
 import random
 
 from src.models.rl_env import GachaEnv
@@ -18,6 +18,15 @@ class QConfig:
     pity_bucket: int = 5
 
 
+@dataclass
+class QProgress:
+    """Resumable q_learn position: episodes finished, current epsilon, Q-table."""
+
+    episode: int = 0
+    epsilon: Optional[float] = None
+    q: Dict[Tuple[int, int, int, int], float] = field(default_factory=dict)
+
+
 def _bucket(pity: int, bucket: int) -> int:
     return pity // bucket
 
@@ -30,8 +39,24 @@ def discretize_obs(obs: Dict[str, int], bucket: int) -> Tuple[int, int, int]:
     )
 
 
-def q_learn(env: GachaEnv, cfg: QConfig) -> Dict[Tuple[int, int, int, int], float]:
-    q: Dict[Tuple[int, int, int, int], float] = {}
+def q_learn(
+    env: GachaEnv,
+    cfg: QConfig,
+    rng=None,
+    progress: Optional[QProgress] = None,
+    on_episode: Optional[Callable[[QProgress], None]] = None,
+) -> Dict[Tuple[int, int, int, int], float]:
+    """
+    Tabular Q-learning. Exploration draws from `rng` (default: the global
+    `random` module). Pass `progress` to continue a previous run from its
+    episode count, epsilon and Q-table; `on_episode` is called with the
+    updated progress after every episode (e.g. to checkpoint it).
+    """
+    rng = rng if rng is not None else random
+    progress = progress or QProgress()
+    if progress.epsilon is None:
+        progress.epsilon = cfg.epsilon
+    q = progress.q
 
     def q_get(state, action):
         return q.get((state[0], state[1], state[2], action), 0.0)
@@ -39,16 +64,16 @@ def q_learn(env: GachaEnv, cfg: QConfig) -> Dict[Tuple[int, int, int, int], floa
     def q_set(state, action, value):
         q[(state[0], state[1], state[2], action)] = value
 
-    epsilon = cfg.epsilon
+    epsilon = progress.epsilon
 
-    for _ in range(cfg.episodes):
+    for episode in range(progress.episode, cfg.episodes):
         obs = env.reset()
         state = discretize_obs(obs, cfg.pity_bucket)
         done = False
 
         while not done:
-            if random.random() < epsilon:
-                action = random.choice([0, 1])
+            if rng.random() < epsilon:
+                action = rng.choice([0, 1])
             else:
                 q0 = q_get(state, 0)
                 q1 = q_get(state, 1)
@@ -65,6 +90,9 @@ def q_learn(env: GachaEnv, cfg: QConfig) -> Dict[Tuple[int, int, int, int], floa
             state = next_state
 
         epsilon = max(cfg.epsilon_min, epsilon * cfg.epsilon_decay)
+        progress.episode, progress.epsilon = episode + 1, epsilon
+        if on_episode is not None:
+            on_episode(progress)
 
     return q
 
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 import random
 
 from src.simulation.engine import GachaEngine, SimulationConfig, State
@@ -13,13 +13,16 @@ class EnvConfig:
     pull_cost: float = 1.0
     reward_target: float = 10.0
     reward_five_star: float = 2.0
+    # Pulls available per episode; a pull action with none left does nothing.
+    budget: Optional[int] = None
 
 
 class GachaEnv:
     """
     Minimal Gym-like environment.
     Action: 0 = save, 1 = pull
-    Observation: dict with current pity/guarantee/capture
+    Observation: dict with current pity/guarantee/capture, steps and
+    remaining budget (-1 = unlimited)
     Reward: weighted by target/5-star outcomes minus cost
     """
 
@@ -36,11 +39,13 @@ class GachaEnv:
             "guarantee": int(s.guarantee),
             "capture_counter": s.capture_counter,
             "steps": self.steps,
+            "budget": -1 if self.budget_left is None else self.budget_left,
         }
 
     def reset(self) -> Dict[str, int]:
         self.engine.reset()
         self.steps = 0
+        self.budget_left = self.env_config.budget
         return self._obs()
 
     def step(self, action: int) -> Tuple[Dict[str, int], float, bool, Dict]:
@@ -51,7 +56,11 @@ class GachaEnv:
         done = self.steps >= self.env_config.max_steps
         reward = 0.0
 
+        if action == 1 and self.budget_left is not None and self.budget_left <= 0:
+            action = 0
         if action == 1:
+            if self.budget_left is not None:
+                self.budget_left -= 1
             result = self.engine.pull_once()
             reward -= self.env_config.pull_cost
             if result.is_five_star:
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import CategoricalNB
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from .feature_factory import FEATURE_DTYPES, WEIGHT_COLUMN
+from .ml_agent import TrainResult, make_model
+
+
+INCREMENTAL_LEARNERS = ("sgd", "naive_bayes")
+RESERVOIR_LEARNERS = ("random_forest", "gbdt")
+
+
+@dataclass
+class StreamSpec:
+    model_name: str
+    learner: str
+    label_col: str
+    feature_cols: List[str]
+    # Keep only rows where this column == 1 (e.g. stage B on five-star rows).
+    row_filter: Optional[str] = None
+    # Estimator parameters (e.g. from a --search run's best_params.json).
+    params: Optional[Dict] = None
+
+
+def read_columns(path: str) -> List[str]:
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def iter_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    yield from pd.read_csv(path, chunksize=chunksize, dtype=FEATURE_DTYPES)
+
+
+def holdout_mask(row_ids: np.ndarray, test_size: float, seed: int) -> np.ndarray:
+    """
+    Hashed split on the global row position: stable across chunk sizes and
+    passes, with no shuffle or copy of the full dataset.
+    """
+    with np.errstate(over="ignore"):
+        h = row_ids.astype(np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        h = h ^ (h >> np.uint64(31))
+    u = (h >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+    return u < test_size
+
+
+class StreamingMetrics:
+    """
+    Holdout metrics accumulated chunk by chunk. ROC AUC is computed from
+    per-class histograms of predicted probability (2**16 bins). Rows count
+    with their importance weight when one is given.
+    """
+
+    def __init__(self, bins: int = 1 << 16):
+        self.bins = bins
+        self.pos_hist = np.zeros(bins)
+        self.neg_hist = np.zeros(bins)
+        self.tp = self.fp = self.tn = self.fn = 0.0
+        self.rows = 0
+
+    def update(self, y_true: np.ndarray, y_prob: np.ndarray, weight: Optional[np.ndarray] = None) -> None:
+        y_true = np.asarray(y_true).astype(bool)
+        w = np.ones(len(y_true)) if weight is None else np.asarray(weight, dtype=np.float64)
+        idx = np.clip((np.asarray(y_prob) * self.bins).astype(np.int64), 0, self.bins - 1)
+        self.pos_hist += np.bincount(idx[y_true], weights=w[y_true], minlength=self.bins)
+        self.neg_hist += np.bincount(idx[~y_true], weights=w[~y_true], minlength=self.bins)
+
+        y_pred = y_prob >= 0.5
+        self.tp += float(w[y_pred & y_true].sum())
+        self.fp += float(w[y_pred & ~y_true].sum())
+        self.tn += float(w[~y_pred & ~y_true].sum())
+        self.fn += float(w[~y_pred & y_true].sum())
+        self.rows += len(y_true)
+
+    def result(self) -> Dict[str, float]:
+        n_pos = float(self.pos_hist.sum())
+        n_neg = float(self.neg_hist.sum())
+        if n_pos and n_neg:
+            neg_below = np.cumsum(self.neg_hist) - self.neg_hist
+            auc = float(np.sum(self.pos_hist * (neg_below + 0.5 * self.neg_hist)) / (n_pos * n_neg))
+        else:
+            auc = float("nan")
+        total = n_pos + n_neg
+        denom_f1 = 2 * self.tp + self.fp + self.fn
+        return {
+            "roc_auc": auc,
+            "accuracy": float((self.tp + self.tn) / total) if total else 0.0,
+            "f1": float(2 * self.tp / denom_f1) if denom_f1 else 0.0,
+            "holdout_samples": float(self.rows),
+        }
+
+
+class _Reservoir:
+    """Uniform fixed-size sample (Algorithm R) over a stream of row blocks."""
+
+    def __init__(self, size: int, n_cols: int, seed: int):
+        self.size = size
+        self.X = np.empty((size, n_cols), dtype=np.int32)
+        self.y = np.empty(size, dtype=np.int8)
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+
+    def add(self, X: np.ndarray, y: np.ndarray) -> None:
+        n = len(y)
+        fill = max(0, min(n, self.size - self.seen))
+        if fill:
+            self.X[self.seen : self.seen + fill] = X[:fill]
+            self.y[self.seen : self.seen + fill] = y[:fill]
+        rest = n - fill
+        if rest > 0:
+            t = self.seen + fill + np.arange(1, rest + 1)
+            j = (self.rng.random(rest) * t).astype(np.int64)
+            keep = j < self.size
+            self.X[j[keep]] = X[fill:][keep]
+            self.y[j[keep]] = y[fill:][keep]
+        self.seen += n
+
+    def data(self) -> tuple:
+        k = min(self.seen, self.size)
+        return self.X[:k], self.y[:k]
+
+
+def _new_learner(learner: str, seed: int):
+    if learner == "sgd":
+        return StandardScaler(), SGDClassifier(loss="log_loss", learning_rate="adaptive", eta0=0.01, random_state=seed)
+    if learner == "naive_bayes":
+        # Features are small non-negative integers (pity, flags, counters).
+        return None, CategoricalNB(min_categories=256)
+    raise ValueError(f"unknown incremental learner: {learner}")
+
+
+def _fit_reservoir(
+    learner: str, X: pd.DataFrame, y: np.ndarray, seed: int, gbdt_backend: str, params: Optional[Dict] = None
+):
+    if learner not in RESERVOIR_LEARNERS:
+        raise ValueError(f"unknown reservoir learner: {learner}")
+    model = make_model(learner, seed, gbdt_backend=gbdt_backend, params=params)
+    model.fit(X, y)
+    return model
+
+
+def _importance(model, feature_cols: Sequence[str]) -> Dict[str, float]:
+    est = model.steps[-1][1] if hasattr(model, "steps") else model
+    if hasattr(est, "feature_importances_"):
+        values = np.asarray(est.feature_importances_, dtype=float)
+    elif hasattr(est, "coef_"):
+        values = np.abs(np.asarray(est.coef_, dtype=float)).ravel()
+        values = values / values.sum() if values.sum() > 0 else values
+    else:
+        return {}
+    return dict(zip(list(feature_cols), values.tolist()))
+
+
+def train_streaming(
+    path: str,
+    specs: Sequence[StreamSpec],
+    chunksize: int = 1_000_000,
+    test_size: float = 0.2,
+    seed: int = 42,
+    reservoir_size: int = 1_000_000,
+    gbdt_backend: str = "sklearn",
+) -> List[TrainResult]:
+    """
+    Out-of-core training of several models in two passes over `path`.
+
+    Pass 1 routes every training row to each spec: `partial_fit` for
+    incremental learners, a bounded reservoir sample for tree learners.
+    Pass 2 scores the hashed holdout rows with StreamingMetrics.
+    Peak memory is one chunk plus the reservoirs, independent of file size.
+    """
+    for spec in specs:
+        if spec.learner not in INCREMENTAL_LEARNERS + RESERVOIR_LEARNERS:
+            raise ValueError(f"unknown learner: {spec.learner}")
+
+    state: Dict[str, dict] = {}
+    for i, spec in enumerate(specs):
+        entry: dict = {"fitted": False}
+        if spec.learner in INCREMENTAL_LEARNERS:
+            entry["scaler"], entry["model"] = _new_learner(spec.learner, seed)
+            if spec.params:
+                entry["model"].set_params(**spec.params)
+        else:
+            entry["reservoir"] = _Reservoir(reservoir_size, len(spec.feature_cols), seed + i)
+        state[spec.model_name] = entry
+
+    # Pass 1: train.
+    offset = 0
+    for chunk in iter_chunks(path, chunksize):
+        row_ids = np.arange(offset, offset + len(chunk))
+        offset += len(chunk)
+        train_rows = ~holdout_mask(row_ids, test_size, seed)
+        for spec in specs:
+            mask = train_rows
+            if spec.row_filter is not None:
+                mask = mask & (chunk[spec.row_filter].to_numpy() == 1)
+            if not mask.any():
+                continue
+            X = chunk.loc[mask, spec.feature_cols]
+            y = chunk.loc[mask, spec.label_col].to_numpy()
+            entry = state[spec.model_name]
+            if spec.learner in INCREMENTAL_LEARNERS:
+                if entry["scaler"] is not None:
+                    entry["scaler"].partial_fit(X)
+                    X = entry["scaler"].transform(X)
+                entry["model"].partial_fit(X, y, classes=np.array([0, 1]))
+                entry["fitted"] = True
+            else:
+                entry["reservoir"].add(X.to_numpy(), y)
+
+    for spec in specs:
+        entry = state[spec.model_name]
+        if spec.learner in RESERVOIR_LEARNERS:
+            X_res, y_res = entry["reservoir"].data()
+            if len(y_res) == 0:
+                raise RuntimeError(f"no training rows for {spec.model_name}")
+            X_df = pd.DataFrame(X_res, columns=spec.feature_cols)
+            entry["model"] = _fit_reservoir(spec.learner, X_df, y_res, seed, gbdt_backend, spec.params)
+            entry["reservoir"] = None
+        elif not entry["fitted"]:
+            raise RuntimeError(f"no training rows for {spec.model_name}")
+        elif entry["scaler"] is not None:
+            entry["model"] = make_pipeline(entry["scaler"], entry["model"])
+
+    # Pass 2: streaming holdout evaluation.
+    metrics = {spec.model_name: StreamingMetrics() for spec in specs}
+    offset = 0
+    for chunk in iter_chunks(path, chunksize):
+        row_ids = np.arange(offset, offset + len(chunk))
+        offset += len(chunk)
+        test_rows = holdout_mask(row_ids, test_size, seed)
+        for spec in specs:
+            mask = test_rows
+            if spec.row_filter is not None:
+                mask = mask & (chunk[spec.row_filter].to_numpy() == 1)
+            if not mask.any():
+                continue
+            X = chunk.loc[mask, spec.feature_cols]
+            y_prob = state[spec.model_name]["model"].predict_proba(X)[:, 1]
+            weight = chunk.loc[mask, WEIGHT_COLUMN].to_numpy() if WEIGHT_COLUMN in chunk.columns else None
+            metrics[spec.model_name].update(chunk.loc[mask, spec.label_col].to_numpy(), y_prob, weight)
+
+    results = []
+    for spec in specs:
+        model = state[spec.model_name]["model"]
+        results.append(
+            TrainResult(
+                spec.model_name,
+                metrics[spec.model_name].result(),
+                _importance(model, spec.feature_cols),
+                model,
+            )
+        )
+    return results
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from .engine import SimulationConfig, State
+from .exact import five_star_hazard
+from .rules_5_0 import resolve_five_star
+
+
+# Uniform rows consumed per pull: five-star draw, rate-up draw, capture draw.
+# Every pull consumes all three, so two configs driven by the same uniforms
+# stay aligned pull for pull (unlike GachaEngine, which draws lazily).
+U_FIVE, U_RATE, U_CAPTURE = 0, 1, 2
+N_UNIFORMS = 3
+
+
+@dataclass
+class BatchState:
+    """Struct-of-arrays version of State for many independent players."""
+
+    pity: np.ndarray  # int16, pulls_since_five_star
+    guarantee: np.ndarray  # bool
+    capture_counter: np.ndarray  # int8
+
+    @classmethod
+    def zeros(cls, n: int) -> "BatchState":
+        return cls(
+            pity=np.zeros(n, dtype=np.int16),
+            guarantee=np.zeros(n, dtype=bool),
+            capture_counter=np.zeros(n, dtype=np.int8),
+        )
+
+    @classmethod
+    def repeat(cls, state: State, n: int) -> "BatchState":
+        return cls(
+            pity=np.full(n, state.pulls_since_five_star, dtype=np.int16),
+            guarantee=np.full(n, bool(state.guarantee), dtype=bool),
+            capture_counter=np.full(n, state.capture_counter, dtype=np.int8),
+        )
+
+    @classmethod
+    def from_states(cls, states: List[State]) -> "BatchState":
+        return cls(
+            pity=np.array([s.pulls_since_five_star for s in states], dtype=np.int16),
+            guarantee=np.array([bool(s.guarantee) for s in states], dtype=bool),
+            capture_counter=np.array([s.capture_counter for s in states], dtype=np.int8),
+        )
+
+    def __len__(self) -> int:
+        return len(self.pity)
+
+    def copy(self) -> "BatchState":
+        return BatchState(self.pity.copy(), self.guarantee.copy(), self.capture_counter.copy())
+
+    def take(self, idx: np.ndarray) -> "BatchState":
+        return BatchState(self.pity[idx], self.guarantee[idx], self.capture_counter[idx])
+
+    def state_at(self, i: int) -> State:
+        return State(
+            pulls_since_five_star=int(self.pity[i]),
+            guarantee=bool(self.guarantee[i]),
+            capture_counter=int(self.capture_counter[i]),
+        )
+
+
+@dataclass
+class BatchOutcome:
+    is_five_star: np.ndarray  # bool
+    is_target: np.ndarray  # bool
+    # Five-star lost the rate-up draw (before capture is considered).
+    lost_rate_up: np.ndarray  # bool
+    # Lost rate-up but converted to target by the capture mechanism.
+    captured: np.ndarray  # bool
+    # Pity count after the increment, i.e. the hazard index used.
+    pity_index: np.ndarray  # int16
+
+
+def batch_pull(
+    config: SimulationConfig,
+    state: BatchState,
+    u: np.ndarray,
+    active: Optional[np.ndarray] = None,
+    hazard: Optional[np.ndarray] = None,
+) -> BatchOutcome:
+    """
+    One pull for every player, updating `state` in place. Same rules as
+    GachaEngine.pull_once: the hazard table is tabulated from
+    GachaEngine._five_star_probability and the five-star outcome is
+    rules_5_0.resolve_five_star, applied to whole arrays. `u` has shape
+    (N_UNIFORMS, n); players with active == False are left untouched.
+    """
+    if hazard is None:
+        hazard = five_star_hazard(config)
+    n = len(state)
+    if active is None:
+        active = np.ones(n, dtype=bool)
+
+    pity_index = np.minimum(state.pity + 1, config.hard_pity).astype(np.int16)
+    is_five = active & (u[U_FIVE] < hazard[pity_index])
+
+    target, guarantee_after, counter_after, lost, captured = resolve_five_star(
+        u[U_RATE],
+        u[U_CAPTURE],
+        state.guarantee,
+        state.capture_counter,
+        config.capture_enabled,
+        config.capture_hard,
+        config.capture_prob,
+        config.target_prob_no_guarantee,
+        config.target_prob_guarantee,
+    )
+    is_target = is_five & target
+    lost = is_five & lost
+    captured = is_five & captured
+
+    state.capture_counter = np.where(is_five, counter_after, state.capture_counter).astype(np.int8)
+    state.pity = np.where(is_five, 0, np.where(active, pity_index, state.pity)).astype(np.int16)
+    state.guarantee = np.where(is_five, guarantee_after, state.guarantee)
+
+    return BatchOutcome(
+        is_five_star=is_five,
+        is_target=is_target,
+        lost_rate_up=lost,
+        captured=captured,
+        pity_index=pity_index,
+    )
+
+
+class IntHistogram:
+    """
+    Streaming histogram of non-negative integer values (pulls, counts).
+    Exact counts with memory O(max value), so quantiles carry no sketch
+    error; histograms from different chunks or workers merge by addition.
+    """
+
+    def __init__(self) -> None:
+        # float64 so weighted adds accumulate; integer counts stay exact up to 2**53.
+        self.counts = np.zeros(0, dtype=np.float64)
+
+    def add(self, values: np.ndarray, weights: Optional[np.ndarray] = None) -> None:
+        values = np.asarray(values, dtype=np.int64)
+        if values.size == 0:
+            return
+        binned = np.bincount(values, weights=weights)
+        if len(binned) > len(self.counts):
+            self.counts = np.concatenate([self.counts, np.zeros(len(binned) - len(self.counts))])
+        self.counts[: len(binned)] += binned
+
+    def merge(self, other: "IntHistogram") -> None:
+        self.add(np.arange(len(other.counts)), other.counts)
+
+    @property
+    def total(self) -> float:
+        return float(self.counts.sum())
+
+    def mean(self) -> float:
+        total = self.total
+        return float(np.dot(np.arange(len(self.counts)), self.counts) / total) if total else 0.0
+
+    def quantile(self, q: float) -> int:
+        total = self.total
+        if total == 0:
+            return 0
+        cdf = np.cumsum(self.counts) / total
+        return int(np.searchsorted(cdf, q - 1e-12))
+
+    def summary(self, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95, 0.99)) -> dict:
+        return {
+            "count": self.total,
+            "mean": self.mean(),
+            "quantiles": {f"p{int(round(q * 100))}": self.quantile(q) for q in quantiles},
+            "histogram": self.counts.tolist(),
+        }
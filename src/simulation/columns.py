@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from array import array
+from pathlib import Path
+from typing import Dict
+import csv
+
+import numpy as np
+
+from .engine import GachaEngine
+
+
+# Raw log schema (same columns and order as the run_sim CSV) with compact
+# dtypes. Flags are int8 rather than bool so feature frames can reuse the
+# buffers unchanged (see feature_factory.FEATURE_DTYPES).
+RAW_DTYPES: Dict[str, str] = {
+    "pull_index": "int64",
+    "pity_before": "int16",
+    "guarantee_before": "int8",
+    "capture_counter_before": "int8",
+    "is_five_star": "int8",
+    "is_target": "int8",
+    "pity": "int16",
+    "guarantee_after": "int8",
+    "capture_counter_after": "int8",
+}
+# Optional importance-weight column (stratified generation); weighted
+# averages over rows estimate natural-stream quantities.
+WEIGHT_COLUMN = "weight"
+
+_TYPECODES = {"int8": "b", "int16": "h"}
+
+
+def run_columns(engine: GachaEngine, n_pulls: int) -> Dict[str, np.ndarray]:
+    """
+    GachaEngine.run as column arrays: same pulls and RNG stream, but no
+    PullResult list is kept. Values go into typed array.array buffers that
+    NumPy wraps without copying.
+    """
+    if not hasattr(engine, "state"):
+        engine.reset()
+    start = engine.state.total_pulls
+    buffers = {name: array(_TYPECODES[dtype]) for name, dtype in RAW_DTYPES.items() if name != "pull_index"}
+    pity_before, g_before, c_before = buffers["pity_before"], buffers["guarantee_before"], buffers["capture_counter_before"]
+    five, target = buffers["is_five_star"], buffers["is_target"]
+    pity, g_after, c_after = buffers["pity"], buffers["guarantee_after"], buffers["capture_counter_after"]
+
+    for _ in range(n_pulls):
+        r = engine.pull_once()
+        pity_before.append(r.pity_before)
+        g_before.append(r.guarantee_before)
+        c_before.append(r.capture_counter_before)
+        five.append(r.is_five_star)
+        target.append(r.is_target)
+        pity.append(r.pity)
+        g_after.append(r.guarantee_after)
+        c_after.append(r.capture_counter_after)
+
+    columns = {"pull_index": np.arange(start + 1, start + n_pulls + 1, dtype=np.int64)}
+    for name, buf in buffers.items():
+        columns[name] = np.frombuffer(buf, dtype=RAW_DTYPES[name]) if len(buf) else np.zeros(0, RAW_DTYPES[name])
+    return columns
+
+
+def write_raw_csv(columns: Dict[str, np.ndarray], path: Path) -> Path:
+    """
+    Persist run_columns output in the run_sim raw log format. Columns
+    outside the schema (e.g. a weight column) are appended after it.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    names = list(RAW_DTYPES) + [name for name in columns if name not in RAW_DTYPES]
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        writer.writerows(zip(*(columns[name].tolist() for name in names)))
+    return path
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from typing import Dict, Iterable, List, Optional, Tuple
 import random
 
@@ -52,6 +52,15 @@ class GachaEngine:
     def reset(self) -> None:
         self.state = State()
 
+    def snapshot(self) -> State:
+        """Copy of the current state, e.g. to fork batched continuations from it."""
+        if not hasattr(self, "state"):
+            self.reset()
+        return replace(self.state)
+
+    def restore(self, state: State) -> None:
+        self.state = replace(state)
+
     def _five_star_probability(self, pity_count: int) -> float:
         if pity_count >= self.config.hard_pity:
             return 1.0
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from .engine import GachaEngine, SimulationConfig, State
+
+
+def five_star_hazard(
+    config: SimulationConfig, probability: Optional[Callable[[int], float]] = None
+) -> np.ndarray:
+    """
+    GachaEngine._five_star_probability tabulated over every pity count, so
+    the batch simulators and exact recursions use the engine's own code.
+    `probability` (pity count -> five-star probability) replaces the engine's
+    function, e.g. to tabulate an injected fault. Index k is the pity count
+    after the pull increment (k = 1..hard_pity); index 0 is unused and set
+    to 0.
+    """
+    if probability is None:
+        probability = GachaEngine(config)._five_star_probability
+    h = np.array([probability(k) for k in range(config.hard_pity + 1)], dtype=np.float64)
+    h[0] = 0.0
+    return h
+
+
+def five_star_interval_pmf(config: SimulationConfig, hazard: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    pmf[k] = P(the next five-star lands on pity count k) from pity 0,
+    same indexing as five_star_hazard (or the given `hazard` table).
+    """
+    h = five_star_hazard(config) if hazard is None else hazard
+    survive = np.concatenate([[1.0], np.cumprod(1.0 - h[1:])])
+    pmf = np.zeros_like(h)
+    pmf[1:] = h[1:] * survive[:-1]
+    return pmf
+
+
+def hazard_gradients(config: SimulationConfig) -> Dict[str, np.ndarray]:
+    """
+    d five_star_hazard / d parameter for the continuous hazard parameters,
+    same indexing as five_star_hazard. Zero where the hazard is clipped to 1.
+    """
+    k = np.arange(config.hard_pity + 1, dtype=np.float64)
+    base = config.base_five_star_prob
+    pre_soft = k < config.soft_pity_start
+    if config.soft_pity_mode == "quadratic":
+        span = max(1, config.hard_pity - config.soft_pity_start)
+        t = np.clip((k - config.soft_pity_start + 1) / span, 0.0, 1.0)
+        d_base = np.where(pre_soft, 1.0, 1.0 - t * t)
+        d_step = np.zeros_like(k)
+    else:
+        steps = k - config.soft_pity_start + 1
+        clipped = ~pre_soft & (base + steps * config.soft_pity_step >= 1.0)
+        d_base = np.where(clipped, 0.0, 1.0)
+        d_step = np.where(pre_soft | clipped, 0.0, steps)
+    d_base[config.hard_pity :] = 0.0
+    d_step[config.hard_pity :] = 0.0
+    d_base[0] = d_step[0] = 0.0
+    return {"base_five_star_prob": d_base, "soft_pity_step": d_step}
+
+
+def capture_states(config: SimulationConfig) -> int:
+    """Number of reachable capture_counter values (0..capture_hard-1)."""
+    return max(1, config.capture_hard) if config.capture_enabled else 1
+
+
+@dataclass
+class PlanOutcome:
+    # pmf[t, n] = P(plan ends with t targets after n pulls)
+    pmf: np.ndarray
+
+    @property
+    def targets_pmf(self) -> np.ndarray:
+        return self.pmf.sum(axis=1)
+
+    @property
+    def pulls_pmf(self) -> np.ndarray:
+        return self.pmf.sum(axis=0)
+
+    def expected_targets(self) -> float:
+        return float(np.dot(np.arange(self.pmf.shape[0]), self.targets_pmf))
+
+    def expected_pulls(self) -> float:
+        return float(np.dot(np.arange(self.pmf.shape[1]), self.pulls_pmf))
+
+
+def plan_outcome_distribution(
+    config: SimulationConfig,
+    n_pulls: int,
+    state: Optional[State] = None,
+    stop_after_targets: Optional[int] = None,
+) -> PlanOutcome:
+    """
+    Exact joint distribution of (targets obtained, pulls spent) for a plan
+    of up to `n_pulls` pulls from `state`, optionally stopping as soon as
+    `stop_after_targets` targets are obtained. Forward recursion on the
+    (pity, guarantee, capture_counter, targets) Markov chain, one array
+    update per pull; mirrors GachaEngine.pull_once/apply_five_star_rule.
+    """
+    state = state or State()
+    hazard = five_star_hazard(config)
+    n_cap = capture_states(config)
+    n_targets = n_pulls if stop_after_targets is None else min(n_pulls, stop_after_targets)
+
+    pity0 = min(state.pulls_since_five_star, config.hard_pity - 1)
+    cap0 = min(state.capture_counter, n_cap - 1)
+    # mass[t, pity, g, c] for plans still running
+    mass = np.zeros((n_targets + 1, config.hard_pity, 2, n_cap))
+    mass[0, pity0, int(state.guarantee), cap0] = 1.0
+    pmf = np.zeros((n_targets + 1, n_pulls + 1))
+    if stop_after_targets is not None and n_targets == 0:
+        pmf[0, 0] = 1.0
+        return PlanOutcome(pmf)
+
+    # Rate-up split per guarantee flag.
+    p_win = np.array([config.target_prob_no_guarantee, config.target_prob_guarantee])
+    # Capture probability per capture_counter value (after the loss increments it).
+    caps = np.arange(n_cap)
+    if config.capture_enabled:
+        q_capture = np.where(caps + 1 >= config.capture_hard, 1.0, config.capture_prob)
+    else:
+        q_capture = np.zeros(n_cap)
+
+    h = hazard[1 : config.hard_pity + 1]  # hazard for pity_before = 0..hard_pity-1
+    for n in range(1, n_pulls + 1):
+        five = mass * h[None, :, None, None]
+        new = np.zeros_like(mass)
+        new[:, 1:] = (mass - five)[:, :-1]  # no five-star: pity + 1
+
+        five = five.sum(axis=1)  # [t, g, c], pity resets to 0
+        win = five * p_win[None, :, None]
+        lose = five - win
+        captured = lose * q_capture[None, None, :]
+        missed = lose - captured
+
+        hit = np.zeros((n_targets + 1, 2, n_cap))
+        hit[:, 0, :] += win.sum(axis=1)  # natural win: counter unchanged
+        hit[:, 0, 0] += captured.sum(axis=(1, 2))  # capture: counter resets
+        if config.capture_enabled:
+            new[:, 0, 1, 1:] += missed.sum(axis=1)[:, :-1]
+        else:
+            new[:, 0, 1, :] += missed.sum(axis=1)
+        # hit[n_targets] is always empty: at most n_pulls targets, or stopped.
+        new[1:, 0] += hit[:-1]
+
+        if stop_after_targets is not None:
+            pmf[n_targets, n] += new[n_targets].sum()
+            new[n_targets] = 0.0
+        mass = new
+
+    pmf[:, n_pulls] += mass.sum(axis=(1, 2, 3))
+    return PlanOutcome(pmf)
+
+
+def stationary_state_distribution(config: SimulationConfig) -> np.ndarray:
+    """
+    pi[pity, g, c]: long-run fraction of pulls made from state
+    (pulls_since_five_star, guarantee, capture_counter), i.e. the state mix
+    of a long natural stream such as run_sim. Pity renews at each five-star
+    independently of (guarantee, capture_counter), so pi is the stationary
+    distribution of the small chain on (g, c) embedded at five-stars times
+    the normalized survival curve of the pity counter.
+    """
+    hazard = five_star_hazard(config)
+    n_cap = capture_states(config)
+    survive = np.concatenate([[1.0], np.cumprod(1.0 - hazard[1 : config.hard_pity])])
+
+    p_win = [config.target_prob_no_guarantee, config.target_prob_guarantee]
+    P = np.zeros((2, n_cap, 2, n_cap))
+    for g in range(2):
+        for c in range(n_cap):
+            lose = 1.0 - p_win[g]
+            P[g, c, 0, c] += p_win[g]  # natural win: counter unchanged
+            if not config.capture_enabled:
+                P[g, c, 1, c] += lose
+                continue
+            q = 1.0 if c + 1 >= config.capture_hard else config.capture_prob
+            P[g, c, 0, 0] += lose * q  # capture: counter resets
+            if q < 1.0:
+                P[g, c, 1, c + 1] += lose * (1.0 - q)
+    n = 2 * n_cap
+    P = P.reshape(n, n)
+    # nu (P - I) = 0 with sum(nu) = 1.
+    A = np.vstack([P.T - np.eye(n), np.ones((1, n))])
+    b = np.zeros(n + 1)
+    b[-1] = 1.0
+    nu = np.clip(np.linalg.lstsq(A, b, rcond=None)[0], 0.0, None)
+    nu /= nu.sum()
+
+    pi = survive[:, None, None] * nu.reshape(2, n_cap)[None]
+    return pi / pi.sum()
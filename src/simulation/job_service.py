@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+import asyncio
+import copy
+import json
+import time
+
+import numpy as np
+import yaml
+
+from .batch import BatchState
+from .engine import SimulationConfig, config_from_dict
+from .exact import five_star_hazard
+from .population import NO_STOP, PopulationStats
+from .scenario import apply_overrides, pull_until
+
+
+@dataclass
+class SimRequest:
+    """Paths from one starting state, each pulling until `budget` pulls or `stop_after_targets` targets."""
+
+    rules: Dict
+    pity: int = 0
+    guarantee: bool = False
+    capture_counter: int = 0
+    budget: int = 90
+    paths: int = 10000
+    stop_after_targets: Optional[int] = None
+    # Seeded requests run on their own generator (never coalesced with
+    # different requests), so the same request always gives the same result.
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, raw: Dict, rules_cache: Optional[Dict[str, Dict]] = None) -> "SimRequest":
+        """
+        From a JSON request. Rules come from `rules` (a mapping or a path to
+        a rules YAML, cached in `rules_cache`) plus optional dotted-key
+        overrides in `set`.
+        """
+        raw = dict(raw)
+        rules = raw.pop("rules")
+        if isinstance(rules, str):
+            cache = rules_cache if rules_cache is not None else {}
+            if rules not in cache:
+                with open(rules, "r", encoding="utf-8") as f:
+                    cache[rules] = yaml.safe_load(f)
+            rules = cache[rules]
+        overrides = raw.pop("set", None)
+        if overrides:
+            rules = copy.deepcopy(rules)
+            apply_overrides(rules, overrides)
+        unknown = set(raw) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"unknown request fields: {sorted(unknown)}")
+        request = cls(rules=rules, **raw)
+        request.validate(config_from_dict(rules))
+        return request
+
+    def validate(self, config: SimulationConfig) -> None:
+        """Raise ValueError unless the start state and sizes are in range for `config`."""
+        for name in ("pity", "capture_counter", "budget", "paths"):
+            value = getattr(self, name)
+            if isinstance(value, bool) or not isinstance(value, (int, np.integer)):
+                raise ValueError(f"{name} must be an integer, got {value!r}")
+        if not 0 <= self.pity < config.hard_pity:
+            raise ValueError(f"pity must be in [0, {config.hard_pity}), got {self.pity}")
+        capture_states = max(config.capture_hard, 1)
+        if not 0 <= self.capture_counter < capture_states:
+            raise ValueError(f"capture_counter must be in [0, {capture_states}), got {self.capture_counter}")
+        if self.budget < 0:
+            raise ValueError(f"budget must be >= 0, got {self.budget}")
+        if self.paths < 1:
+            raise ValueError(f"paths must be >= 1, got {self.paths}")
+        if self.stop_after_targets is not None and self.stop_after_targets < 0:
+            raise ValueError(f"stop_after_targets must be >= 0, got {self.stop_after_targets}")
+
+
+def _config_key(config: SimulationConfig) -> str:
+    fields = asdict(config)
+    fields.pop("seed", None)
+    return json.dumps(fields, sort_keys=True)
+
+
+@dataclass
+class _Pending:
+    config: SimulationConfig
+    # (dedup key, request, future) in arrival order.
+    jobs: List[Tuple[str, SimRequest, asyncio.Future]] = field(default_factory=list)
+    paths: int = 0
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+def run_batch(config: SimulationConfig, requests: List[SimRequest], rng: np.random.Generator) -> List[Dict]:
+    """
+    All requests' paths in one lockstep pull_until batch (each path with its
+    request's start state, budget and stop rule), then split per request.
+    """
+    sizes = np.array([r.paths for r in requests], dtype=np.int64)
+    seg = np.repeat(np.arange(len(requests)), sizes)
+    state = BatchState(
+        pity=np.array([r.pity for r in requests], dtype=np.int16)[seg],
+        guarantee=np.array([bool(r.guarantee) for r in requests], dtype=bool)[seg],
+        capture_counter=np.array([r.capture_counter for r in requests], dtype=np.int8)[seg],
+    )
+    budget = np.array([r.budget for r in requests], dtype=np.int64)[seg]
+    stop = np.array([NO_STOP if r.stop_after_targets is None else r.stop_after_targets for r in requests])[seg]
+    spent, targets, fives = pull_until(config, state, budget, stop, rng, five_star_hazard(config))
+
+    results = []
+    bounds = np.concatenate([[0], np.cumsum(sizes)])
+    for i, r in enumerate(requests):
+        a, b = bounds[i], bounds[i + 1]
+        stats = PopulationStats()
+        stats.add(spent[a:b], targets[a:b], fives[a:b], budget[a:b] - spent[a:b])
+        summary = stats.summary()
+        summary["paths"] = summary.pop("players")
+        summary["unused_budget"] = summary.pop("leftover_pulls")
+        results.append(
+            {
+                "start": {"pity": r.pity, "guarantee": int(r.guarantee), "capture_counter": r.capture_counter},
+                "budget": r.budget,
+                "stop_after_targets": r.stop_after_targets,
+                **summary,
+            }
+        )
+    return results
+
+
+class SimulationService:
+    """
+    In-process asyncio front end for many small simulation queries.
+    Requests with the same rules that arrive within `window` seconds are
+    coalesced into one vectorized batch (capped at `max_batch_paths`
+    paths). Identical in-flight requests share one result, and batches run
+    on a thread pool so the loop keeps accepting work.
+    """
+
+    def __init__(
+        self,
+        window: float = 0.005,
+        max_batch_paths: int = 2_000_000,
+        workers: int = 1,
+        seed: Optional[int] = None,
+        coalesce: bool = True,
+        latency_window: int = 10000,
+    ):
+        self.window = window
+        self.max_batch_paths = max_batch_paths
+        self.coalesce = coalesce
+        self.rng = np.random.default_rng(seed)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.rules_cache: Dict[str, Dict] = {}
+        self._pending: Dict[str, _Pending] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._tasks: set = set()
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+        self._counters = {
+            "submitted": 0,
+            "deduplicated": 0,
+            "completed": 0,
+            "failed": 0,
+            "batches": 0,
+            "batched_requests": 0,
+            "batched_paths": 0,
+            "running_batches": 0,
+            "running_requests": 0,
+        }
+
+    async def submit(self, request: SimRequest) -> Dict:
+        """
+        Simulate `request`, sharing work with compatible and identical
+        in-flight requests. Out-of-range requests raise ValueError here,
+        before they can join (and fail) a shared batch.
+        """
+        start = time.perf_counter()
+        config = config_from_dict(request.rules)
+        request.validate(config)
+        self._counters["submitted"] += 1
+        fields = asdict(request)
+        fields.pop("rules")
+        key = _config_key(config) + json.dumps(fields, sort_keys=True)
+        future = self._inflight.get(key)
+        if future is not None:
+            self._counters["deduplicated"] += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            self._enqueue(key, config, request, future)
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self._latencies.append(time.perf_counter() - start)
+
+    def _enqueue(self, key: str, config: SimulationConfig, request: SimRequest, future: asyncio.Future) -> None:
+        # Seeded requests only share a batch with identical requests (deduplicated above).
+        group = key if (request.seed is not None or not self.coalesce) else _config_key(config)
+        pending = self._pending.get(group)
+        if pending is None:
+            pending = self._pending[group] = _Pending(config)
+            if self.coalesce and self.window > 0:
+                pending.timer = asyncio.get_running_loop().call_later(self.window, self._flush, group)
+        pending.jobs.append((key, request, future))
+        pending.paths += request.paths
+        if not self.coalesce or self.window <= 0 or pending.paths >= self.max_batch_paths:
+            self._flush(group)
+
+    def _flush(self, group: str) -> None:
+        pending = self._pending.pop(group, None)
+        if pending is None:
+            return
+        if pending.timer is not None:
+            pending.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._run(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: _Pending) -> None:
+        requests = [r for _, r, _ in pending.jobs]
+        seed = requests[0].seed
+        rng = np.random.default_rng(seed) if seed is not None else np.random.default_rng(self.rng.integers(0, 2**63 - 1))
+        self._counters["batches"] += 1
+        self._counters["batched_requests"] += len(requests)
+        self._counters["batched_paths"] += pending.paths
+        self._counters["running_batches"] += 1
+        self._counters["running_requests"] += len(requests)
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, run_batch, pending.config, requests, rng)
+        except Exception as exc:  # fan the failure out to every caller
+            for key, _, future in pending.jobs:
+                self._inflight.pop(key, None)
+                if not future.done():
+                    future.set_exception(exc)
+            self._counters["failed"] += len(requests)
+        else:
+            for (key, _, future), result in zip(pending.jobs, results):
+                self._inflight.pop(key, None)
+                if not future.done():
+                    future.set_result(result)
+            self._counters["completed"] += len(requests)
+        finally:
+            self._counters["running_batches"] -= 1
+            self._counters["running_requests"] -= len(requests)
+
+    def metrics(self) -> Dict:
+        lat = np.array(self._latencies) * 1000.0
+        batches = self._counters["batches"]
+        return {
+            **self._counters,
+            "queued_requests": sum(len(p.jobs) for p in self._pending.values()),
+            "queued_batches": len(self._pending),
+            "mean_requests_per_batch": self._counters["batched_requests"] / batches if batches else 0.0,
+            "latency_ms": {
+                "count": int(len(lat)),
+                "mean": float(lat.mean()) if len(lat) else None,
+                "p50": float(np.percentile(lat, 50)) if len(lat) else None,
+                "p95": float(np.percentile(lat, 95)) if len(lat) else None,
+                "max": float(lat.max()) if len(lat) else None,
+            },
+        }
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+async def handle_connection(service: SimulationService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    JSON-lines protocol: each line is {"id": ..., "op": "simulate", ...request
+    fields} or {"id": ..., "op": "metrics"}. Each request gets one response
+    line as soon as it completes, so responses can arrive out of order.
+    """
+    lock = asyncio.Lock()
+    tasks = set()
+
+    async def respond(message: Dict) -> None:
+        async with lock:
+            writer.write((json.dumps(message) + "\n").encode("utf-8"))
+            await writer.drain()
+
+    async def serve(line: bytes) -> None:
+        msg_id = None
+        try:
+            raw = json.loads(line)
+            msg_id = raw.pop("id", None)
+            op = raw.pop("op", "simulate")
+            if op == "metrics":
+                result = service.metrics()
+            elif op == "simulate":
+                result = await service.submit(SimRequest.from_dict(raw, service.rules_cache))
+            else:
+                raise ValueError(f"unknown op: {op}")
+            await respond({"id": msg_id, "ok": True, "result": result})
+        except Exception as exc:
+            await respond({"id": msg_id, "ok": False, "error": f"{type(exc).__name__}: {exc}"})
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.create_task(serve(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        writer.close()
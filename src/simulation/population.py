@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .batch import N_UNIFORMS, BatchState, IntHistogram, batch_pull
+from .engine import SimulationConfig
+from .exact import five_star_hazard
+
+
+NO_STOP = np.iinfo(np.int32).max
+
+
+@dataclass
+class PlayerProfile:
+    name: str
+    weight: float
+    pulls_per_day: float
+    days: float
+    daily_bonus_pull: float = 0.0
+    saved_pulls: Tuple[int, int] = (0, 0)
+    income_cv: float = 0.0
+    start_pity: Tuple[int, int] = (0, 0)
+    start_guarantee_prob: float = 0.0
+    stop_after_targets: Optional[int] = None
+
+
+@dataclass
+class PopulationStats:
+    players: int = 0
+    pulls_spent: IntHistogram = field(default_factory=IntHistogram)
+    targets: IntHistogram = field(default_factory=IntHistogram)
+    five_stars: IntHistogram = field(default_factory=IntHistogram)
+    leftover_pulls: IntHistogram = field(default_factory=IntHistogram)
+
+    def add(self, spent: np.ndarray, targets: np.ndarray, fives: np.ndarray, leftover: np.ndarray) -> None:
+        self.players += len(spent)
+        self.pulls_spent.add(spent)
+        self.targets.add(targets)
+        self.five_stars.add(fives)
+        self.leftover_pulls.add(leftover)
+
+    def merge(self, other: "PopulationStats") -> None:
+        self.players += other.players
+        self.pulls_spent.merge(other.pulls_spent)
+        self.targets.merge(other.targets)
+        self.five_stars.merge(other.five_stars)
+        self.leftover_pulls.merge(other.leftover_pulls)
+
+    def summary(self) -> Dict:
+        targets = self.targets.counts
+        return {
+            "players": self.players,
+            "prob_at_least_one_target": float(1.0 - targets[0] / self.players) if self.players else 0.0,
+            "pulls_spent": self.pulls_spent.summary(),
+            "targets": self.targets.summary(),
+            "five_stars": self.five_stars.summary(),
+            "leftover_pulls": self.leftover_pulls.summary(),
+        }
+
+
+def int_range(value, default: Tuple[int, int]) -> Tuple[int, int]:
+    """(lo, hi) from a YAML [lo, hi] list or a single int; `default` when unset."""
+    if value is None:
+        return default
+    if isinstance(value, (list, tuple)):
+        return int(value[0]), int(value[1])
+    return int(value), int(value)
+
+
+def profiles_from_dict(raw: Dict, resources: Dict) -> List[PlayerProfile]:
+    profiles = []
+    for p in raw.get("profiles", []):
+        stop = p.get("stop_after_targets")
+        profiles.append(
+            PlayerProfile(
+                name=str(p["name"]),
+                weight=float(p.get("weight", 1.0)),
+                pulls_per_day=float(p.get("pulls_per_day", resources.get("pulls_per_day", 0.0))),
+                days=float(p.get("days", resources.get("days_remaining_in_version", 0))),
+                daily_bonus_pull=float(p.get("daily_bonus_pull", resources.get("daily_bonus_pull", 0.0))),
+                saved_pulls=int_range(p.get("saved_pulls"), (0, 0)),
+                income_cv=float(p.get("income_cv", 0.0)),
+                start_pity=int_range(p.get("start_pity"), (0, 0)),
+                start_guarantee_prob=float(p.get("start_guarantee_prob", 0.0)),
+                stop_after_targets=None if stop is None else int(stop),
+            )
+        )
+    if not profiles:
+        raise ValueError("population config defines no profiles")
+    return profiles
+
+
+def default_profile(resources: Dict) -> PlayerProfile:
+    """Single profile straight from the game_rules `resources` block."""
+    return PlayerProfile(
+        name="default",
+        weight=1.0,
+        pulls_per_day=float(resources.get("pulls_per_day", 0.0)),
+        days=float(resources.get("days_remaining_in_version", 0)),
+        daily_bonus_pull=float(resources.get("daily_bonus_pull", 0.0)),
+    )
+
+
+def _draw_players(profiles: List[PlayerProfile], n: int, hard_pity: int, rng: np.random.Generator):
+    weights = np.array([p.weight for p in profiles], dtype=np.float64)
+    which = rng.choice(len(profiles), size=n, p=weights / weights.sum())
+
+    def col(attr):
+        return np.array([getattr(p, attr) for p in profiles])[which]
+
+    income = (col("pulls_per_day") + col("daily_bonus_pull")) * col("days")
+    cv = col("income_cv")
+    sigma = np.sqrt(np.log1p(cv * cv))
+    income = income * np.exp(sigma * rng.standard_normal(n) - 0.5 * sigma * sigma)
+
+    saved = np.array([p.saved_pulls for p in profiles])[which]
+    budget = np.floor(income).astype(np.int64) + rng.integers(saved[:, 0], saved[:, 1] + 1)
+
+    pity = np.array([p.start_pity for p in profiles])[which]
+    state = BatchState.zeros(n)
+    state.pity = np.minimum(rng.integers(pity[:, 0], pity[:, 1] + 1), hard_pity - 1).astype(np.int16)
+    state.guarantee = rng.random(n) < col("start_guarantee_prob")
+
+    stop = np.array([NO_STOP if p.stop_after_targets is None else p.stop_after_targets for p in profiles])[which]
+    return which, state, budget, stop
+
+
+def simulate_chunk(
+    config: SimulationConfig,
+    profiles: List[PlayerProfile],
+    n_players: int,
+    rng: np.random.Generator,
+) -> List[PopulationStats]:
+    """
+    Simulate `n_players` in lockstep, one vectorized pull per step. Players
+    that run out of budget or hit their stop rule are recorded and dropped
+    from the working arrays, so late steps only touch remaining players.
+    Returns one PopulationStats per profile.
+    """
+    hazard = five_star_hazard(config)
+    which, state, budget, stop = _draw_players(profiles, n_players, config.hard_pity, rng)
+    spent = np.zeros(n_players, dtype=np.int64)
+    targets = np.zeros(n_players, dtype=np.int32)
+    fives = np.zeros(n_players, dtype=np.int32)
+    stats = [PopulationStats() for _ in profiles]
+
+    while len(spent):
+        active = (spent < budget) & (targets < stop)
+        n_done = len(spent) - int(active.sum())
+        # Compact once enough players are finished; until then mask them.
+        if n_done and (n_done * 8 >= len(spent) or n_done == len(spent)):
+            done = ~active
+            for i, s in enumerate(stats):
+                sel = done & (which == i)
+                if sel.any():
+                    s.add(spent[sel], targets[sel], fives[sel], budget[sel] - spent[sel])
+            state = state.take(active)
+            which, budget, stop = which[active], budget[active], stop[active]
+            spent, targets, fives = spent[active], targets[active], fives[active]
+            continue
+
+        outcome = batch_pull(config, state, rng.random((N_UNIFORMS, len(spent))), active=active, hazard=hazard)
+        spent += active
+        targets += outcome.is_target
+        fives += outcome.is_five_star
+
+    return stats
+
+
+def simulate_population(
+    config: SimulationConfig,
+    profiles: List[PlayerProfile],
+    n_players: int,
+    chunk_size: int = 1_000_000,
+    seed: Optional[int] = None,
+) -> Dict:
+    """
+    Population simulation in fixed-size chunks. Memory is bounded by one
+    chunk of player arrays plus the histograms, independent of n_players.
+    Chunk i uses its own generator seeded with (seed, i), so results do not
+    depend on how chunks are scheduled. Without a seed, fresh OS entropy
+    takes its place, so unseeded runs differ.
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    per_profile = [PopulationStats() for _ in profiles]
+    done = 0
+    chunk_index = 0
+    while done < n_players:
+        n = min(chunk_size, n_players - done)
+        rng = np.random.default_rng([seed, chunk_index])
+        for total, part in zip(per_profile, simulate_chunk(config, profiles, n, rng)):
+            total.merge(part)
+        done += n
+        chunk_index += 1
+
+    overall = PopulationStats()
+    for s in per_profile:
+        overall.merge(s)
+    return {
+        "players": n_players,
+        "overall": overall.summary(),
+        "profiles": {p.name: s.summary() for p, s in zip(profiles, per_profile)},
+    }
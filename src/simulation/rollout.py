@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .batch import N_UNIFORMS, BatchState, IntHistogram, batch_pull
+from .engine import GachaEngine, SimulationConfig, State
+from .exact import five_star_hazard
+
+
+@dataclass
+class RolloutResult:
+    start: State
+    paths: int
+    horizon: int
+    # Pulls until the first five-star / first target; value horizon + 1 = not reached.
+    time_to_five_star: IntHistogram
+    time_to_target: IntHistogram
+
+    def _summary(self, hist: IntHistogram) -> Dict:
+        counts = hist.counts
+        censored = float(counts[self.horizon + 1]) if len(counts) > self.horizon + 1 else 0.0
+        reached = counts[: self.horizon + 1]
+        n_reached = float(reached.sum())
+        mean = float(np.dot(np.arange(len(reached)), reached) / n_reached) if n_reached else None
+        return {
+            "prob_within_horizon": n_reached / self.paths if self.paths else 0.0,
+            "mean_if_reached": mean,
+            # Quantiles equal to horizon + 1 mean "not within horizon".
+            "quantiles": hist.summary()["quantiles"],
+            "censored": censored,
+            "pmf": (counts / self.paths).tolist() if self.paths else [],
+        }
+
+    def summary(self) -> Dict:
+        return {
+            "start": {
+                "pity": self.start.pulls_since_five_star,
+                "guarantee": int(self.start.guarantee),
+                "capture_counter": self.start.capture_counter,
+            },
+            "paths": self.paths,
+            "horizon": self.horizon,
+            "censored_value": self.horizon + 1,
+            "time_to_five_star": self._summary(self.time_to_five_star),
+            "time_to_target": self._summary(self.time_to_target),
+        }
+
+
+def rollout_states(
+    config: SimulationConfig,
+    states: List[State],
+    paths: int,
+    horizon: int,
+    seed: Optional[int] = None,
+) -> List[RolloutResult]:
+    """
+    Launch `paths` independent continuations from each starting state, all
+    in one lockstep batch of len(states) * paths players, for up to
+    `horizon` pulls. A path stops once it has hit a target (its first
+    five-star is at or before that pull), and finished paths are compacted
+    out of the working arrays.
+    """
+    rng = np.random.default_rng(seed)
+    hazard = five_star_hazard(config)
+    n_states = len(states)
+    censored = horizon + 1
+
+    batch = BatchState.from_states(states)
+    state_id = np.repeat(np.arange(n_states), paths)
+    work = batch.take(state_id)
+    first_five = np.full(len(state_id), censored, dtype=np.int32)
+    first_target = np.full(len(state_id), censored, dtype=np.int32)
+    # Per-path results land here when the path finishes.
+    out_five = np.full(len(state_id), censored, dtype=np.int32)
+    out_target = np.full(len(state_id), censored, dtype=np.int32)
+    alive = np.arange(len(state_id))
+
+    for t in range(1, horizon + 1):
+        if len(alive) == 0:
+            break
+        outcome = batch_pull(config, work, rng.random((N_UNIFORMS, len(alive))), hazard=hazard)
+        first_five = np.where((first_five == censored) & outcome.is_five_star, t, first_five)
+        first_target = np.where(outcome.is_target, t, first_target)
+
+        done = outcome.is_target
+        if done.any():
+            out_five[alive[done]] = first_five[done]
+            out_target[alive[done]] = first_target[done]
+            keep = ~done
+            work = work.take(keep)
+            alive, first_five, first_target = alive[keep], first_five[keep], first_target[keep]
+
+    out_five[alive] = first_five
+    out_target[alive] = first_target
+
+    # Per-state histograms in one bincount each: key = state * (horizon + 2) + time.
+    width = horizon + 2
+    five_counts = np.bincount(state_id * width + out_five, minlength=n_states * width).reshape(n_states, width)
+    target_counts = np.bincount(state_id * width + out_target, minlength=n_states * width).reshape(n_states, width)
+
+    results = []
+    for i, start in enumerate(states):
+        h_five, h_target = IntHistogram(), IntHistogram()
+        h_five.counts = five_counts[i].astype(np.float64)
+        h_target.counts = target_counts[i].astype(np.float64)
+        results.append(RolloutResult(start, paths, horizon, h_five, h_target))
+    return results
+
+
+def fork(engine: GachaEngine, paths: int, horizon: int, seed: Optional[int] = None) -> RolloutResult:
+    """Snapshot the engine's current state and roll `paths` continuations from it."""
+    return rollout_states(engine.config, [engine.snapshot()], paths, horizon, seed=seed)[0]
@@ -4,6 +4,46 @@ from typing import Tuple
 import random
 
 
+def resolve_five_star(
+    u_rate,
+    u_capture,
+    guarantee,
+    capture_counter,
+    capture_enabled: bool,
+    capture_hard: int,
+    capture_prob: float,
+    p_target_no_guarantee: float,
+    p_target_guarantee: float,
+):
+    """
+    Outcome of a five-star given its uniforms: the rate-up draw `u_rate`
+    and the capture draw `u_capture` (ignored unless a loss is not forced).
+    Elementwise on Python scalars or NumPy arrays, so GachaEngine and the
+    batch simulator share one implementation.
+
+    Returns (is_target, guarantee_after, capture_counter_after, lost_rate_up, captured).
+    """
+    # Imported here so that importing the engine does not load NumPy;
+    # lightweight subcommands import the engine on their startup path.
+    import numpy as np
+
+    p_target = np.where(guarantee, p_target_guarantee, p_target_no_guarantee)
+    won = u_rate < p_target
+    lost = np.logical_not(won)
+
+    # Apply capture mechanism if enabled and not target
+    if capture_enabled:
+        counter_lost = capture_counter + lost
+        captured = lost & ((counter_lost >= capture_hard) | (u_capture < capture_prob))
+        capture_counter = np.where(captured, 0, counter_lost)
+    else:
+        captured = np.zeros_like(lost)
+
+    # Update guarantee: lose 50/50 -> guarantee next time, win -> clear
+    is_target = won | captured
+    return is_target, np.logical_not(is_target), capture_counter, lost, captured
+
+
 def apply_five_star_rule(
     rng: random.Random,
     guarantee: bool,
@@ -17,23 +57,16 @@ def apply_five_star_rule(
     """
     Returns (is_target, guarantee_after, capture_counter_after).
     """
-    # Determine target outcome based on guarantee
-    if guarantee:
-        is_target = rng.random() < p_target_guarantee
-    else:
-        is_target = rng.random() < p_target_no_guarantee
-
-    # Apply capture mechanism if enabled and not target
-    if capture_enabled and not is_target:
-        capture_counter += 1
-        if capture_counter >= capture_hard or rng.random() < capture_prob:
-            is_target = True
-            capture_counter = 0
-
-    # Update guarantee: lose 50/50 -> guarantee next time, win -> clear
-    if is_target:
-        guarantee_after = False
-    else:
-        guarantee_after = True
-
-    return is_target, guarantee_after, capture_counter
+    rules = (capture_enabled, capture_hard, capture_prob, p_target_no_guarantee, p_target_guarantee)
+    # Draws are made lazily, so seeded runs keep their random stream: with
+    # u_capture = 1.0 only a forced capture happens, and the capture draw is
+    # made only when the rate-up draw lost and the capture was not forced.
+    u_rate = rng.random()
+    is_target, guarantee_after, counter_after, lost, captured = resolve_five_star(
+        u_rate, 1.0, guarantee, capture_counter, *rules
+    )
+    if capture_enabled and lost and not captured:
+        is_target, guarantee_after, counter_after, _, _ = resolve_five_star(
+            u_rate, rng.random(), guarantee, capture_counter, *rules
+        )
+    return bool(is_target), bool(guarantee_after), int(counter_after)
@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+import copy
+
+import numpy as np
+import yaml
+
+from .batch import N_UNIFORMS, BatchState, IntHistogram, batch_pull
+from .engine import SimulationConfig, config_from_dict
+from .exact import five_star_hazard
+from .population import NO_STOP, PlayerProfile, PopulationStats, int_range
+
+
+@dataclass
+class Allocation:
+    """How a player spends on one banner."""
+
+    # Fraction of the spendable wallet (after `reserve`) allotted to the banner.
+    share: float = 1.0
+    # Pulls held back for later banners.
+    reserve: int = 0
+    max_pulls: Optional[int] = None
+    # Stop after this many targets on the banner (None: the profile's
+    # stop_after_targets, and if that is unset, spend the whole allotment).
+    stop_after_targets: Optional[int] = None
+    # Probability that a player pulls on the banner at all.
+    participation: float = 1.0
+
+
+@dataclass
+class GroupStart:
+    """Pity state players bring into a pity group at season start."""
+
+    start_pity: Tuple[int, int] = (0, 0)
+    start_guarantee_prob: float = 0.0
+    # Profile name -> start used instead of the fields above.
+    by_profile: Dict[str, "GroupStart"] = field(default_factory=dict)
+
+
+@dataclass
+class Banner:
+    name: str
+    config: SimulationConfig
+    start_day: float
+    days: float
+    # Banners in the same group share pity, guarantee and capture state.
+    pity_group: str = "character"
+    allocation: Allocation = field(default_factory=Allocation)
+    # Profile name -> allocation used instead of `allocation`.
+    by_profile: Dict[str, Allocation] = field(default_factory=dict)
+
+    @property
+    def end_day(self) -> float:
+        return self.start_day + self.days
+
+
+@dataclass
+class Season:
+    """Banners in the order players pull on them, plus the player population."""
+
+    banners: List[Banner]
+    profiles: List[PlayerProfile]
+    # Pity group -> starting state. A group left out starts from the
+    # profiles' start_pity / start_guarantee_prob if it is the first group,
+    # and from pity 0 without guarantee otherwise.
+    starts: Dict[str, GroupStart] = field(default_factory=dict)
+
+    @property
+    def groups(self) -> List[str]:
+        return list(dict.fromkeys(b.pity_group for b in self.banners))
+
+    @property
+    def days(self) -> float:
+        return max(b.end_day for b in self.banners)
+
+
+def apply_overrides(raw: Dict, overrides: Dict) -> None:
+    """Set dotted keys, e.g. {"pity.hard_pity": 80}."""
+    for key, value in overrides.items():
+        node = raw
+        parts = str(key).split(".")
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+
+
+def _allocation(raw: Optional[Dict], base: Optional[Allocation] = None) -> Allocation:
+    raw = dict(raw or {})
+    unknown = set(raw) - set(Allocation.__dataclass_fields__)
+    if unknown:
+        raise ValueError(f"unknown allocation keys: {sorted(unknown)}")
+    return replace(base or Allocation(), **raw)
+
+
+def _group_start(raw: Dict, base: Optional[GroupStart] = None) -> GroupStart:
+    raw = dict(raw or {})
+    unknown = set(raw) - {"start_pity", "start_guarantee_prob"}
+    if unknown:
+        raise ValueError(f"unknown pity group keys: {sorted(unknown)}")
+    base = base or GroupStart()
+    return GroupStart(
+        start_pity=int_range(raw.get("start_pity"), base.start_pity),
+        start_guarantee_prob=float(raw.get("start_guarantee_prob", base.start_guarantee_prob)),
+    )
+
+
+def season_from_dict(raw: Dict, base_rules: Dict, profiles: List[PlayerProfile]) -> Season:
+    """
+    Build a Season from a season.yaml mapping. Each banner starts from
+    `base_rules`, or from its own `rules` file, and applies its `set`
+    overrides (dotted keys), so versions and banner types can differ.
+    `pity_groups` optionally gives each group its own starting state.
+    """
+    banners = []
+    for b in raw.get("banners", []):
+        if b.get("rules"):
+            with open(b["rules"], "r", encoding="utf-8") as f:
+                rules = yaml.safe_load(f)
+        else:
+            rules = copy.deepcopy(base_rules)
+        apply_overrides(rules, b.get("set") or {})
+        allocation = _allocation(b.get("allocation"))
+        by_profile = {name: _allocation(a, allocation) for name, a in (b.get("by_profile") or {}).items()}
+        unknown = set(by_profile) - {p.name for p in profiles}
+        if unknown:
+            raise ValueError(f"banner {b['name']}: by_profile names unknown profiles {sorted(unknown)}")
+        banner = Banner(
+            name=str(b["name"]),
+            config=config_from_dict(rules),
+            start_day=float(b.get("start_day", 0.0)),
+            days=float(b["days"]),
+            pity_group=str(b.get("pity_group", "character")),
+            allocation=allocation,
+            by_profile=by_profile,
+        )
+        if banner.days <= 0:
+            raise ValueError(f"banner {banner.name}: days must be positive")
+        banners.append(banner)
+    if not banners:
+        raise ValueError("season defines no banners")
+
+    starts = {}
+    names = {p.name for p in profiles}
+    for group, g in (raw.get("pity_groups") or {}).items():
+        g = dict(g or {})
+        by_profile = g.pop("by_profile", None) or {}
+        start = _group_start(g)
+        start.by_profile = {name: _group_start(v, start) for name, v in by_profile.items()}
+        unknown = set(start.by_profile) - names
+        if unknown:
+            raise ValueError(f"pity group {group}: by_profile names unknown profiles {sorted(unknown)}")
+        starts[str(group)] = start
+    unknown = set(starts) - {b.pity_group for b in banners}
+    if unknown:
+        raise ValueError(f"pity_groups names groups no banner uses: {sorted(unknown)}")
+    return Season(banners, profiles, starts)
+
+
+def pull_until(
+    config: SimulationConfig,
+    state: BatchState,
+    budget: np.ndarray,
+    stop: np.ndarray,
+    rng: np.random.Generator,
+    hazard: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Every player pulls in lockstep until they have spent `budget` pulls or
+    won `stop` targets. `state` is updated in place. Finished players are
+    written back and dropped from the working arrays, as in
+    population.simulate_chunk. Returns (pulls spent, targets, five-stars).
+    """
+    if hazard is None:
+        hazard = five_star_hazard(config)
+    n = len(budget)
+    spent = np.zeros(n, dtype=np.int64)
+    targets = np.zeros(n, dtype=np.int32)
+    fives = np.zeros(n, dtype=np.int32)
+
+    idx = np.arange(n)
+    work = state.take(idx)
+    w_budget, w_stop = budget, stop
+    w_spent, w_targets, w_fives = spent.copy(), targets.copy(), fives.copy()
+    while len(idx):
+        active = (w_spent < w_budget) & (w_targets < w_stop)
+        n_done = len(idx) - int(active.sum())
+        if n_done and (n_done * 8 >= len(idx) or n_done == len(idx)):
+            done = ~active
+            d = idx[done]
+            spent[d], targets[d], fives[d] = w_spent[done], w_targets[done], w_fives[done]
+            state.pity[d] = work.pity[done]
+            state.guarantee[d] = work.guarantee[done]
+            state.capture_counter[d] = work.capture_counter[done]
+            work, idx = work.take(active), idx[active]
+            w_budget, w_stop = w_budget[active], w_stop[active]
+            w_spent, w_targets, w_fives = w_spent[active], w_targets[active], w_fives[active]
+            continue
+
+        outcome = batch_pull(config, work, rng.random((N_UNIFORMS, len(idx))), active=active, hazard=hazard)
+        w_spent += active
+        w_targets += outcome.is_target
+        w_fives += outcome.is_five_star
+    return spent, targets, fives
+
+
+@dataclass
+class SeasonStats:
+    # One PopulationStats per banner (participants only; leftover = unspent allotment).
+    banners: List[PopulationStats]
+    # One PopulationStats per profile over the whole season (leftover = wallet at season end).
+    profiles: List[PopulationStats]
+    # Per pity group: pity histogram and guarantee count at season end.
+    end_pity: Dict[str, IntHistogram]
+    end_guarantee: Dict[str, int]
+
+    @classmethod
+    def empty(cls, season: Season) -> "SeasonStats":
+        return cls(
+            banners=[PopulationStats() for _ in season.banners],
+            profiles=[PopulationStats() for _ in season.profiles],
+            end_pity={g: IntHistogram() for g in season.groups},
+            end_guarantee={g: 0 for g in season.groups},
+        )
+
+    def merge(self, other: "SeasonStats") -> None:
+        for a, b in zip(self.banners + self.profiles, other.banners + other.profiles):
+            a.merge(b)
+        for g, hist in other.end_pity.items():
+            self.end_pity[g].merge(hist)
+            self.end_guarantee[g] += other.end_guarantee[g]
+
+
+def _draw_season_players(profiles: List[PlayerProfile], n: int, rng: np.random.Generator):
+    """Profile index, daily income (with the profile's lognormal multiplier), saved pulls, profile start states per player."""
+    weights = np.array([p.weight for p in profiles], dtype=np.float64)
+    which = rng.choice(len(profiles), size=n, p=weights / weights.sum())
+
+    def col(attr):
+        return np.array([getattr(p, attr) for p in profiles])[which]
+
+    cv = col("income_cv")
+    sigma = np.sqrt(np.log1p(cv * cv))
+    rate = (col("pulls_per_day") + col("daily_bonus_pull")) * np.exp(sigma * rng.standard_normal(n) - 0.5 * sigma * sigma)
+    saved = np.array([p.saved_pulls for p in profiles])[which]
+    saved = rng.integers(saved[:, 0], saved[:, 1] + 1)
+    start_pity = np.array([p.start_pity for p in profiles])[which]
+    pity = rng.integers(start_pity[:, 0], start_pity[:, 1] + 1)
+    guarantee = rng.random(n) < col("start_guarantee_prob")
+    return which, rate, saved, pity, guarantee
+
+
+def _draw_group_start(start: GroupStart, profiles: List[PlayerProfile], which: np.ndarray, rng: np.random.Generator):
+    """Start pity and guarantee per player for one pity group."""
+    per_profile = [start.by_profile.get(p.name, start) for p in profiles]
+    pity_range = np.array([s.start_pity for s in per_profile])[which]
+    pity = rng.integers(pity_range[:, 0], pity_range[:, 1] + 1)
+    guarantee = rng.random(len(which)) < np.array([s.start_guarantee_prob for s in per_profile])[which]
+    return pity, guarantee
+
+
+def _allocation_arrays(banner: Banner, profiles: List[PlayerProfile], which: np.ndarray):
+    allocs = [banner.by_profile.get(p.name, banner.allocation) for p in profiles]
+
+    def col(values):
+        return np.array(values)[which]
+
+    stop = [
+        a.stop_after_targets if a.stop_after_targets is not None
+        else (p.stop_after_targets if p.stop_after_targets is not None else NO_STOP)
+        for a, p in zip(allocs, profiles)
+    ]
+    max_pulls = [NO_STOP if a.max_pulls is None else a.max_pulls for a in allocs]
+    return (
+        col([a.share for a in allocs]),
+        col([a.reserve for a in allocs]),
+        col(max_pulls),
+        col(stop),
+        col([a.participation for a in allocs]),
+    )
+
+
+def simulate_season_chunk(season: Season, n_players: int, rng: np.random.Generator) -> SeasonStats:
+    """
+    Run `n_players` through every banner in order. Income accrues daily, and a
+    banner can spend what the player has earned by its last day, net of
+    earlier spending. Pity state lives per pity group and carries from
+    one banner of the group to the next; each group starts from its own
+    state (see Season.starts).
+    """
+    profiles = season.profiles
+    which, rate, saved, pity, guarantee = _draw_season_players(profiles, n_players, rng)
+    states = {}
+    for i, g in enumerate(season.groups):
+        s = BatchState.zeros(n_players)
+        if g in season.starts:
+            group_pity, group_guarantee = _draw_group_start(season.starts[g], profiles, which, rng)
+            s.pity = group_pity.astype(np.int16)
+            s.guarantee = group_guarantee
+        elif i == 0:
+            s.pity = pity.astype(np.int16)
+            s.guarantee = guarantee.copy()
+        states[g] = s
+    spent_total = np.zeros(n_players, dtype=np.int64)
+    targets_total = np.zeros(n_players, dtype=np.int32)
+    fives_total = np.zeros(n_players, dtype=np.int32)
+    stats = SeasonStats.empty(season)
+
+    for b, banner in enumerate(season.banners):
+        cfg = banner.config
+        share, reserve, max_pulls, stop, participation = _allocation_arrays(banner, profiles, which)
+        wallet = saved + np.floor(rate * banner.end_day).astype(np.int64) - spent_total
+        allot = np.floor(np.maximum(wallet - reserve, 0) * share).astype(np.int64)
+        allot = np.minimum(allot, max_pulls)
+        players = np.flatnonzero((allot > 0) & (rng.random(n_players) < participation))
+
+        group = states[banner.pity_group]
+        sub = group.take(players)
+        # Rules may differ between versions of a group; keep carried state in range.
+        sub.pity = np.minimum(sub.pity, cfg.hard_pity - 1).astype(np.int16)
+        sub.capture_counter = np.minimum(sub.capture_counter, max(cfg.capture_hard - 1, 0)).astype(np.int8)
+        spent, targets, fives = pull_until(cfg, sub, allot[players], stop[players], rng, five_star_hazard(cfg))
+        group.pity[players] = sub.pity
+        group.guarantee[players] = sub.guarantee
+        group.capture_counter[players] = sub.capture_counter
+
+        spent_total[players] += spent
+        targets_total[players] += targets
+        fives_total[players] += fives
+        stats.banners[b].add(spent, targets, fives, allot[players] - spent)
+
+    leftover = saved + np.floor(rate * season.days).astype(np.int64) - spent_total
+    for i, s in enumerate(stats.profiles):
+        sel = which == i
+        s.add(spent_total[sel], targets_total[sel], fives_total[sel], leftover[sel])
+    for g, s in states.items():
+        stats.end_pity[g].add(s.pity)
+        stats.end_guarantee[g] += int(s.guarantee.sum())
+    return stats
+
+
+def simulate_season(
+    season: Season,
+    n_players: int,
+    chunk_size: int = 1_000_000,
+    seed: Optional[int] = None,
+) -> Dict:
+    """
+    Season simulation in fixed-size chunks, seeded per chunk as in
+    simulate_population. Reports per-banner outcomes among participants,
+    season totals per profile and overall, and the pity state each
+    group carries into the next season.
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    total = SeasonStats.empty(season)
+    done = 0
+    chunk_index = 0
+    while done < n_players:
+        n = min(chunk_size, n_players - done)
+        rng = np.random.default_rng([seed, chunk_index])
+        total.merge(simulate_season_chunk(season, n, rng))
+        done += n
+        chunk_index += 1
+
+    overall = PopulationStats()
+    for s in total.profiles:
+        overall.merge(s)
+    banners = {}
+    for banner, s in zip(season.banners, total.banners):
+        summary = s.summary()
+        summary["participants"] = summary.pop("players")
+        summary["unused_allotment"] = summary.pop("leftover_pulls")
+        banners[banner.name] = {
+            "pity_group": banner.pity_group,
+            "start_day": banner.start_day,
+            "days": banner.days,
+            "pulls": float(s.pulls_spent.mean() * s.players),
+            **summary,
+        }
+    return {
+        "players": n_players,
+        "days": season.days,
+        "banners": banners,
+        "overall": overall.summary(),
+        "profiles": {p.name: s.summary() for p, s in zip(season.profiles, total.profiles)},
+        "end_state": {
+            g: {"pity": total.end_pity[g].summary(), "guarantee_rate": total.end_guarantee[g] / n_players if n_players else 0.0}
+            for g in season.groups
+        },
+    }
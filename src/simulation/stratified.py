@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .batch import N_UNIFORMS, BatchState, batch_pull
+from .columns import RAW_DTYPES, WEIGHT_COLUMN
+from .engine import SimulationConfig
+from .exact import capture_states, five_star_hazard, stationary_state_distribution
+
+
+WITHIN_MODES = ("uniform", "natural")
+
+
+@dataclass
+class Stratum:
+    """Starting states sampled together under one row quota."""
+
+    name: str
+    pity: Tuple[int, int]  # inclusive pity_before range
+    guarantee: Optional[bool] = None  # None: either
+    capture_counter: Optional[int] = None  # None: any
+    quota: int = 0
+    # How rows are spread over the stratum's reachable states: "uniform"
+    # (same expected rows per state) or "natural" (stationary frequencies).
+    within: str = "uniform"
+
+    def mask(self, shape: Tuple[int, int, int]) -> np.ndarray:
+        pity, g, c = np.indices(shape)
+        m = (pity >= self.pity[0]) & (pity <= self.pity[1])
+        if self.guarantee is not None:
+            m &= g == int(self.guarantee)
+        if self.capture_counter is not None:
+            m &= c == self.capture_counter
+        return m
+
+
+@dataclass
+class StratifiedDesign:
+    """
+    Per-state sampling probabilities for a list of strata and the importance
+    weights that map generated rows back to the natural pull stream. Each
+    reachable state belongs to the first stratum that matches it.
+    """
+
+    strata: List[Stratum]
+    pi: np.ndarray  # [pity, g, c] stationary state distribution
+    assignment: np.ndarray  # [pity, g, c] stratum index, -1 if unreachable
+    sample_prob: np.ndarray  # [pity, g, c] P(a generated row starts there)
+    weight: np.ndarray  # [pity, g, c] pi / sample_prob, 0 where never sampled
+
+    @property
+    def rows(self) -> int:
+        return sum(s.quota for j, s in enumerate(self.strata) if (self.assignment == j).any())
+
+    def summary(self) -> List[Dict]:
+        out = []
+        for j, s in enumerate(self.strata):
+            cells = self.assignment == j
+            w = self.weight[cells]
+            out.append(
+                {
+                    "name": s.name,
+                    "pity": list(s.pity),
+                    "guarantee": s.guarantee,
+                    "capture_counter": s.capture_counter,
+                    "states": int(cells.sum()),
+                    "quota": s.quota if cells.any() else 0,
+                    "natural_share": float(self.pi[cells].sum()),
+                    "sample_share": float(self.sample_prob[cells].sum()),
+                    "weight_min": float(w.min()) if len(w) else None,
+                    "weight_max": float(w.max()) if len(w) else None,
+                }
+            )
+        return out
+
+
+def default_pity_edges(config: SimulationConfig) -> List[int]:
+    """Bands of 10 before soft pity, then bands of 4 where the hazard climbs."""
+    start = min(config.soft_pity_start, config.hard_pity)
+    return list(range(0, start, 10)) + list(range(start, config.hard_pity, 4))
+
+
+def grid_strata(config: SimulationConfig, pity_edges: Sequence[int], quota: int) -> List[Stratum]:
+    """One stratum per pity band x guarantee x capture_counter, each with `quota` rows."""
+    edges = sorted(set(int(e) for e in pity_edges) | {0})
+    bounds = [(lo, hi - 1) for lo, hi in zip(edges, edges[1:] + [config.hard_pity]) if lo < config.hard_pity]
+    strata = []
+    for lo, hi in bounds:
+        for g in (False, True):
+            for c in range(capture_states(config)):
+                strata.append(Stratum(f"pity{lo}-{hi}_g{int(g)}_c{c}", (lo, hi), g, c, quota))
+    return strata
+
+
+def strata_from_dict(raw: Dict) -> List[Stratum]:
+    """Strata from a mapping like configs/strata.yaml (a `strata` list, first match wins)."""
+    strata = []
+    for i, s in enumerate(raw.get("strata", [])):
+        pity = s.get("pity", [0, 10**6])
+        lo, hi = (pity, pity) if isinstance(pity, int) else (int(pity[0]), int(pity[1]))
+        guarantee = s.get("guarantee")
+        stratum = Stratum(
+            name=str(s.get("name", f"stratum{i}")),
+            pity=(lo, hi),
+            guarantee=None if guarantee is None else bool(guarantee),
+            capture_counter=s.get("capture_counter"),
+            quota=int(s["quota"]),
+            within=str(s.get("within", "uniform")),
+        )
+        if stratum.within not in WITHIN_MODES:
+            raise ValueError(f"stratum {stratum.name}: within must be one of {WITHIN_MODES}")
+        strata.append(stratum)
+    if not strata:
+        raise ValueError("no strata given")
+    return strata
+
+
+def design_strata(config: SimulationConfig, strata: List[Stratum]) -> StratifiedDesign:
+    """
+    Sampling probabilities and importance weights for `strata`. Every state
+    a natural stream visits must be covered (end with a catch-all stratum),
+    otherwise weighted estimates could not be unbiased.
+    """
+    pi = stationary_state_distribution(config)
+    reachable = pi > 0
+    assignment = np.full(pi.shape, -1, dtype=np.int64)
+    for j, s in enumerate(strata):
+        assignment[(assignment < 0) & reachable & s.mask(pi.shape)] = j
+    uncovered = float(pi[reachable & (assignment < 0)].sum())
+    if uncovered > 0:
+        raise ValueError(f"strata leave {uncovered:.3g} of the natural state mass uncovered; add a catch-all stratum")
+
+    used = [j for j in range(len(strata)) if (assignment == j).any()]
+    total = sum(strata[j].quota for j in used)
+    sample_prob = np.zeros_like(pi)
+    for j in used:
+        s, cells = strata[j], assignment == j
+        if s.quota <= 0:
+            raise ValueError(f"stratum {s.name} covers reachable states but has no quota")
+        within = pi[cells] / pi[cells].sum() if s.within == "natural" else np.full(int(cells.sum()), 1.0 / cells.sum())
+        sample_prob[cells] = s.quota / total * within
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = np.where(sample_prob > 0, pi / sample_prob, 0.0)
+    return StratifiedDesign(strata, pi, assignment, sample_prob, weight)
+
+
+def sample_stratified(
+    config: SimulationConfig,
+    design: StratifiedDesign,
+    rng: np.random.Generator,
+    block: int = 1_000_000,
+) -> Dict[str, np.ndarray]:
+    """
+    One pull from each of `design.rows` starting states: exactly `quota`
+    rows per stratum, states drawn within the stratum, rows shuffled.
+    Returns columns in the raw log schema (pull_index is the row number)
+    plus `stratum` and the importance `weight` pi / sample_prob of the
+    starting state, so weighted averages estimate natural-stream rates.
+    """
+    shape = design.pi.shape
+    states, ids = [], []
+    for j, s in enumerate(design.strata):
+        cells = np.flatnonzero(design.assignment.ravel() == j)
+        if len(cells) == 0:
+            continue
+        p = design.sample_prob.ravel()[cells]
+        states.append(rng.choice(cells, size=s.quota, p=p / p.sum()))
+        ids.append(np.full(s.quota, j, dtype=np.int16))
+    order = rng.permutation(sum(len(x) for x in states))
+    states = np.concatenate(states)[order]
+    ids = np.concatenate(ids)[order]
+    n = len(states)
+
+    pity, g, c = np.unravel_index(states, shape)
+    columns = {name: np.empty(n, dtype=dtype) for name, dtype in RAW_DTYPES.items()}
+    columns["pull_index"] = np.arange(1, n + 1, dtype=np.int64)
+    hazard = five_star_hazard(config)
+    for a in range(0, n, block):
+        b = min(n, a + block)
+        state = BatchState(pity[a:b].astype(np.int16), g[a:b].astype(bool), c[a:b].astype(np.int8))
+        columns["pity_before"][a:b] = state.pity
+        columns["guarantee_before"][a:b] = state.guarantee
+        columns["capture_counter_before"][a:b] = state.capture_counter
+        out = batch_pull(config, state, rng.random((N_UNIFORMS, b - a)), hazard=hazard)
+        columns["is_five_star"][a:b] = out.is_five_star
+        columns["is_target"][a:b] = out.is_target
+        columns["pity"][a:b] = state.pity
+        columns["guarantee_after"][a:b] = state.guarantee
+        columns["capture_counter_after"][a:b] = state.capture_counter
+    columns["stratum"] = ids
+    columns[WEIGHT_COLUMN] = design.weight.ravel()[states]
+    return columns
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Sequence, Union
 import math
 
+import numpy as np
+
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
 
 @dataclass
 class UtilityConfig:
@@ -43,3 +47,78 @@ def summarize_decision(prob_five_star: float, prob_target_given_five: float, cfg
         "prob_target": prob_target,
         "utility_score": score,
     }
+
+
+def arrow_pratt_utility(x: ArrayLike, risk_aversion: ArrayLike) -> np.ndarray:
+    """
+    Vectorized U(x) = (1 - exp(-a * x)) / a with U(x) = x at a = 0.
+    `x` and `risk_aversion` broadcast against each other.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    a = np.asarray(risk_aversion, dtype=np.float64)
+    safe_a = np.where(a == 0, 1.0, a)
+    with np.errstate(over="ignore"):
+        u = -np.expm1(-safe_a * x) / safe_a
+    return np.where(a == 0, x, u)
+
+
+def expected_utility_grid(
+    prob_success: ArrayLike,
+    reward: ArrayLike,
+    cost: ArrayLike,
+    risk_aversion: ArrayLike,
+) -> np.ndarray:
+    """
+    expected_utility over the outer product of its inputs in one call.
+    Returns shape (len(risk_aversion), len(prob_success), len(reward), len(cost)).
+    """
+    a, p, r, c = np.ix_(
+        np.atleast_1d(np.asarray(risk_aversion, dtype=np.float64)),
+        np.atleast_1d(np.asarray(prob_success, dtype=np.float64)),
+        np.atleast_1d(np.asarray(reward, dtype=np.float64)),
+        np.atleast_1d(np.asarray(cost, dtype=np.float64)),
+    )
+    u_success = arrow_pratt_utility(r - c, a)
+    u_fail = arrow_pratt_utility(-c, a)
+    return p * u_success + (1 - p) * u_fail
+
+
+def distribution_utility(pmf: np.ndarray, outcomes: np.ndarray, risk_aversion: ArrayLike) -> np.ndarray:
+    """
+    E[U(X)] for a discrete distribution P(X = outcomes[i]) = pmf[i] (any
+    matching shape), for every risk coefficient at once. Zero-probability
+    outcomes are skipped so overflowing utilities cannot produce NaN.
+    Returns an array of shape (len(risk_aversion),).
+    """
+    pmf = np.asarray(pmf, dtype=np.float64).ravel()
+    outcomes = np.asarray(outcomes, dtype=np.float64).ravel()
+    support = pmf > 0
+    a = np.atleast_1d(np.asarray(risk_aversion, dtype=np.float64))
+    u = arrow_pratt_utility(outcomes[support][None, :], a[:, None])
+    return u @ pmf[support]
+
+
+def plan_utility(
+    pmf: np.ndarray,
+    reward_per_target: float,
+    cost_per_pull: float,
+    risk_aversion: ArrayLike,
+) -> np.ndarray:
+    """
+    Expected utility of a multi-pull plan with joint outcome distribution
+    pmf[t, n] = P(t targets, n pulls spent), net outcome
+    x = t * reward_per_target - n * cost_per_pull.
+    """
+    t = np.arange(pmf.shape[0], dtype=np.float64)[:, None]
+    n = np.arange(pmf.shape[1], dtype=np.float64)[None, :]
+    return distribution_utility(pmf, t * reward_per_target - n * cost_per_pull, risk_aversion)
+
+
+def certainty_equivalent(utility: ArrayLike, risk_aversion: ArrayLike) -> np.ndarray:
+    """Inverse of arrow_pratt_utility: the sure outcome with the same utility."""
+    u = np.asarray(utility, dtype=np.float64)
+    a = np.asarray(risk_aversion, dtype=np.float64)
+    safe_a = np.where(a == 0, 1.0, a)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ce = -np.log1p(-safe_a * u) / safe_a
+    return np.where(a == 0, u, ce)